@@ -1,14 +1,23 @@
 import dash
-from dash import Dash, html, dcc, Input, Output, State, ctx, Input, Output, callback_context, no_update
+from dash import Dash, html, dcc, Input, Output, State, ctx, Input, Output, callback_context, no_update, ClientsideFunction
 from dash.dash_table import DataTable
 from dash.exceptions import PreventUpdate
 import pandas as pd
-from flask import Flask, request, redirect, render_template, session
+from flask import Flask, request, redirect, render_template, session, jsonify, send_file
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
 from flask_session import Session
-from processar_arquivo import processar_excel_upload
+from processar_arquivo import processar_excel_upload, liberar_resultado_upload, salvar_com_hash, liberar_referencia
+from cache import carregar_dataset_em_cache
+from arq import ETAPAS_PROCESSAMENTO
+from tabelas import PAGINACAO_SERVIDOR, TAMANHO_PAGINA, pagina_da_tabela, mudou_apenas_pagina
+from figuras import figura_em_cache, patch_opacidades
+from exportacao import exportar_tabela, exportar_todas_abas, obter_link
+from tarefas import enviar_tarefa, obter_tarefa, descartar_tarefa, FilaCheiaError
+from monitoramento import METRICAS_ATIVAS, instrumentar, exportar_prometheus, token_valido
 import os
 import uuid
+from functools import partial
 from flask_login import (
     LoginManager, UserMixin,
     login_user, logout_user,
@@ -32,6 +41,9 @@ app = Dash(
     routes_pathname_prefix="/dash/"
 )
 
+# Antes dos outros hooks, para medir também o tempo deles.
+instrumentar(app)
+
 login_manager = LoginManager()
 login_manager.init_app(server)
 login_manager.login_view = "/login"
@@ -71,9 +83,7 @@ def login():
 @server.route("/logout")
 @login_required
 def logout():
-    caminho = session.pop("arquivo_excel", None)
-    if caminho and os.path.exists(caminho):
-        os.remove(caminho)
+    liberar_dados_sessao()
 
     logout_user()
     return redirect("/login")
@@ -84,14 +94,14 @@ def proteger_rotas():
     if request.path.startswith(("/_dash", "/assets", "/static")):
         return
 
-    if request.path in ("/login", "/logout", "/upload", "/"):
+    if request.path in ("/login", "/logout", "/upload", "/", "/metrics"):
         return
 
     if not current_user.is_authenticated:
         return redirect("/login")
  
     if request.path.startswith("/dash"):
-        if "arquivo_excel" not in session:
+        if "arquivo_dados" not in session:
             return redirect("/upload")
 
 @server.after_request
@@ -106,21 +116,28 @@ ALLOWED_EXTENSIONS = {"xlsx", "xls"}
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 server.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
-server.config["MAX_CONTENT_LENGTH"] = 10 * 1024 * 1024
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "10"))
+server.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_MB * 1024 * 1024
 
 @server.errorhandler(RequestEntityTooLarge)
 def arquivo_muito_grande(e):
     return render_template(
         "upload.html",
-        erro="Arquivo muito grande. O limite é de 10MB."
+        erro=f"Arquivo muito grande. O limite é de {MAX_UPLOAD_MB}MB."
     ), 413
 
 
 def obter_df_sessao():
-    caminho = session.get("arquivo_excel")
+    caminho = session.get("arquivo_dados")
     if not caminho or not os.path.exists(caminho):
         return None
-    return pd.read_excel(caminho, engine="openpyxl")
+    return carregar_dataset_em_cache(caminho)
+
+def liberar_dados_sessao():
+    caminho = session.pop("arquivo_dados", None)
+    token = session.pop("referencia_dados", None)
+    if caminho and token:
+        liberar_referencia(caminho, token)
 
 def arquivo_permitido(nome):
     return "." in nome and nome.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -143,28 +160,97 @@ def upload():
         nome_unico = f"{uuid.uuid4()}_{nome}"
         caminho = os.path.join(server.config["UPLOAD_FOLDER"], nome_unico)
 
-        arquivo.save(caminho)
+        hash_arquivo = salvar_com_hash(arquivo, caminho)
 
-        try:
-            caminho_processado = processar_excel_upload(caminho)
-        
-            session["arquivo_excel"] = caminho_processado
-            session.modified = True
-        
-            return redirect("/dash/")
+        caminho_base = None
+        if request.form.get("incremental") and os.path.exists(session.get("arquivo_dados") or ""):
+            caminho_base = session["arquivo_dados"]
 
-        except Exception as e:
-            return render_template(
-                "upload.html",
-                erro=f"Erro ao processar o arquivo. Verifique o formato e tente novamente: {str(e)}"
+        try:
+            id_tarefa = enviar_tarefa(
+                current_user.id,
+                processar_excel_upload,
+                caminho,
+                hash_arquivo,
+                caminho_base,
+                liberar=liberar_resultado_upload
             )
+        except FilaCheiaError as e:
+            os.remove(caminho)
+            return render_template("upload.html", erro=str(e))
+
+        session["tarefa_upload"] = id_tarefa
+        session.modified = True
+
+        return render_template(
+            "upload.html",
+            nome_arquivo=arquivo.filename,
+            tarefa_id=id_tarefa
+        )
+
+    return render_template("upload.html", possui_dataset="arquivo_dados" in session)
+
+@server.route("/upload/status/<id_tarefa>")
+@login_required
+def status_upload(id_tarefa):
+    tarefa = obter_tarefa(id_tarefa)
+
+    if tarefa is None or tarefa["dono"] != current_user.id:
+        return jsonify({"status": "erro", "mensagem": "Processamento não encontrado. Envie o arquivo novamente."}), 404
+
+    if tarefa["status"] == "erro":
+        descartar_tarefa(id_tarefa)
+        return jsonify({
+            "status": "erro",
+            "mensagem": f"Erro ao processar o arquivo. Verifique o formato e tente novamente: {tarefa['erro']}"
+        })
+
+    if tarefa["status"] == "concluido":
+        # A sessão só pode ser alterada dentro de uma requisição do usuário,
+        # então o dataset é associado a ela aqui, na consulta de status.
+        # A referência do dataset foi registrada no processamento; a sessão
+        # só a adota, sem uma janela em que o arquivo fique sem dono.
+        if session.get("tarefa_upload") == id_tarefa:
+            adotada = descartar_tarefa(id_tarefa, adotar_resultado=True)
+
+            if adotada is not None:
+                liberar_dados_sessao()
+                session["arquivo_dados"] = adotada["resultado"]["caminho"]
+                session["referencia_dados"] = adotada["resultado"]["referencia"]
+                session.pop("tarefa_upload", None)
+                session.modified = True
+        else:
+            descartar_tarefa(id_tarefa)
+
+        return jsonify({"status": "concluido", "redirecionar": "/dash/"})
+
+    return jsonify({
+        "status": tarefa["status"],
+        "etapa": tarefa["etapa"],
+        "mensagem": ETAPAS_PROCESSAMENTO.get(tarefa["etapa"], "Aguardando processamento")
+    })
+
+@server.route("/exportacoes/<token>")
+@login_required
+def baixar_exportacao(token):
+    link = obter_link(token, current_user.id)
+
+    if link is None:
+        return "Link de download expirado. Clique no botão de download novamente.", 404
 
-        session["arquivo_excel"] = caminho
-        session.modified = True  
+    # O arquivo sai do disco em blocos, sem passar pela resposta do callback.
+    return send_file(link["caminho"], as_attachment=True, download_name=link["nome"])
 
-        return redirect("/")
+@server.route("/metrics")
+def exportar_metricas():
+    if not METRICAS_ATIVAS:
+        return "Métricas desativadas.", 404
 
-    return render_template("upload.html")
+    # Usuário logado ou o Prometheus com o token no cabeçalho Authorization.
+    if not (current_user.is_authenticated or token_valido()):
+        return "Não autorizado.", 401
+
+    return exportar_prometheus(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
 
 from pages.volume_total import layout_volume_total, filtrar_dataframe, criar_grafico, COLUNAS_TABELA
 from pages.nao_finalizadas import layout_nao_finalizadas, criar_grafico_nao_finalizadas, filtrar_dataframe_nao_finalizadas, COLUNAS_TABELA_NAO_FINALIZADAS
@@ -178,14 +264,14 @@ from pages.media_orcamento import criar_layout_media_orcamento, COLUNAS_TABELA_M
 from pages.desocupacao import criar_layout_desocupacao, COLUNAS_FIXA_DESOCUPACAO, COLUNAS_ETAPAS_DESOCUPACAO, MAPA_FASE_CURTA_PARA_DESOCUPACAO
 from pages.media_desocupacao import criar_layout_media_desocupacao, COLUNAS_TABELA_MEDIA_DESOCUPACAO
 from pages.imovel_sem_pendencias import criar_layout_imovel_sem_pendencias, criar_grafico_sem_pendencias, filtrar_dataframe_sem_pendencias, COLUNAS_TABELA_SEM_PENDENCIAS
-from pages.passou_sem_pendencias import criar_layout_passou_sp, criar_grafico_passou_sem_pendencias, processar_dados_passou_sp, atualizar_grafico_passou_sp, COLUNAS_TABELA_PASSOU_SP
-from pages.liberacao_vistoria import criar_layout_liberacao_vistoria, criar_grafico_liberacao_vistoria, processar_dados_liberacao, atualizar_grupos_selecionados, COLUNAS_TABELA_LIBERACAO
+from pages.passou_sem_pendencias import criar_layout_passou_sp, processar_dados_passou_sp, COLUNAS_TABELA_PASSOU_SP
+from pages.liberacao_vistoria import criar_layout_liberacao_vistoria, processar_dados_liberacao, COLUNAS_TABELA_LIBERACAO
 
 def carregar_df():
-    caminho = session.get("arquivo_excel")
-    if not caminho:
+    df = obter_df_sessao()
+    if df is None:
         return pd.DataFrame()
-    return pd.read_excel(caminho)
+    return df
 
 paginas = {
     "Total de desocupações no NIA": None,
@@ -213,6 +299,29 @@ app.layout = html.Div(
     },
     children=[
         dcc.Location(id="url"),
+        dcc.Store(id="link-download"),
+
+        # Formato dos arquivos baixados pelos botões 📥 de todas as abas.
+        dcc.Dropdown(
+            id="formato-download",
+            options=[
+                {"label": "Excel (.xlsx)", "value": "xlsx"},
+                {"label": "CSV (.csv.gz)", "value": "csv"},
+                {"label": "Parquet", "value": "parquet"}
+            ],
+            value="xlsx",
+            clearable=False,
+            searchable=False,
+            persistence=True,
+            style={
+                "position": "fixed",
+                "top": "275px",
+                "right": "6px",
+                "width": "130px",
+                "fontSize": "12px",
+                "zIndex": "1000"
+            }
+        ),
 
         html.Div(
             style={
@@ -237,6 +346,32 @@ app.layout = html.Div(
                     ]
                 ),
 
+                html.Div(
+                    style={"display": "flex", "alignItems": "center", "gap": "10px"},
+                    children=[
+                        html.Button(
+                            "Exportar todas as abas",
+                            id="btn-exportar-todas",
+                            style={
+                                "backgroundColor": "#EAF0F6",
+                                "color": "#2C3E50",
+                                "border": "1px solid #D5DBE0",
+                                "borderRadius": "6px",
+                                "padding": "6px 14px",
+                                "fontSize": "13px",
+                                "fontWeight": "600",
+                                "cursor": "pointer"
+                            }
+                        ),
+                        html.Span(
+                            id="status-exportacao-todas",
+                            style={"fontSize": "13px", "color": "#555"}
+                        ),
+                        dcc.Store(id="tarefa-exportacao-todas"),
+                        dcc.Interval(id="intervalo-exportacao-todas", interval=1000, disabled=True)
+                    ]
+                ),
+
                 html.A(
                     "Sair",
                     href="/logout",
@@ -290,6 +425,14 @@ app.layout = html.Div(
     ]
 )
 
+# Os callbacks de download devolvem só o link do arquivo gerado; o
+# navegador baixa direto da rota /exportacoes (assets/downloads.js).
+app.clientside_callback(
+    ClientsideFunction(namespace="downloads", function_name="abrir_link"),
+    Input("link-download", "data"),
+    prevent_initial_call=True
+)
+
 @app.callback(
     Output("url", "pathname"),
     Input("btn-logout", "n_clicks"),
@@ -388,29 +531,36 @@ def atualizar_dashboard_total(clickData, filtro_dropdown):
     if df is None:
         return dash.no_update, dash.no_update, dash.no_update
 
-    layout, VALORES, LABELS, CORES, PULL, total_analisadas = layout_volume_total(df)
-
     filtro_final = filtro_dropdown or "todos"
     trigger = ctx.triggered_id
 
     if trigger == "grafico-totaldesocupacao" and clickData:
         filtro_final = clickData["points"][0]["customdata"]
 
-    fig = criar_grafico(
-        VALORES,
-        LABELS,
-        CORES,
-        PULL,
-        total_analisadas,
-        filtro_final
-    )
+    def montar_grafico():
+        layout, VALORES, LABELS, CORES, PULL, total_analisadas = layout_volume_total(df)
+        return criar_grafico(
+            VALORES,
+            LABELS,
+            CORES,
+            PULL,
+            total_analisadas,
+            filtro_final
+        )
+
+    fig = figura_em_cache(df, "total", filtro_final, montar_grafico)
 
     df_filtrado, titulo = filtrar_dataframe(df, filtro_final)
 
+    dados, total_paginas, _ = pagina_da_tabela(df_filtrado, COLUNAS_TABELA, 0, TAMANHO_PAGINA, [], "")
+
     tabela = DataTable(
+        id="tabela-total",
         columns=[{"name": c, "id": c} for c in COLUNAS_TABELA],
-        data=df_filtrado[COLUNAS_TABELA].to_dict("records"),
+        data=dados,
         page_size=15,
+        page_count=total_paginas,
+        **PAGINACAO_SERVIDOR,
         fixed_rows={"headers": True},
         style_table={
             "overflowX": "auto",
@@ -476,23 +626,45 @@ def atualizar_dashboard_total(clickData, filtro_dropdown):
             tabela
         ]
     ), filtro_final
-    
+
+@app.callback(
+    Output("tabela-total", "data"),
+    Output("tabela-total", "page_count"),
+    Output("tabela-total", "page_current"),
+    Input("tabela-total", "page_current"),
+    Input("tabela-total", "sort_by"),
+    Input("tabela-total", "filter_query"),
+    State("tabela-total", "page_size"),
+    State("filtro-desocupacao", "value"),
+    prevent_initial_call=True
+)
+def paginar_tabela_total(page_current, sort_by, filter_query, page_size, filtro):
+    df = obter_df_sessao()
+    if df is None:
+        return dash.no_update, dash.no_update, dash.no_update
+
+    df_filtrado, _ = filtrar_dataframe(df, filtro or "todos")
+
+    return pagina_da_tabela(df_filtrado, COLUNAS_TABELA, page_current, page_size, sort_by, filter_query)
+
+def tabela_exportacao_total(df, filtro_ativo):
+    df_filtrado, _ = filtrar_dataframe(df, filtro_ativo)
+    return df_filtrado[COLUNAS_TABELA]
+
 @app.callback(
-    Output("download-excel", "data"),
+    Output("link-download", "data", allow_duplicate=True),
     Input("btn-download", "n_clicks"),
     State("filtro-desocupacao", "value"),
+    State("formato-download", "value"),
     prevent_initial_call=True
 )
-def baixar_excel_total(n_clicks, filtro_ativo):
+def baixar_excel_total(n_clicks, filtro_ativo, formato):
 
     df = obter_df_sessao()
-    df_filtrado, _ = filtrar_dataframe(df, filtro_ativo)
+    if df is None:
+        return dash.no_update
 
-    return dcc.send_data_frame(
-        df_filtrado[COLUNAS_TABELA].to_excel,
-        f"desocupacoes_{filtro_ativo}.xlsx",
-        index=False
-    )
+    return {"url": exportar_tabela(df, "total", filtro_ativo, formato, lambda: tabela_exportacao_total(df, filtro_ativo), f"desocupacoes_{filtro_ativo}", current_user.id)}
 
 @app.callback(
     Output("grafico-desocupacao-nao-finalizadas", "figure"),
@@ -515,21 +687,31 @@ def atualizar_dashboard_nao_finalizadas(clickData, filtro_dropdown):
     if trigger == "grafico-desocupacao-nao-finalizadas" and clickData:
         filtro_final = clickData["points"][0]["customdata"]
 
-    fig = criar_grafico_nao_finalizadas(
-        VALORES_NF,
-        LABELS_NF,
-        CORES_NF,
-        PULL_NF,
-        total,
-        filtro_final
+    fig = figura_em_cache(
+        df,
+        "nao_finalizadas",
+        filtro_final,
+        lambda: criar_grafico_nao_finalizadas(
+            VALORES_NF,
+            LABELS_NF,
+            CORES_NF,
+            PULL_NF,
+            total,
+            filtro_final
+        )
     )
 
     df_filtrado, titulo = filtrar_dataframe_nao_finalizadas(nao_finalizados, filtro_final)
 
+    dados, total_paginas, _ = pagina_da_tabela(df_filtrado, COLUNAS_TABELA_NAO_FINALIZADAS, 0, TAMANHO_PAGINA, [], "")
+
     tabela = DataTable(
+        id="tabela-nao-finalizadas",
         columns=[{"name": c, "id": c} for c in COLUNAS_TABELA_NAO_FINALIZADAS],
-        data=df_filtrado[COLUNAS_TABELA_NAO_FINALIZADAS].to_dict("records"),
+        data=dados,
         page_size=15,
+        page_count=total_paginas,
+        **PAGINACAO_SERVIDOR,
         fixed_rows={"headers": True},
         style_table={
             "overflowX": "auto",
@@ -583,30 +765,49 @@ def atualizar_dashboard_nao_finalizadas(clickData, filtro_dropdown):
             ),
             tabela
         ]
-    ), filtro_final  
-    
+    ), filtro_final
+
 @app.callback(
-    Output("download-nao-finalizado", "data"),
-    Input("btn-download-nao-finalizado", "n_clicks"),
+    Output("tabela-nao-finalizadas", "data"),
+    Output("tabela-nao-finalizadas", "page_count"),
+    Output("tabela-nao-finalizadas", "page_current"),
+    Input("tabela-nao-finalizadas", "page_current"),
+    Input("tabela-nao-finalizadas", "sort_by"),
+    Input("tabela-nao-finalizadas", "filter_query"),
+    State("tabela-nao-finalizadas", "page_size"),
     State("filtro-desocupacao-nao-finalizadas", "value"),
     prevent_initial_call=True
 )
-def baixar_excel_nao_finalizado(n_clicks, filtro):
+def paginar_tabela_nao_finalizadas(page_current, sort_by, filter_query, page_size, filtro):
     df = obter_df_sessao()
     if df is None:
-        return dash.no_update
+        return dash.no_update, dash.no_update, dash.no_update
+
+    _, nao_finalizados, *_ = layout_nao_finalizadas(df)
+    df_filtrado, _ = filtrar_dataframe_nao_finalizadas(nao_finalizados, filtro or "todos")
+
+    return pagina_da_tabela(df_filtrado, COLUNAS_TABELA_NAO_FINALIZADAS, page_current, page_size, sort_by, filter_query)
 
+def tabela_exportacao_nao_finalizadas(df, filtro):
     nao_finalizados = df[df['Finalizado'] == False].copy()
 
     df_filtrado, _ = filtrar_dataframe_nao_finalizadas(nao_finalizados, filtro)
 
-    df_filtrado = df_filtrado[COLUNAS_TABELA_NAO_FINALIZADAS]
+    return df_filtrado[COLUNAS_TABELA_NAO_FINALIZADAS]
 
-    return dcc.send_data_frame(
-        df_filtrado.to_excel,
-        filename=f"desocupacoes_nao_finalizadas_{filtro}.xlsx",
-        index=False
-    )
+@app.callback(
+    Output("link-download", "data", allow_duplicate=True),
+    Input("btn-download-nao-finalizado", "n_clicks"),
+    State("filtro-desocupacao-nao-finalizadas", "value"),
+    State("formato-download", "value"),
+    prevent_initial_call=True
+)
+def baixar_excel_nao_finalizado(n_clicks, filtro, formato):
+    df = obter_df_sessao()
+    if df is None:
+        return dash.no_update
+
+    return {"url": exportar_tabela(df, "nao_finalizadas", filtro, formato, lambda: tabela_exportacao_nao_finalizadas(df, filtro), f"desocupacoes_nao_finalizadas_{filtro}", current_user.id)}
    
 @app.callback(
     Output("grafico-media-mensal", "figure"),
@@ -616,38 +817,44 @@ def atualizar_grafico_media(tab):
     if tab != "Média mensal de desocupações":
         return dash.no_update
 
-    caminho = session.get("arquivo_excel")
-    if not caminho:
+    df = obter_df_sessao()
+    if df is None:
         return dash.no_update
 
-    df = pd.read_excel(caminho)
-    df = df[df['Finalizado'] == True].copy()
-
+    # calcular_media_mensal já filtra as finalizadas; com o dataset inteiro
+    # a média mensal vem das métricas gravadas no upload.
     _, criar_grafico_media = criar_layout_media_mensal(df)
-    return criar_grafico_media()
+    return figura_em_cache(df, "media_mensal", None, criar_grafico_media)
 
 @app.callback(
     Output("tabela-media-mensall", "data"),
+    Output("tabela-media-mensall", "page_count"),
+    Output("tabela-media-mensall", "page_current"),
     Input("tabs-menu", "value"),
     Input("grafico-media-mensal", "clickData"),
     Input("grafico-media-mensal", "relayoutData"),
+    Input("tabela-media-mensall", "page_current"),
+    Input("tabela-media-mensall", "sort_by"),
+    Input("tabela-media-mensall", "filter_query"),
+    State("tabela-media-mensall", "page_size")
 )
-def atualizar_tabela_media(tab, clickData, relayoutData):
+def atualizar_tabela_media(tab, clickData, relayoutData, page_current, sort_by, filter_query, page_size):
 
     if tab != "Média mensal de desocupações":
-        return dash.no_update
+        return dash.no_update, dash.no_update, dash.no_update
 
-    caminho = session.get("arquivo_excel")
-    if not caminho:
-        return dash.no_update
+    df = obter_df_sessao()
+    if df is None:
+        return dash.no_update, dash.no_update, dash.no_update
+
+    pagina_atual = page_current if mudou_apenas_pagina("tabela-media-mensall", ctx.triggered_prop_ids) else 0
 
-    df = pd.read_excel(caminho)
     df = df[df['Finalizado'] == True].copy()
     df['Data_fim_desocupacao'] = pd.to_datetime(df['Data_fim_desocupacao'])
     df['mes_ano'] = df['Data_fim_desocupacao'].dt.to_period('M').astype(str)
 
     if relayoutData and relayoutData.get("reset_tabela"):
-        return df[COLUNAS_TABELA_MEDIA_MENSAL].to_dict("records")
+        return pagina_da_tabela(df, COLUNAS_TABELA_MEDIA_MENSAL, pagina_atual, page_size, sort_by, filter_query)
 
     if clickData and 'points' in clickData and clickData['points']:
         point0 = clickData['points'][0]
@@ -657,40 +864,41 @@ def atualizar_tabela_media(tab, clickData, relayoutData):
             if mes_selecionado:
                 df = df[df['mes_ano'] == mes_selecionado]
 
-    return df[COLUNAS_TABELA_MEDIA_MENSAL].to_dict("records")
+    return pagina_da_tabela(df, COLUNAS_TABELA_MEDIA_MENSAL, pagina_atual, page_size, sort_by, filter_query)
     
+def tabela_exportacao_media_mensal(df):
+    return df.loc[df['Finalizado'] == True, COLUNAS_TABELA_MEDIA_MENSAL]
+
 @app.callback(
-    Output("download-media-mensal", "data"),
+    Output("link-download", "data", allow_duplicate=True),
     Input("btn-download-media-mensal", "n_clicks"),
+    State("formato-download", "value"),
     prevent_initial_call=True
 )
-def baixar_excel_media_mensal(n_clicks):
+def baixar_excel_media_mensal(n_clicks, formato):
     df = obter_df_sessao()
     if df is None or df.empty:
         return dash.no_update
 
-    df_f = df[df['Finalizado'] == True].copy()
-    df_f = df_f[COLUNAS_TABELA_MEDIA_MENSAL]
-
-    return dcc.send_data_frame(
-        df_f.to_excel,
-        filename="media_mensal.xlsx",
-        index=False
-    )
+    return {"url": exportar_tabela(df, "media_mensal", None, formato, lambda: tabela_exportacao_media_mensal(df), "media_mensal", current_user.id)}
     
 @app.callback(
     Output("grafico-reparos-imobiliaria", "figure"),
     Output("tabela-reparos-imobiliaria", "data"),
+    Output("tabela-reparos-imobiliaria", "page_count"),
+    Output("tabela-reparos-imobiliaria", "page_current"),
     Input("filtro-reparos-imobiliaria", "value"),
-    Input("grafico-reparos-imobiliaria", "restyleData")
+    Input("grafico-reparos-imobiliaria", "restyleData"),
+    Input("tabela-reparos-imobiliaria", "page_current"),
+    Input("tabela-reparos-imobiliaria", "sort_by"),
+    Input("tabela-reparos-imobiliaria", "filter_query"),
+    State("tabela-reparos-imobiliaria", "page_size")
 )
-def atualizar_grafico_reparos_imobiliaria(meses, restyle_data):
-    caminho = session.get("arquivo_excel")
-    if not caminho:
-        return dash.no_update, dash.no_update, dash.no_update
-    
-    df = pd.read_excel(caminho)
-    
+def atualizar_grafico_reparos_imobiliaria(meses, restyle_data, page_current, sort_by, filter_query, page_size):
+    df = obter_df_sessao()
+    if df is None:
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update
+
     layout, df_base, criar_grafico = criar_layout_reparos_imobiliaria(df)
     
     df_filtrado = (
@@ -717,8 +925,6 @@ def atualizar_grafico_reparos_imobiliaria(meses, restyle_data):
                 elif trace_index == 1:  # Reparos com a imobiliária
                     visivel_imobiliaria = 0.2 if visible == 'legendonly' else 0.85
 
-    figura = criar_grafico(df_filtrado, opacidade_total=visivel_total, opacidade_imobiliaria=visivel_imobiliaria)
-
     if visivel_total < 0.85 and visivel_imobiliaria >= 0.85:
         tabela = df_filtrado[df_filtrado['fechou_com_imobiliaria']]
     elif visivel_imobiliaria <0.85 and visivel_total >= 0.85:
@@ -726,42 +932,58 @@ def atualizar_grafico_reparos_imobiliaria(meses, restyle_data):
     else:
         tabela = df_filtrado.copy()
 
-    tabela = tabela[COLUNAS_TABELA_REPAROS_IMOB].sort_values('Data_inicio_desocupacao').to_dict('records')
+    tabela = tabela.sort_values('Data_inicio_desocupacao')
 
-    return figura, tabela
+    if mudou_apenas_pagina("tabela-reparos-imobiliaria", ctx.triggered_prop_ids):
+        return (dash.no_update,) + pagina_da_tabela(tabela, COLUNAS_TABELA_REPAROS_IMOB, page_current, page_size, sort_by, filter_query)
+
+    if ctx.triggered_id == "grafico-reparos-imobiliaria":
+        # Clique na legenda só muda a opacidade das barras; a figura
+        # inteira é remontada apenas quando o filtro de meses muda.
+        figura = patch_opacidades([visivel_total, visivel_imobiliaria], visivel=True)
+    else:
+        figura = figura_em_cache(
+            df,
+            "reparos_imobiliaria",
+            meses,
+            lambda: criar_grafico(df_filtrado, opacidade_total=visivel_total, opacidade_imobiliaria=visivel_imobiliaria),
+            selecao=[visivel_total, visivel_imobiliaria]
+        )
+
+    return (figura,) + pagina_da_tabela(tabela, COLUNAS_TABELA_REPAROS_IMOB, 0, page_size, sort_by, filter_query)
     
+def tabela_exportacao_reparos_imobiliaria(df):
+    return df.loc[df['Finalizado'] == True, COLUNAS_TABELA_REPAROS_IMOB]
+
 @app.callback(
-    Output("download-reparos-imobiliaria", "data"),
+    Output("link-download", "data", allow_duplicate=True),
     Input("btn-download-reparos-imobiliaria", "n_clicks"),
+    State("formato-download", "value"),
     prevent_initial_call=True
 )
-def baixar_excel_reparos_imobiliaria(n_clicks):
+def baixar_excel_reparos_imobiliaria(n_clicks, formato):
     df = obter_df_sessao()
     if df is None or df.empty:
         return dash.no_update
 
-    df_f = df[df['Finalizado'] == True].copy()
-
-    df_f = df_f[COLUNAS_TABELA_REPAROS_IMOB]
-
-    return dcc.send_data_frame(
-        df_f.to_excel,
-        filename="reparos_feito_pela_imobiliaria.xlsx",
-        index=False
-    )
+    return {"url": exportar_tabela(df, "reparos_imobiliaria", None, formato, lambda: tabela_exportacao_reparos_imobiliaria(df), "reparos_feito_pela_imobiliaria", current_user.id)}
 
 @app.callback(
     Output("grafico-reparos-inquilino", "figure"),
     Output("tabela-reparos-inquilino", "data"),
+    Output("tabela-reparos-inquilino", "page_count"),
+    Output("tabela-reparos-inquilino", "page_current"),
     Input("filtro-reparos-inquilino", "value"),
-    Input("grafico-reparos-inquilino", "restyleData")
+    Input("grafico-reparos-inquilino", "restyleData"),
+    Input("tabela-reparos-inquilino", "page_current"),
+    Input("tabela-reparos-inquilino", "sort_by"),
+    Input("tabela-reparos-inquilino", "filter_query"),
+    State("tabela-reparos-inquilino", "page_size")
 )
-def atualizar_grafico_reparos_inquilino(meses, restyle_data):
-    caminho = session.get("arquivo_excel")
-    if not caminho:
-        return dash.no_update, dash.no_update, dash.no_update
-
-    df = pd.read_excel(caminho)
+def atualizar_grafico_reparos_inquilino(meses, restyle_data, page_current, sort_by, filter_query, page_size):
+    df = obter_df_sessao()
+    if df is None:
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update
 
     layout, df_base, criar_grafico = criar_layout_reparos_inquilino(df)
 
@@ -789,8 +1011,6 @@ def atualizar_grafico_reparos_inquilino(meses, restyle_data):
                 elif trace_index == 1:  # Inquilino fez por conta
                     visivel_inquilino = 0.2 if visible == 'legendonly' else 0.85
             
-    figura = criar_grafico(df_filtrado, opacidade_total=visivel_total, opacidade_inquilino=visivel_inquilino)
-
     if visivel_total < 0.85 and visivel_inquilino >= 0.85:
         tabela = df_filtrado[df_filtrado['inquilino_fez_por_conta']]
     elif visivel_inquilino < 0.85 and visivel_total >= 0.85:
@@ -798,54 +1018,79 @@ def atualizar_grafico_reparos_inquilino(meses, restyle_data):
     else:
         tabela = df_filtrado.copy()
 
-    tabela = tabela[COLUNAS_TABELA_REPAROS_INQ].sort_values('Data_inicio_desocupacao').to_dict('records')
+    tabela = tabela.sort_values('Data_inicio_desocupacao')
 
-    return figura, tabela
+    if mudou_apenas_pagina("tabela-reparos-inquilino", ctx.triggered_prop_ids):
+        return (dash.no_update,) + pagina_da_tabela(tabela, COLUNAS_TABELA_REPAROS_INQ, page_current, page_size, sort_by, filter_query)
+
+    if ctx.triggered_id == "grafico-reparos-inquilino":
+        # Clique na legenda só muda a opacidade das barras; a figura
+        # inteira é remontada apenas quando o filtro de meses muda.
+        figura = patch_opacidades([visivel_total, visivel_inquilino], visivel=True)
+    else:
+        figura = figura_em_cache(
+            df,
+            "reparos_inquilino",
+            meses,
+            lambda: criar_grafico(df_filtrado, opacidade_total=visivel_total, opacidade_inquilino=visivel_inquilino),
+            selecao=[visivel_total, visivel_inquilino]
+        )
+
+    return (figura,) + pagina_da_tabela(tabela, COLUNAS_TABELA_REPAROS_INQ, 0, page_size, sort_by, filter_query)
+
+def tabela_exportacao_reparos_inquilino(df):
+    return df.loc[df['Finalizado'] == True, COLUNAS_TABELA_REPAROS_INQ]
 
 @app.callback(
-    Output("download-reparos-inquilino", "data"),
+    Output("link-download", "data", allow_duplicate=True),
     Input("btn-download-reparos-inquilino", "n_clicks"),
+    State("formato-download", "value"),
     prevent_initial_call=True
 )
-def baixar_excel_reparos_inquilino(n_clicks):
+def baixar_excel_reparos_inquilino(n_clicks, formato):
     df = obter_df_sessao()
     if df is None or df.empty:
         return dash.no_update
 
-    df_f = df[df['Finalizado'] == True].copy()
-
-    df_f = df_f[COLUNAS_TABELA_REPAROS_INQ]
-
-    return dcc.send_data_frame(
-        df_f.to_excel,
-        filename="reparos_feito_pelo_inquilino.xlsx",
-        index=False
-    )
+    return {"url": exportar_tabela(df, "reparos_inquilino", None, formato, lambda: tabela_exportacao_reparos_inquilino(df), "reparos_feito_pelo_inquilino", current_user.id)}
 
 @app.callback(
     Output("tabela-vistoria", "columns"),
     Output("tabela-vistoria", "data"),
+    Output("tabela-vistoria", "page_count"),
+    Output("tabela-vistoria", "page_current"),
     Input("grafico-rosca-vistoria", "clickData"),
-    Input("grafico-barras-vistoria", "clickData")
+    Input("grafico-barras-vistoria", "clickData"),
+    Input("tabela-vistoria", "page_current"),
+    Input("tabela-vistoria", "sort_by"),
+    Input("tabela-vistoria", "filter_query"),
+    State("tabela-vistoria", "page_size"),
+    State("tabela-vistoria", "columns")
 )
-def atualizar_tabela_vistoria(click_rosca, click_barra):
+def atualizar_tabela_vistoria(click_rosca, click_barra, page_current, sort_by, filter_query, page_size, colunas_atuais):
 
-    caminho = session.get("arquivo_excel")
-    if not caminho:
-        return no_update, no_update
+    df = obter_df_sessao()
+    if df is None:
+        return no_update, no_update, no_update, no_update
 
-    df = pd.read_excel(caminho)
     vistoria = df[df["Finalizado"] == 1].copy()
 
     ctx = callback_context
-    
+
+    if mudou_apenas_pagina("tabela-vistoria", ctx.triggered_prop_ids):
+        colunas = [c["id"] for c in colunas_atuais]
+        dados, total_paginas, pagina = pagina_da_tabela(vistoria, colunas, page_current, page_size, sort_by, filter_query)
+        return no_update, dados, total_paginas, pagina
+
     if not ctx.triggered:
         colunas = COLUNAS_FIXA_VISTORIA + COLUNAS_ETAPAS_VISTORIA
-        df_tabela = vistoria[colunas]
+        dados, total_paginas, pagina = pagina_da_tabela(vistoria, colunas, 0, page_size, sort_by, filter_query)
 
         return (
             [{'name': c, 'id': c} for c in colunas],
-            df_tabela.to_dict("records")
+            dados,
+            total_paginas,
+            pagina
         )
 
     grafico_disparado = ctx.triggered_id
@@ -858,24 +1103,26 @@ def atualizar_tabela_vistoria(click_rosca, click_barra):
         else:
             coluna_fase = MAPA_FASE_CURTA_PARA_COLUNA.get(label)
             if not coluna_fase:
-                return no_update, no_update
+                return no_update, no_update, no_update, no_update
             colunas = COLUNAS_FIXA_VISTORIA + [coluna_fase]
 
     elif grafico_disparado == "grafico-barras-vistoria":
         label = click_barra["points"][0]["x"]
         coluna_fase = MAPA_FASE_CURTA_PARA_COLUNA.get(label)
         if not coluna_fase:
-            return no_update, no_update
+            return no_update, no_update, no_update, no_update
         colunas = COLUNAS_FIXA_VISTORIA + [coluna_fase]
 
     else:
-        return no_update, no_update
+        return no_update, no_update, no_update, no_update
 
-    df_tabela = vistoria[colunas]
+    dados, total_paginas, pagina = pagina_da_tabela(vistoria, colunas, 0, page_size, sort_by, filter_query)
 
     return (
         [{'name': c, 'id': c} for c in colunas],
-        df_tabela.to_dict("records")
+        dados,
+        total_paginas,
+        pagina
     )
 
     layout_vistoria, criar_grafico_vistoria_pizza, criar_grafico_vistoria_barras = criar_layout_vistoria(df)
@@ -885,24 +1132,21 @@ def atualizar_tabela_vistoria(click_rosca, click_barra):
 
     return figura, tabela
 
+def tabela_exportacao_vistoria(df):
+    return df.loc[df['Finalizado'] == True, COLUNAS_FIXA_VISTORIA + COLUNAS_ETAPAS_VISTORIA]
+
 @app.callback(
-    Output("download-vistoria", "data"),
+    Output("link-download", "data", allow_duplicate=True),
     Input("btn-download-vistoria", "n_clicks"),
+    State("formato-download", "value"),
     prevent_initial_call=True
 )
-def baixar_execel_vistoria(n_clicks):
+def baixar_execel_vistoria(n_clicks, formato):
     df = obter_df_sessao()
     if df is None or df.empty:
         return dash.no_update
 
-    vistoria = df[df['Finalizado'] == True].copy()
-    vistoria = vistoria[COLUNAS_FIXA_VISTORIA + COLUNAS_ETAPAS_VISTORIA]
-
-    return dcc.send_data_frame(
-        vistoria.to_excel,
-        filename="fases-da-vistoria.xlsx",
-        index=False
-    )
+    return {"url": exportar_tabela(df, "vistoria", None, formato, lambda: tabela_exportacao_vistoria(df), "fases-da-vistoria", current_user.id)}
 
 @app.callback(
     Output("grafico-media-vistoria", "figure"),
@@ -912,39 +1156,43 @@ def atualizar_grafico_media_vistoria(tab):
     if tab != "Média mensal da fase de vistoria":
         return dash.no_update
 
-    caminho = session.get("arquivo_excel")
-    if not caminho:
+    df = obter_df_sessao()
+    if df is None:
         return dash.no_update
 
-    df = pd.read_excel(caminho)        
-    vistoria = df[df['Finalizado'] == True].copy()
-    
     layout, criar_grafico_media_vistoria = criar_layout_media_vistoria(df)
     
-    return criar_grafico_media_vistoria()
+    return figura_em_cache(df, "media_vistoria", None, criar_grafico_media_vistoria)
 
 @app.callback(
     Output("tabela-media-vistoria", "data"),
+    Output("tabela-media-vistoria", "page_count"),
+    Output("tabela-media-vistoria", "page_current"),
     Input("tabs-menu", "value"),
     Input("grafico-media-vistoria", "clickData"),
     Input("grafico-media-vistoria", "relayoutData"),
+    Input("tabela-media-vistoria", "page_current"),
+    Input("tabela-media-vistoria", "sort_by"),
+    Input("tabela-media-vistoria", "filter_query"),
+    State("tabela-media-vistoria", "page_size")
 )
-def atualizar_tabela_media(tab, clickData, relayoutData):
+def atualizar_tabela_media(tab, clickData, relayoutData, page_current, sort_by, filter_query, page_size):
     if tab != "Média mensal da fase de vistoria":
-        return dash.no_update
+        return dash.no_update, dash.no_update, dash.no_update
 
-    caminho = session.get("arquivo_excel")
-    if not caminho:
-        return dash.no_update
+    df = obter_df_sessao()
+    if df is None:
+        return dash.no_update, dash.no_update, dash.no_update
+
+    pagina_atual = page_current if mudou_apenas_pagina("tabela-media-vistoria", ctx.triggered_prop_ids) else 0
 
-    df = pd.read_excel(caminho)
     df = df[df['Finalizado'] == True].copy()
     df['Data_fim_desocupacao'] = pd.to_datetime(df['Data_fim_desocupacao'])
     df['mes_ano'] = df['Data_fim_desocupacao'].dt.to_period('M').astype(str)
 
     
     if relayoutData and relayoutData.get("reset_tabela"):
-        return df[COLUNAS_TABELA_MEDIA_VISTORIA].to_dict("records")
+        return pagina_da_tabela(df, COLUNAS_TABELA_MEDIA_VISTORIA, pagina_atual, page_size, sort_by, filter_query)
         
     if clickData and 'points' in clickData and clickData['points']:
         point0 = clickData['points'][0]
@@ -953,57 +1201,68 @@ def atualizar_tabela_media(tab, clickData, relayoutData):
             if mes_selecionado:
                 df = df[df['mes_ano'] == mes_selecionado]
     
-    return df[COLUNAS_TABELA_MEDIA_VISTORIA].to_dict("records")
+    return pagina_da_tabela(df, COLUNAS_TABELA_MEDIA_VISTORIA, pagina_atual, page_size, sort_by, filter_query)
     
+def tabela_exportacao_media_vistoria(df):
+    return df.loc[df['Finalizado'] == True, COLUNAS_TABELA_MEDIA_VISTORIA]
+
 @app.callback(
-    Output("download-media-vistoria", "data"),
+    Output("link-download", "data", allow_duplicate=True),
     Input("btn-download-media-vistoria", "n_clicks"),
+    State("formato-download", "value"),
     prevent_initial_call=True
 )
-def baixar_execel_media_vistoria(n_clicks):
+def baixar_execel_media_vistoria(n_clicks, formato):
     df = obter_df_sessao()
     if df is None or df.empty:
         return dash.no_update
 
-    vistoria = df[df['Finalizado'] == True].copy()
-    vistoria = vistoria[COLUNAS_TABELA_MEDIA_VISTORIA]
-
-    return dcc.send_data_frame(
-        vistoria.to_excel,
-        filename="media-exclusiva-fase-vistoria.xlsx",
-        index=False
-    )
+    return {"url": exportar_tabela(df, "media_vistoria", None, formato, lambda: tabela_exportacao_media_vistoria(df), "media-exclusiva-fase-vistoria", current_user.id)}
 
 @app.callback(
     Output("tabela-orcamento", "columns"),
     Output("tabela-orcamento", "data"),
+    Output("tabela-orcamento", "page_count"),
+    Output("tabela-orcamento", "page_current"),
     Input("grafico-orcamento-pizza", "clickData"),
-    Input("grafico-orcamento-barras", "clickData")
+    Input("grafico-orcamento-barras", "clickData"),
+    Input("tabela-orcamento", "page_current"),
+    Input("tabela-orcamento", "sort_by"),
+    Input("tabela-orcamento", "filter_query"),
+    State("tabela-orcamento", "page_size"),
+    State("tabela-orcamento", "columns")
 )
-def atualizar_tabela_orcamento(click_rosca, click_barra):
-    caminho = session.get("arquivo_excel")
-    if not caminho:
-        return no_update, no_update
+def atualizar_tabela_orcamento(click_rosca, click_barra, page_current, sort_by, filter_query, page_size, colunas_atuais):
+    df = obter_df_sessao()
+    if df is None:
+        return no_update, no_update, no_update, no_update
 
-    df = pd.read_excel(caminho)
     orcamento = df[df["Finalizado"] == 1].copy()
 
     ctx = callback_context
 
+    if mudou_apenas_pagina("tabela-orcamento", ctx.triggered_prop_ids):
+        colunas = [c["id"] for c in colunas_atuais]
+        dados, total_paginas, pagina = pagina_da_tabela(orcamento, colunas, page_current, page_size, sort_by, filter_query)
+        return no_update, dados, total_paginas, pagina
+
     colunas = COLUNAS_FIXA_ORCAMENTO + COLUNAS_ETAPAS_ORCAMENTO
-    df_tabela = orcamento[colunas]
 
     if not ctx.triggered:
+        dados, total_paginas, pagina = pagina_da_tabela(orcamento, colunas, 0, page_size, sort_by, filter_query)
+
         return (
             [{'name': c, 'id': c} for c in colunas],
-            df_tabela.to_dict("records")
+            dados,
+            total_paginas,
+            pagina
         )
 
     grafico_disparado = ctx.triggered_id
 
     if grafico_disparado == "grafico-orcamento-pizza":
         if not click_rosca:
-            return no_update, no_update
+            return no_update, no_update, no_update, no_update
 
         label = click_rosca["points"][0].get("label")
 
@@ -1012,27 +1271,29 @@ def atualizar_tabela_orcamento(click_rosca, click_barra):
         else:
             coluna_fase = MAPA_FASE_CURTA_PARA_ORCAMENTO.get(label)
             if not coluna_fase:
-                return no_update, no_update
+                return no_update, no_update, no_update, no_update
             colunas = COLUNAS_FIXA_ORCAMENTO + [coluna_fase]
 
     elif grafico_disparado == "grafico-orcamento-barras":
         if not click_barra:
-            return no_update, no_update
+            return no_update, no_update, no_update, no_update
 
         label = click_barra["points"][0]["x"]
         coluna_fase = MAPA_FASE_CURTA_PARA_ORCAMENTO.get(label)
         if not coluna_fase:
-            return no_update, no_update
+            return no_update, no_update, no_update, no_update
         colunas = COLUNAS_FIXA_ORCAMENTO + [coluna_fase]
 
     else:
-        return no_update, no_update
+        return no_update, no_update, no_update, no_update
 
-    df_tabela = orcamento[colunas]
+    dados, total_paginas, pagina = pagina_da_tabela(orcamento, colunas, 0, page_size, sort_by, filter_query)
 
     return (
         [{'name': c, 'id': c} for c in colunas],
-        df_tabela.to_dict("records")
+        dados,
+        total_paginas,
+        pagina
     )
 
     layout_orcamento, criar_grafico_orcamento_pizza, criar_grafico_orcamento_barras = criar_layout_orcamento(df)
@@ -1042,24 +1303,21 @@ def atualizar_tabela_orcamento(click_rosca, click_barra):
 
     return figura, tabela 
 
+def tabela_exportacao_orcamento(df):
+    return df.loc[df['Finalizado'] == True, COLUNAS_FIXA_ORCAMENTO + COLUNAS_ETAPAS_ORCAMENTO]
+
 @app.callback(
-    Output("download-orcamento", "data"),
+    Output("link-download", "data", allow_duplicate=True),
     Input("btn-download-orcamento", "n_clicks"),
+    State("formato-download", "value"),
     prevent_initial_call=True
 )
-def baixar_excel_orcamento(n_clicks):
+def baixar_excel_orcamento(n_clicks, formato):
     df = obter_df_sessao()
     if df is None or df.empty:
         return dash.no_update
 
-    orcamento = df[df['Finalizado'] == True].copy()
-    orcamento = orcamento[COLUNAS_FIXA_ORCAMENTO + COLUNAS_ETAPAS_ORCAMENTO]
-
-    return dcc.send_data_frame(
-        orcamento.to_excel,
-        filename="fases-de-orcamento.xlsx",
-        index=False
-    )
+    return {"url": exportar_tabela(df, "orcamento", None, formato, lambda: tabela_exportacao_orcamento(df), "fases-de-orcamento", current_user.id)}
           
 @app.callback(
     Output("grafico-media-orcamento", "figure"),
@@ -1069,39 +1327,43 @@ def atualizar_grafico_media_orcamento(tab):
     if tab != "Média mensal da fase de orçamento":
         return dash.no_update
         
-    caminho = session.get("arquivo_excel")
-    if not caminho:
+    df = obter_df_sessao()
+    if df is None:
         return dash.no_update
 
-    df = pd.read_excel(caminho)
-    orcamento = df[df['Finalizado'] == True].copy()
-
     layout, criar_grafico_media_orcamento = criar_layout_media_orcamento(df)
-     
-    return criar_grafico_media_orcamento()
+
+    return figura_em_cache(df, "media_orcamento", None, criar_grafico_media_orcamento)
 
 @app.callback(
     Output("tabela-media-orcamento", "data"),
+    Output("tabela-media-orcamento", "page_count"),
+    Output("tabela-media-orcamento", "page_current"),
     Input("tabs-menu", "value"),
     Input("grafico-media-orcamento", "clickData"),
     Input("grafico-media-orcamento", "relayoutData"),
+    Input("tabela-media-orcamento", "page_current"),
+    Input("tabela-media-orcamento", "sort_by"),
+    Input("tabela-media-orcamento", "filter_query"),
+    State("tabela-media-orcamento", "page_size")
 )
-def atualizar_tabela_media_orcamento(tab, clickData, relayoutData):
+def atualizar_tabela_media_orcamento(tab, clickData, relayoutData, page_current, sort_by, filter_query, page_size):
 
     if tab != "Média mensal da fase de orçamento":
-        return dash.no_update
+        return dash.no_update, dash.no_update, dash.no_update
 
-    caminho = session.get("arquivo_excel")
-    if not caminho:
-        return dash.no_update
+    df = obter_df_sessao()
+    if df is None:
+        return dash.no_update, dash.no_update, dash.no_update
+
+    pagina_atual = page_current if mudou_apenas_pagina("tabela-media-orcamento", ctx.triggered_prop_ids) else 0
 
-    df = pd.read_excel(caminho)
     df = df[df['Finalizado'] == True].copy()
     df['Data_fim_desocupacao'] = pd.to_datetime(df['Data_fim_desocupacao'])
     df['mes_ano'] = df['Data_fim_desocupacao'].dt.to_period('M').astype(str)
     
     if relayoutData and relayoutData.get("reset_tabela"):
-        return df[COLUNAS_TABELA_MEDIA_ORCAMENTO].to_dict("records")
+        return pagina_da_tabela(df, COLUNAS_TABELA_MEDIA_ORCAMENTO, pagina_atual, page_size, sort_by, filter_query)
 
     if clickData and 'points' in clickData and clickData['points']:
         point0 = clickData['points'][0]
@@ -1111,57 +1373,68 @@ def atualizar_tabela_media_orcamento(tab, clickData, relayoutData):
             if mes_selecionado:
                 df = df[df['mes_ano'] == mes_selecionado]
 
-    return df[COLUNAS_TABELA_MEDIA_ORCAMENTO].to_dict('records')
+    return pagina_da_tabela(df, COLUNAS_TABELA_MEDIA_ORCAMENTO, pagina_atual, page_size, sort_by, filter_query)
     
+def tabela_exportacao_media_orcamento(df):
+    return df.loc[df['Finalizado'] == True, COLUNAS_TABELA_MEDIA_ORCAMENTO]
+
 @app.callback(
-    Output("download-media-orcamento", "data"),
+    Output("link-download", "data", allow_duplicate=True),
     Input("btn-download-media-orcamento", "n_clicks"),
+    State("formato-download", "value"),
     prevent_initial_call=True
 )
-def baixar_excel_media_orcamento(n_clicks): 
+def baixar_excel_media_orcamento(n_clicks, formato): 
     df = obter_df_sessao()
     if df is None or df.empty:
         return dash.no_update
 
-    orcamento = df[df['Finalizado'] == True].copy()
-    orcamento = orcamento[COLUNAS_TABELA_MEDIA_ORCAMENTO]
-
-    return dcc.send_data_frame(
-        orcamento.to_excel,
-        filename="media-exclusiva-fase-orcamento.xlsx",
-        index=False
-    )
+    return {"url": exportar_tabela(df, "media_orcamento", None, formato, lambda: tabela_exportacao_media_orcamento(df), "media-exclusiva-fase-orcamento", current_user.id)}
     
 @app.callback(
     Output("tabela-desocupacao", "columns"),
     Output("tabela-desocupacao", "data"),
+    Output("tabela-desocupacao", "page_count"),
+    Output("tabela-desocupacao", "page_current"),
     Input("grafico-desocupacao-pizza", "clickData"),
-    Input("grafico-desocupacao-barras", "clickData")
+    Input("grafico-desocupacao-barras", "clickData"),
+    Input("tabela-desocupacao", "page_current"),
+    Input("tabela-desocupacao", "sort_by"),
+    Input("tabela-desocupacao", "filter_query"),
+    State("tabela-desocupacao", "page_size"),
+    State("tabela-desocupacao", "columns")
 )
-def atualizar_tabela_desocupacao(click_pizza, click_barra):
-    caminho = session.get("arquivo_excel")
-    if not caminho:
-        return no_update, no_update
+def atualizar_tabela_desocupacao(click_pizza, click_barra, page_current, sort_by, filter_query, page_size, colunas_atuais):
+    df = obter_df_sessao()
+    if df is None:
+        return no_update, no_update, no_update, no_update
 
-    df = pd.read_excel(caminho)
     desocupacao = df[df["Finalizado"] == 1].copy()
 
     ctx = callback_context
 
+    if mudou_apenas_pagina("tabela-desocupacao", ctx.triggered_prop_ids):
+        colunas = [c["id"] for c in colunas_atuais]
+        dados, total_paginas, pagina = pagina_da_tabela(desocupacao, colunas, page_current, page_size, sort_by, filter_query)
+        return no_update, dados, total_paginas, pagina
+
     colunas = COLUNAS_FIXA_DESOCUPACAO + COLUNAS_ETAPAS_DESOCUPACAO
-    df_tabela = desocupacao[colunas]
 
-    if not ctx.triggered: 
+    if not ctx.triggered:
+        dados, total_paginas, pagina = pagina_da_tabela(desocupacao, colunas, 0, page_size, sort_by, filter_query)
+
         return (
             [{'name': c, 'id': c} for c in colunas],
-            df_tabela.to_dict("records")
+            dados,
+            total_paginas,
+            pagina
         )
 
     grafico_disparado = ctx.triggered_id
 
     if grafico_disparado == "grafico-desocupacao-pizza":
         if not click_pizza:
-            return no_update, no_update
+            return no_update, no_update, no_update, no_update
 
         label = click_pizza["points"][0].get("label")
 
@@ -1170,26 +1443,28 @@ def atualizar_tabela_desocupacao(click_pizza, click_barra):
         else:
             coluna_fase = MAPA_FASE_CURTA_PARA_DESOCUPACAO.get(label)
             if not coluna_fase:
-                return no_update, no_update
+                return no_update, no_update, no_update, no_update
             colunas = COLUNAS_FIXA_DESOCUPACAO + [coluna_fase]
 
     elif grafico_disparado == "grafico-desocupacao-barras":
         if not click_barra:
-            return no_update, no_update
+            return no_update, no_update, no_update, no_update
             
         label = click_barra["points"][0]["x"]
         coluna_fase = MAPA_FASE_CURTA_PARA_DESOCUPACAO.get(label)
         if not coluna_fase:
-            return no_update, no_update
+            return no_update, no_update, no_update, no_update
         colunas = COLUNAS_FIXA_DESOCUPACAO + [coluna_fase]
     else:
-        return no_update, no_update
+        return no_update, no_update, no_update, no_update
 
-    df_tabela = desocupacao[colunas]
+    dados, total_paginas, pagina = pagina_da_tabela(desocupacao, colunas, 0, page_size, sort_by, filter_query)
 
     return (
         [{'name': c, 'id': c} for c in colunas],
-        df_tabela.to_dict("records")
+        dados,
+        total_paginas,
+        pagina
     )
 
     layout_desocupacao, criar_grafico_desocupacao_pizza, criar_grafico_desocupacao_barras = criar_layout_desocupacao(df)
@@ -1199,24 +1474,21 @@ def atualizar_tabela_desocupacao(click_pizza, click_barra):
 
     return figura, tabela
 
+def tabela_exportacao_desocupacao(df):
+    return df.loc[df['Finalizado'] == True, COLUNAS_FIXA_DESOCUPACAO + COLUNAS_ETAPAS_DESOCUPACAO]
+
 @app.callback(
-    Output("download-desocupacao", "data"),
+    Output("link-download", "data", allow_duplicate=True),
     Input("btn-download-desocupacao", "n_clicks"),
+    State("formato-download", "value"),
     prevent_initial_call=True
 )
-def baixar_excel_desocupacao(n_clicks):
+def baixar_excel_desocupacao(n_clicks, formato):
     df = obter_df_sessao()
     if df is None or df.empty:
         return dash.no_update
 
-    desocupacao = df[df['Finalizado'] == True].copy()
-    desocupacao = desocupacao[COLUNAS_FIXA_DESOCUPACAO + COLUNAS_ETAPAS_DESOCUPACAO]
-
-    return dcc.send_data_frame(
-        desocupacao.to_excel,
-        filename="fases-da-desocupacao.xlsx", 
-        index=False
-    )
+    return {"url": exportar_tabela(df, "desocupacao", None, formato, lambda: tabela_exportacao_desocupacao(df), "fases-da-desocupacao", current_user.id)}
 
 @app.callback(
     Output("grafico-media-desocupacao", "figure"),
@@ -1226,38 +1498,42 @@ def atualizar_grafico_media_desocupacao(tab):
     if tab != "Média mensal da fase de desocupação":
         return dash.no_update
 
-    caminho = session.get("arquivo_excel")
-    if not caminho:
+    df = obter_df_sessao()
+    if df is None:
         return dash.no_update
 
-    df = pd.read_excel(caminho)
-    desocupacao = df[df["Finalizado"] == True].copy()
-    
     layout, criar_grafico_media_desocupacao = criar_layout_media_desocupacao(df)
 
-    return criar_grafico_media_desocupacao()
+    return figura_em_cache(df, "media_desocupacao", None, criar_grafico_media_desocupacao)
 
 @app.callback(
     Output("tabela-media-desocupacao", "data"),
+    Output("tabela-media-desocupacao", "page_count"),
+    Output("tabela-media-desocupacao", "page_current"),
     Input("tabs-menu", "value"),
     Input("grafico-media-desocupacao", "clickData"),
     Input("grafico-media-desocupacao", "relayoutData"),
+    Input("tabela-media-desocupacao", "page_current"),
+    Input("tabela-media-desocupacao", "sort_by"),
+    Input("tabela-media-desocupacao", "filter_query"),
+    State("tabela-media-desocupacao", "page_size")
 )
-def atualizar_tabela_media_desocupacao(tab, clickData, relayoutData):
+def atualizar_tabela_media_desocupacao(tab, clickData, relayoutData, page_current, sort_by, filter_query, page_size):
     if tab != "Média mensal da fase de desocupação":
-        return dash.no_update
+        return dash.no_update, dash.no_update, dash.no_update
 
-    caminho = session.get("arquivo_excel")
-    if not caminho:
-        return dash.no_update
+    df = obter_df_sessao()
+    if df is None:
+        return dash.no_update, dash.no_update, dash.no_update
+
+    pagina_atual = page_current if mudou_apenas_pagina("tabela-media-desocupacao", ctx.triggered_prop_ids) else 0
 
-    df = pd.read_excel(caminho)
     df = df[df['Finalizado'] == True].copy()
     df['Data_fim_desocupacao'] = pd.to_datetime(df['Data_fim_desocupacao'])
     df['mes_ano'] = df['Data_fim_desocupacao'].dt.to_period('M').astype(str)
 
     if relayoutData and relayoutData.get("reset_tabela"):
-        return df[COLUNAS_TABELA_MEDIA_DESOCUPACAO].to_dict("records")
+        return pagina_da_tabela(df, COLUNAS_TABELA_MEDIA_DESOCUPACAO, pagina_atual, page_size, sort_by, filter_query)
 
     if clickData and 'points' in clickData and clickData['points']:
         point0 = clickData['points'][0]
@@ -1267,26 +1543,23 @@ def atualizar_tabela_media_desocupacao(tab, clickData, relayoutData):
             if mes_selecionado:
                 df = df[df['mes_ano'] == mes_selecionado]
 
-    return df[COLUNAS_TABELA_MEDIA_DESOCUPACAO].to_dict('records')
+    return pagina_da_tabela(df, COLUNAS_TABELA_MEDIA_DESOCUPACAO, pagina_atual, page_size, sort_by, filter_query)
+
+def tabela_exportacao_media_desocupacao(df):
+    return df.loc[df['Finalizado'] == True, COLUNAS_TABELA_MEDIA_DESOCUPACAO]
 
 @app.callback(
-    Output("download-media-desocupacao", "data"),
+    Output("link-download", "data", allow_duplicate=True),
     Input("btn-download-media-desocupacao", "n_clicks"),
+    State("formato-download", "value"),
     prevent_initial_call=True
 )
-def baixar_execel_media_desocupacao(n_clicks):
+def baixar_execel_media_desocupacao(n_clicks, formato):
     df = obter_df_sessao()
     if df is None or df.empty:
         return dash.no_update
         
-    desocupacao = df[df['Finalizado'] == True].copy()
-    desocupacao = desocupacao[COLUNAS_TABELA_MEDIA_DESOCUPACAO]
-
-    return dcc.send_data_frame(
-        desocupacao.to_excel,
-        filename="media-exclusiva-fase-desocupacao.xlsx",
-        index=False
-    ) 
+    return {"url": exportar_tabela(df, "media_desocupacao", None, formato, lambda: tabela_exportacao_media_desocupacao(df), "media-exclusiva-fase-desocupacao", current_user.id)}
 
 @app.callback(
     Output("grafico-imovel-sem-pendencia", "figure"),
@@ -1300,31 +1573,38 @@ def atualizar_dashboard_sem_pendencias(clickData, filtro_dropdown):
     if df is None:
         return dash.no_update, dash.no_update, dash.no_update
 
-    layout, VALORES_SP, LABELS_SP, CORES_SP, PULL_SP, total_sp, qtd_com_data, qtd_sem_data = criar_layout_imovel_sem_pendencias(df)
-
     filtro_final = filtro_dropdown or "todos"
     trigger = ctx.triggered_id
 
     if trigger == "grafico-imovel-sem-pendencia" and clickData:
         filtro_final = clickData["points"][0]["customdata"]
 
-    fig = criar_grafico_sem_pendencias(
-        VALORES_SP,
-        LABELS_SP,
-        CORES_SP,
-        PULL_SP,
-        total_sp,
-        qtd_com_data,
-        qtd_sem_data,
-        filtro_final
-    )
+    def montar_grafico():
+        layout, VALORES_SP, LABELS_SP, CORES_SP, PULL_SP, total_sp, qtd_com_data, qtd_sem_data = criar_layout_imovel_sem_pendencias(df)
+        return criar_grafico_sem_pendencias(
+            VALORES_SP,
+            LABELS_SP,
+            CORES_SP,
+            PULL_SP,
+            total_sp,
+            qtd_com_data,
+            qtd_sem_data,
+            filtro_final
+        )
+
+    fig = figura_em_cache(df, "sem_pendencias", filtro_final, montar_grafico)
 
     df_filtrado, titulo = filtrar_dataframe_sem_pendencias(df, filtro_final)
 
+    dados, total_paginas, _ = pagina_da_tabela(df_filtrado, COLUNAS_TABELA_SEM_PENDENCIAS, 0, TAMANHO_PAGINA, [], "")
+
     tabela = DataTable(
+        id="tabela-sem-pendencia",
         columns=[{"name": c, "id": c} for c in COLUNAS_TABELA_SEM_PENDENCIAS],
-        data=df_filtrado[COLUNAS_TABELA_SEM_PENDENCIAS].to_dict("records"),
+        data=dados,
         page_size=15,
+        page_count=total_paginas,
+        **PAGINACAO_SERVIDOR,
         fixed_rows={"headers": True},
         style_table={
             "overflowX": "auto",
@@ -1380,46 +1660,82 @@ def atualizar_dashboard_sem_pendencias(clickData, filtro_dropdown):
             tabela
         ]
     ), filtro_final
-    
+
 @app.callback(
-    Output("download-excel-sem-pendencia", "data"),
+    Output("tabela-sem-pendencia", "data"),
+    Output("tabela-sem-pendencia", "page_count"),
+    Output("tabela-sem-pendencia", "page_current"),
+    Input("tabela-sem-pendencia", "page_current"),
+    Input("tabela-sem-pendencia", "sort_by"),
+    Input("tabela-sem-pendencia", "filter_query"),
+    State("tabela-sem-pendencia", "page_size"),
+    State("filtro-imovel-sem-pendencia", "value"),
+    prevent_initial_call=True
+)
+def paginar_tabela_sem_pendencia(page_current, sort_by, filter_query, page_size, filtro):
+    df = obter_df_sessao()
+    if df is None:
+        return dash.no_update, dash.no_update, dash.no_update
+
+    df_filtrado, _ = filtrar_dataframe_sem_pendencias(df, filtro or "todos")
+
+    return pagina_da_tabela(df_filtrado, COLUNAS_TABELA_SEM_PENDENCIAS, page_current, page_size, sort_by, filter_query)
+
+def tabela_exportacao_sem_pendencia(df, filtro_ativo):
+    df_filtrado, _ = filtrar_dataframe(df, filtro_ativo)
+    return df_filtrado[COLUNAS_TABELA_SEM_PENDENCIAS]
+
+@app.callback(
+    Output("link-download", "data", allow_duplicate=True),
     Input("btn-download-sem-pendencia", "n_clicks"),
     State("filtro-imovel-sem-pendencia", "value"),
+    State("formato-download", "value"),
     prevent_initial_call=True
 )
-def baixar_excel_sem_pendencia(n_clicks, filtro_ativo):
+def baixar_excel_sem_pendencia(n_clicks, filtro_ativo, formato):
 
     df = obter_df_sessao()
-    df_filtrado, _ = filtrar_dataframe(df, filtro_ativo)
+    if df is None:
+        return dash.no_update
 
-    return dcc.send_data_frame(
-        df_filtrado[COLUNAS_TABELA_SEM_PENDENCIAS].to_excel,
-        f"desocupacoes_sem_pendencia{filtro_ativo}.xlsx",
-        index=False
-    )
+    return {"url": exportar_tabela(df, "sem_pendencia", filtro_ativo, formato, lambda: tabela_exportacao_sem_pendencia(df, filtro_ativo), f"desocupacoes_sem_pendencia{filtro_ativo}", current_user.id)}
 
-@app.callback(
-    Output("grafico-passou-sem-pendencias", "figure"),
+# A seleção e o destaque das barras ficam no navegador (assets/selecao.js).
+app.clientside_callback(
+    ClientsideFunction(namespace="selecao", function_name="alternar_grupo"),
     Output("filtro-passou-sp", "data"),
-    Output("tabela-passou-sp", "children"),
+    Output("grafico-passou-sem-pendencias", "figure"),
     Input("grafico-passou-sem-pendencias", "clickData"),
-    State("filtro-passou-sp", "data")
+    State("filtro-passou-sp", "data"),
+    State("grafico-passou-sem-pendencias", "figure"),
+    prevent_initial_call=True
 )
-def atualizar_grafico_passou_sp(clickData, selected_groups):
-    df = obter_df_sessao()
-    imoveis_com_data, contagem_fases = processar_dados_passou_sp(df)
-    total = len(imoveis_com_data)
 
-    selected_groups = atualizar_grupos_selecionados(contagem_fases, clickData, selected_groups)
+@app.callback(
+    Output("tabela-passou-sp", "children"),
+    Input("filtro-passou-sp", "data")
+)
+def atualizar_tabela_passou_sp(selected_groups):
+    df = obter_df_sessao()
+    if df is None:
+        return dash.no_update
 
-    fig = criar_grafico_passou_sem_pendencias(contagem_fases, total, selected_groups)
+    imoveis_com_data, contagem_fases = processar_dados_passou_sp(df)
 
+    # Sem seleção valem todas as barras do gráfico, não todas as linhas: os
+    # imóveis sem fase encontrada não entram em nenhuma barra.
+    selected_groups = selected_groups or list(contagem_fases.index)
     df_grupo = imoveis_com_data[imoveis_com_data["fase_encontrada"].isin(selected_groups)]
 
-    tabela = DataTable( 
+    dados, total_paginas, _ = pagina_da_tabela(df_grupo, COLUNAS_TABELA_PASSOU_SP, 0, TAMANHO_PAGINA, [], "")
+
+    tabela = DataTable(
+        id="tabela-passou-sp-dados",
         columns=[{"name": c, "id": c} for c in COLUNAS_TABELA_PASSOU_SP],
-        data=df_grupo[COLUNAS_TABELA_PASSOU_SP].to_dict("records"),
+        data=dados,
         page_size=15,
+        page_count=total_paginas,
+        **PAGINACAO_SERVIDOR,
         fixed_rows={"headers": True},
         style_table={
             "overflowX": "auto",
@@ -1460,16 +1776,31 @@ def atualizar_grafico_passou_sp(clickData, selected_groups):
         ]
     )
 
-    return fig, selected_groups, tabela
+    return tabela
 
 @app.callback(
-    Output("download-excel-passou-sp", "data"),
-    Input("btn-download-passou-sp", "n_clicks"),
-    State("filtro-passou-sp", "value"),  
+    Output("tabela-passou-sp-dados", "data"),
+    Output("tabela-passou-sp-dados", "page_count"),
+    Output("tabela-passou-sp-dados", "page_current"),
+    Input("tabela-passou-sp-dados", "page_current"),
+    Input("tabela-passou-sp-dados", "sort_by"),
+    Input("tabela-passou-sp-dados", "filter_query"),
+    State("tabela-passou-sp-dados", "page_size"),
+    State("filtro-passou-sp", "data"),
     prevent_initial_call=True
 )
-def baixar_excel_passou_sp(n_clicks, selected_groups):
+def paginar_tabela_passou_sp(page_current, sort_by, filter_query, page_size, selected_groups):
     df = obter_df_sessao()
+    if df is None:
+        return dash.no_update, dash.no_update, dash.no_update
+
+    imoveis_com_data, contagem_fases = processar_dados_passou_sp(df)
+    selected_groups = selected_groups or list(contagem_fases.index)
+    imoveis_com_data = imoveis_com_data[imoveis_com_data["fase_encontrada"].isin(selected_groups)]
+
+    return pagina_da_tabela(imoveis_com_data, COLUNAS_TABELA_PASSOU_SP, page_current, page_size, sort_by, filter_query)
+
+def tabela_exportacao_passou_sp(df, selected_groups):
     imoveis_com_data, _ = processar_dados_passou_sp(df)
 
     if selected_groups is None or len(selected_groups) == 0:
@@ -1477,36 +1808,59 @@ def baixar_excel_passou_sp(n_clicks, selected_groups):
 
     df_export = imoveis_com_data[imoveis_com_data["fase_encontrada"].isin(selected_groups)]
 
-    df_export = df_export[COLUNAS_TABELA_PASSOU_SP]
-
-    return dcc.send_data_frame(
-        df_export.to_excel,
-        f"passou_pela_fase_imovel_sp.xlsx",
-        index=False
-    )
+    return df_export[COLUNAS_TABELA_PASSOU_SP]
 
 @app.callback(
-    Output("grafico-liberacao", "figure"),
+    Output("link-download", "data", allow_duplicate=True),
+    Input("btn-download-passou-sp", "n_clicks"),
+    State("filtro-passou-sp", "value"),  
+    State("formato-download", "value"),
+    prevent_initial_call=True
+)
+def baixar_excel_passou_sp(n_clicks, selected_groups, formato):
+    df = obter_df_sessao()
+    if df is None:
+        return dash.no_update
+
+    # A ordem dos cliques não muda o arquivo; sem seleção, vão todas as fases.
+    filtro = sorted(selected_groups) if selected_groups else None
+
+    return {"url": exportar_tabela(df, "passou_sp", filtro, formato, lambda: tabela_exportacao_passou_sp(df, selected_groups), f"passou_pela_fase_imovel_sp", current_user.id)}
+
+app.clientside_callback(
+    ClientsideFunction(namespace="selecao", function_name="alternar_grupo"),
     Output("filtro-liberacao", "data"),
-    Output("tabela-liberacao", "children"),
+    Output("grafico-liberacao", "figure"),
     Input("grafico-liberacao", "clickData"),
-    State("filtro-liberacao", "data")
+    State("filtro-liberacao", "data"),
+    State("grafico-liberacao", "figure"),
+    prevent_initial_call=True
 )
-def atualizar_grafico_e_tabela(clickData, selected_groups):
-    df = obter_df_sessao()
-    df_filtrado, contagem_grupo = processar_dados_liberacao(df)
-    total = len(df_filtrado)
 
-    selected_groups = atualizar_grupos_selecionados(contagem_grupo, clickData, selected_groups)
+@app.callback(
+    Output("tabela-liberacao", "children"),
+    Input("filtro-liberacao", "data")
+)
+def atualizar_tabela_liberacao(selected_groups):
+    df = obter_df_sessao()
+    if df is None:
+        return dash.no_update
 
-    fig = criar_grafico_liberacao_vistoria(contagem_grupo, total, selected_groups)
+    df_filtrado, contagem_grupo = processar_dados_liberacao(df)
 
+    # Sem seleção valem todas as barras do gráfico, como em passou_sp.
+    selected_groups = selected_groups or list(contagem_grupo.index)
     df_grupo = df_filtrado[df_filtrado["grupo_vistoria"].isin(selected_groups)]
 
-    tabela = DataTable( 
+    dados, total_paginas, _ = pagina_da_tabela(df_grupo, COLUNAS_TABELA_LIBERACAO, 0, TAMANHO_PAGINA, [], "")
+
+    tabela = DataTable(
+        id="tabela-liberacao-dados",
         columns=[{"name": c, "id": c} for c in COLUNAS_TABELA_LIBERACAO],
-        data=df_grupo[COLUNAS_TABELA_LIBERACAO].to_dict("records"),
+        data=dados,
         page_size=15,
+        page_count=total_paginas,
+        **PAGINACAO_SERVIDOR,
         fixed_rows={"headers": True},
         style_table={
             "overflowX": "auto",
@@ -1547,16 +1901,31 @@ def atualizar_grafico_e_tabela(clickData, selected_groups):
         ]
     )
 
-    return fig, selected_groups, html.Div([tabela])
+    return html.Div([tabela])
 
 @app.callback(
-    Output("download-excel-liberacao", "data"),
-    Input("btn-download-liberacao", "n_clicks"),
-    State("filtro-liberacao", "value"),  
+    Output("tabela-liberacao-dados", "data"),
+    Output("tabela-liberacao-dados", "page_count"),
+    Output("tabela-liberacao-dados", "page_current"),
+    Input("tabela-liberacao-dados", "page_current"),
+    Input("tabela-liberacao-dados", "sort_by"),
+    Input("tabela-liberacao-dados", "filter_query"),
+    State("tabela-liberacao-dados", "page_size"),
+    State("filtro-liberacao", "data"),
     prevent_initial_call=True
 )
-def baixar_excel_liberacao(n_clicks, selected_groups):
+def paginar_tabela_liberacao(page_current, sort_by, filter_query, page_size, selected_groups):
     df = obter_df_sessao()
+    if df is None:
+        return dash.no_update, dash.no_update, dash.no_update
+
+    df_filtrado, contagem_grupo = processar_dados_liberacao(df)
+    selected_groups = selected_groups or list(contagem_grupo.index)
+    df_filtrado = df_filtrado[df_filtrado["grupo_vistoria"].isin(selected_groups)]
+
+    return pagina_da_tabela(df_filtrado, COLUNAS_TABELA_LIBERACAO, page_current, page_size, sort_by, filter_query)
+
+def tabela_exportacao_liberacao(df, selected_groups):
     df_filtrado, _ = processar_dados_liberacao(df)
 
     if selected_groups is None or len(selected_groups) == 0:
@@ -1564,13 +1933,100 @@ def baixar_excel_liberacao(n_clicks, selected_groups):
 
     df_export = df_filtrado[df_filtrado["grupo_vistoria"].isin(selected_groups)]
 
-    df_export = df_export[COLUNAS_TABELA_LIBERACAO]
+    return df_export[COLUNAS_TABELA_LIBERACAO]
 
-    return dcc.send_data_frame(
-        df_export.to_excel,
-        f"vistorias_liberadas_tabela.xlsx",
-        index=False
-    )
+@app.callback(
+    Output("link-download", "data", allow_duplicate=True),
+    Input("btn-download-liberacao", "n_clicks"),
+    State("filtro-liberacao", "value"),  
+    State("formato-download", "value"),
+    prevent_initial_call=True
+)
+def baixar_excel_liberacao(n_clicks, selected_groups, formato):
+    df = obter_df_sessao()
+    if df is None:
+        return dash.no_update
+
+    # A ordem dos cliques não muda o arquivo; sem seleção, vão todos os grupos.
+    filtro = sorted(selected_groups) if selected_groups else None
+
+    return {"url": exportar_tabela(df, "liberacao", filtro, formato, lambda: tabela_exportacao_liberacao(df, selected_groups), f"vistorias_liberadas_tabela", current_user.id)}
+
+# Uma planilha por aba, com o filtro padrão de cada uma. Funções de módulo
+# (e partial), não lambdas: a lista vai para o processo que monta o arquivo.
+ABAS_EXPORTACAO = [
+    ("Total", partial(tabela_exportacao_total, filtro_ativo="todos")),
+    ("Não finalizadas", partial(tabela_exportacao_nao_finalizadas, filtro="todos")),
+    ("Média mensal", tabela_exportacao_media_mensal),
+    ("Reparos imobiliária", tabela_exportacao_reparos_imobiliaria),
+    ("Reparos inquilino", tabela_exportacao_reparos_inquilino),
+    ("Vistoria", tabela_exportacao_vistoria),
+    ("Média vistoria", tabela_exportacao_media_vistoria),
+    ("Orçamento", tabela_exportacao_orcamento),
+    ("Média orçamento", tabela_exportacao_media_orcamento),
+    ("Desocupação", tabela_exportacao_desocupacao),
+    ("Média desocupação", tabela_exportacao_media_desocupacao),
+    ("Sem pendências", partial(tabela_exportacao_sem_pendencia, filtro_ativo="todos")),
+    ("Passou sem pendências", partial(tabela_exportacao_passou_sp, selected_groups=None)),
+    ("Liberação vistoria", partial(tabela_exportacao_liberacao, selected_groups=None)),
+]
+
+@app.callback(
+    Output("tarefa-exportacao-todas", "data"),
+    Output("intervalo-exportacao-todas", "disabled"),
+    Output("status-exportacao-todas", "children"),
+    Output("btn-exportar-todas", "disabled"),
+    Input("btn-exportar-todas", "n_clicks"),
+    prevent_initial_call=True
+)
+def iniciar_exportacao_todas(n_clicks):
+    caminho = session.get("arquivo_dados")
+    if not caminho or not os.path.exists(caminho):
+        return None, True, "Nenhum arquivo carregado.", False
+
+    # O arquivo é montado na fila de exportações, fora da requisição e do
+    # processo do servidor; o processo lê o dataset do próprio arquivo.
+    try:
+        id_tarefa = enviar_tarefa(
+            current_user.id,
+            exportar_todas_abas,
+            caminho,
+            ABAS_EXPORTACAO,
+            "desocupacoes_todas_as_abas",
+            current_user.id,
+            fila="exportacao"
+        )
+    except FilaCheiaError as e:
+        return None, True, str(e), False
+
+    return id_tarefa, False, "Aguardando processamento...", True
+
+@app.callback(
+    Output("intervalo-exportacao-todas", "disabled", allow_duplicate=True),
+    Output("status-exportacao-todas", "children", allow_duplicate=True),
+    Output("btn-exportar-todas", "disabled", allow_duplicate=True),
+    Input("intervalo-exportacao-todas", "n_intervals"),
+    State("tarefa-exportacao-todas", "data"),
+    prevent_initial_call=True
+)
+def acompanhar_exportacao_todas(n_intervals, id_tarefa):
+    tarefa = obter_tarefa(id_tarefa) if id_tarefa else None
+
+    if tarefa is None or tarefa["dono"] != current_user.id:
+        return True, "Exportação não encontrada. Tente novamente.", False
+
+    if tarefa["status"] == "erro":
+        descartar_tarefa(id_tarefa)
+        return True, f"Erro ao gerar o arquivo: {tarefa['erro']}", False
+
+    if tarefa["status"] == "concluido":
+        descartar_tarefa(id_tarefa)
+        return True, html.A("Baixar arquivo com todas as abas", href=tarefa["resultado"]), False
+
+    if tarefa["etapa"] == "fila":
+        return False, "Aguardando processamento...", True
+
+    return False, f"Gerando planilha: {tarefa['etapa']}", True
     
 if __name__ == "__main__":
     app.run(
@@ -4,169 +4,454 @@ import numpy as np
 import html5lib
 from pathlib import Path
 from datetime import datetime
+from leitura import ler_xlsx_colunas, ler_html_colunas
 
-def processar_excel(caminho_arquivo: str) -> str:
-    caminho_arquivo = Path(caminho_arquivo)
+COLUNAS_ID = ['[Setor] Etapa - XX', '[Setor] Etapa - XX', '[Setor] Etapa - XX']
 
-    ext = caminho_arquivo.suffix.replace(".", "").lower()
+COLUNA_SEM_PENDENCIAS = '[Desocupação] Etapa - Imóvel Sem Pendências'
 
-    if ext == "xlsx":
-        df = pd.read_excel(caminho_arquivo, engine="openpyxl")
-        print("Arquivo Excel processado com sucesso")
+COLUNAS_DATA_DERIVADAS = ['Data_inicio_desocupacao', 'Data_fim_desocupacao']
 
-    elif ext == "xls":
-        df = pd.concat(pd.read_html(caminho_arquivo))
-        print("Arquivo Excel processado com sucesso(pd.read_html)")
+COLUNAS_PROCESSO_INTERNO = [
+    "[Setor] Etapa - X1",
+    "[Setor] Etapa - X2",
+    "[Setor] Etapa - X3",
+    "[Setor] Etapa - X4",
+    "[Setor] Etapa - X5",
+    "[Setor] Etapa - X6",
+    "[Setor] Etapa - X7",
+    "[Setor] Etapa - X8",
+    "[Setor] Etapa - X9",
+    "[Setor] Etapa - X10",
+    "[Setor] Etapa - X11",
+    "[Setor] Etapa - X12",
+    "[Setor] Etapa - X13",
+    "[Setor] Etapa - X14",
+    "[Setor] Etapa - X15",
+    "[Setor] Etapa - X16",
+    "[Setor] Etapa - X17",
+    "[Setor] Etapa - X18",
+    "[Setor] Etapa - X19",
+    "[Setor] Etapa - X20",
+    "[Setor] Etapa - X21",
+    "[Setor] Etapa - X22",
+    "[Setor] Etapa - X23",
+    "[Setor] Etapa - X24",
+    "[Setor] Etapa - X25",
+    "[Setor] Etapa - X26"
+]
 
-    else:
-        raise ValueError("Formato de arquivo não suportado")
+COLUNAS_DATA = COLUNAS_PROCESSO_INTERNO + [COLUNA_SEM_PENDENCIAS]
+
+COLUNAS_NECESSARIAS = list(dict.fromkeys(COLUNAS_ID + COLUNAS_DATA))
 
-    def converter_criado(valor):
-        if pd.isna(valor):
-            
-            return pd.NaT
+FORMATOS_DATA = [
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y",
+    "%d-%m-%Y %H:%M:%S",
+    "%d-%m-%Y %H:%M",
+    "%d-%m-%Y",
+    "ISO8601",
+]
 
-        if isinstance(valor, (pd.Timestamp, datetime)):
-            return valor
+ORIGEM_SERIAL_EXCEL = "1899-12-30"
 
-        if isinstance(valor, (int, float)):
-            return pd.to_datetime(valor, unit="d", origin="1899-12-30")
+def serial_excel_para_data(valores: pd.Series) -> pd.Series:
+    return pd.to_datetime(valores, unit="d", origin=ORIGEM_SERIAL_EXCEL, errors="coerce")
 
-        valor = (
-            str(valor)
-            .replace("\xa0", "")
-            .replace("\n", "")
-            .replace("\r", "")
-            .strip()
+def inferir_formato_data(textos: pd.Series, tamanho_amostra: int = 200):
+    amostra = textos.dropna().drop_duplicates().head(tamanho_amostra)
+    if amostra.empty:
+        return None
+
+    for formato in FORMATOS_DATA:
+        convertido = pd.to_datetime(amostra, format=formato, errors="coerce")
+        if convertido.notna().all():
+            return formato
+
+    return None
+
+def texto_para_data(textos: pd.Series) -> pd.Series:
+    textos = (
+        textos.astype("string")
+        .str.replace(r"[\xa0\r\n]", "", regex=True)
+        .str.strip()
+        .replace("", pd.NA)
+    )
+
+    # Exportações em HTML trazem o serial do Excel como texto.
+    numeros = pd.to_numeric(textos, errors="coerce")
+    eh_serial = numeros.notna()
+    if eh_serial.any():
+        textos = textos.where(~eh_serial)
+
+    formato = inferir_formato_data(textos)
+    if formato is None:
+        datas = pd.to_datetime(textos, errors="coerce", dayfirst=True)
+    else:
+        datas = pd.to_datetime(textos, format=formato, errors="coerce")
+
+    # O formato vem de uma amostra (ou, sem ele, da primeira linha): valores
+    # em outro layout na mesma coluna, como "dd/mm/aaaa HH:MM" no meio de
+    # "dd/mm/aaaa", saem NaT. Só esses são convertidos de novo, um a um,
+    # como a conversão célula a célula fazia.
+    restantes = datas.isna() & textos.notna()
+    if restantes.any():
+        datas[restantes] = pd.to_datetime(
+            textos[restantes], format="mixed", errors="coerce", dayfirst=True
         )
 
-        return pd.to_datetime(valor, errors='coerce', dayfirst=True)
-
-
-    df["[Setor] Etapa - X1"] = df["[Setor] Etapa - X1"].apply(converter_criado)
-
-    colunas_processo_interno = [
-        "[Setor] Etapa - X1",
-        "[Setor] Etapa - X2",
-        "[Setor] Etapa - X3",
-        "[Setor] Etapa - X4",
-        "[Setor] Etapa - X5",
-        "[Setor] Etapa - X6",
-        "[Setor] Etapa - X7",
-        "[Setor] Etapa - X8",
-        "[Setor] Etapa - X9",
-        "[Setor] Etapa - X10",
-        "[Setor] Etapa - X11",
-        "[Setor] Etapa - X12",
-        "[Setor] Etapa - X13",
-        "[Setor] Etapa - X14",
-        "[Setor] Etapa - X15",
-        "[Setor] Etapa - X16",
-        "[Setor] Etapa - X17",
-        "[Setor] Etapa - X18",
-        "[Setor] Etapa - X19",
-        "[Setor] Etapa - X20",
-        "[Setor] Etapa - X21",
-        "[Setor] Etapa - X22",
-        "[Setor] Etapa - X23",
-        "[Setor] Etapa - X24",
-        "[Setor] Etapa - X25",
-        "[Setor] Etapa - X26",
-    ]
+    if eh_serial.any():
+        datas = datas.where(~eh_serial, serial_excel_para_data(numeros))
+
+    return datas
+
+def normalizar_datas(serie: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+
+    if pd.api.types.is_numeric_dtype(serie):
+        return serial_excel_para_data(serie)
+
+    tipo = pd.api.types.infer_dtype(serie, skipna=True)
+
+    if tipo in ("datetime", "datetime64", "date"):
+        return pd.to_datetime(serie, errors="coerce")
+
+    if tipo in ("integer", "floating", "mixed-integer-float", "decimal"):
+        return serial_excel_para_data(pd.to_numeric(serie, errors="coerce"))
+
+    if tipo in ("string", "empty"):
+        return texto_para_data(serie)
+
+    # Coluna misturando datas, números (serial do Excel) e texto: separa
+    # cada grupo por máscara e converte cada um de uma vez.
+    eh_data = serie.map(lambda v: isinstance(v, (pd.Timestamp, datetime)))
+    numeros = pd.to_numeric(serie.where(~eh_data), errors="coerce")
+    eh_numero = numeros.notna()
+    eh_texto = serie.notna() & ~eh_data & ~eh_numero
+
+    resultado = pd.Series(pd.NaT, index=serie.index, dtype="datetime64[ns]")
+
+    if eh_data.any():
+        resultado[eh_data] = pd.to_datetime(serie[eh_data], errors="coerce")
+    if eh_numero.any():
+        resultado[eh_numero] = serial_excel_para_data(numeros[eh_numero])
+    if eh_texto.any():
+        resultado[eh_texto] = texto_para_data(serie[eh_texto])
+
+    return resultado
+
+COLUNAS_INICIO = [
+    '[Setor] Etapa - X1',
+    '[Setor] Etapa - X2',
+    '[Setor] Etapa - X3'
+]
+
+COLUNAS_FIM = [
+    '[Setor] Etapa - X23',
+    '[Setor] Etapa - X24',
+    '[Setor] Etapa - X25',
+    '[Setor] Etapa - X26'
+]
+
+COLUNAS_DERIVADAS = [
+    'Data_inicio_desocupacao',
+    'Data_fim_desocupacao',
+    'Tempo_total_desocupacao',
+    'Tempo_total_dias',
+    'Finalizado',
+    'Etapa_final_utilizada'
+]
+
+def primeira_coluna_preenchida(df: pd.DataFrame, colunas: list) -> pd.Series:
+    preenchidas = df[colunas].notna().to_numpy()
+    posicao = preenchidas.argmax(axis=1)
+
+    nomes = np.asarray(colunas, dtype=object)[posicao]
+    nomes[~preenchidas.any(axis=1)] = ""
+
+    return pd.Series(nomes, index=df.index, dtype=object)
+
+def dias_decimais_para_texto(dias_decimais: pd.Series) -> pd.Series:
+    # Mesma aritmética (e o mesmo arredondamento half-even do round())
+    # da versão por célula, aplicada ao array inteiro.
+    valores = dias_decimais.to_numpy(dtype="float64")
+    validos = ~np.isnan(valores)
+    valores = np.where(validos, valores, 0.0)
+
+    dias = np.trunc(valores)
+    horas_total = (valores - dias) * 24
+    horas = np.trunc(horas_total)
+    minutos = np.round((horas_total - horas) * 60)
+
+    dias = dias.astype(np.int64)
+    horas = horas.astype(np.int64)
+    minutos = minutos.astype(np.int64)
+
+    virou_hora = minutos == 60
+    minutos[virou_hora] = 0
+    horas[virou_hora] += 1
+
+    virou_dia = horas == 24
+    horas[virou_dia] = 0
+    dias[virou_dia] += 1
+
+    # Tabelas de texto com dois dígitos indexadas pelo próprio valor: a
+    # montagem vira concatenação de arrays de objetos.
+    def tabela_dois_digitos(maximo):
+        return np.array([f"{i:02d}" for i in range(maximo + 1)], dtype=object)
+
+    texto = (
+        tabela_dois_digitos(int(dias.max(initial=0)))[dias] + " dias "
+        + tabela_dois_digitos(23)[horas] + " horas e "
+        + tabela_dois_digitos(59)[minutos] + " minutos"
+    )
+    texto[~validos] = ""
+
+    return pd.Series(texto, index=dias_decimais.index, dtype=object)
+
+def colunas_dataset(df: pd.DataFrame) -> list:
+    colunas_extras = [COLUNA_SEM_PENDENCIAS] if COLUNA_SEM_PENDENCIAS in df.columns else []
+    return (
+        list(dict.fromkeys(COLUNAS_ID))
+        + COLUNAS_PROCESSO_INTERNO
+        + colunas_extras
+        + COLUNAS_DERIVADAS
+    )
+
+def calcular_colunas_derivadas(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty:
+        return df.reindex(columns=colunas_dataset(df))
+
+    df = df.copy()
+
+    df['Data_inicio_desocupacao'] = df[COLUNAS_INICIO].bfill(axis=1).iloc[:, 0]
+    df['Data_fim_real'] = df[COLUNAS_FIM].bfill(axis=1).iloc[:, 0]
 
-    for col in colunas_processo_interno:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors="coerce", dayfirst=True)
-    
-    colunas_inicio = [
-        '[Setor] Etapa - X1',
-        '[Setor] Etapa - X2',
-        '[Setor] Etapa - X3'
-    ]
-    
-    df['Data_inicio_desocupacao'] = df[colunas_inicio].bfill(axis=1).iloc[:, 0]
-    
-    colunas_fim = [
-        '[Setor] Etapa - X23',
-        '[Setor] Etapa - X24',
-        '[Setor] Etapa - X25',
-        '[Setor] Etapa - X26'
-    ]
-    
-    df['Data_fim_real'] = df[colunas_fim].bfill(axis=1).iloc[:, 0]
-    
     df['Finalizado'] = (
         df['Data_inicio_desocupacao'].notna() &
         df['Data_fim_real'].notna()
     )
-    
+
     df['Data_fim_desocupacao'] = df['Data_fim_real'].fillna(pd.Timestamp.now())
-    
+
     delta = df['Data_fim_desocupacao'] - df['Data_inicio_desocupacao']
     delta = delta.where(delta >= pd.Timedelta(0))
 
-    def timedelta_para_dias(td):
-        if pd.isna(td):
-            return np.nan
-        return td.total_seconds() / 86400
-    
-    df['Tempo_total_dias'] = delta.apply(timedelta_para_dias)
-    
-    def dias_decimais_para_texto(valor):
-        if pd.isna(valor):
-            return ""
-    
-        dias = int(valor)
-        resto = valor - dias
-    
-        horas_total = resto * 24
-        horas = int(horas_total)
-    
-        minutos_total = (horas_total - horas) * 60
-        minutos = int(round(minutos_total))
-    
-        if minutos == 60:
-            minutos = 0
-            horas += 1
-    
-        if horas == 24:
-            horas = 0
-            dias += 1
-    
-        return f"{dias:02d} dias {horas:02d} horas e {minutos:02d} minutos"
-    
-    df['Tempo_total_desocupacao'] = df['Tempo_total_dias'].apply(dias_decimais_para_texto)
-    
-    def etapa_final_utilizada(row):
-        for col in colunas_fim:
-            if pd.notna(row[col]):
-                return col
-        return ""
-    
-    df['Etapa_final_utilizada'] = df.apply(etapa_final_utilizada, axis=1)
-    
-    df_final = pd.concat(
-        [
-            df[['[Setor] Etapa - XX', '[Setor] Etapa - XX', '[Setor] Etapa - XX']],
-            df[colunas_processo_interno],
-            df[
-                [
-                    'Data_inicio_desocupacao',
-                    'Data_fim_desocupacao',
-                    'Tempo_total_desocupacao',
-                    'Tempo_total_dias',
-                    'Finalizado',
-                    'Etapa_final_utilizada'
-                ]
+    df['Tempo_total_dias'] = delta.dt.total_seconds() / 86400
+    df['Tempo_total_desocupacao'] = dias_decimais_para_texto(df['Tempo_total_dias'])
+    df['Etapa_final_utilizada'] = primeira_coluna_preenchida(df, COLUNAS_FIM)
+
+    return df[colunas_dataset(df)]
+
+COLUNAS_TEXTO = list(dict.fromkeys(COLUNAS_ID)) + ['Tempo_total_desocupacao', 'Etapa_final_utilizada']
+
+def padronizar_textos(df: pd.DataFrame) -> pd.DataFrame:
+    # Códigos numéricos e em texto na mesma coluna são comuns na exportação;
+    # o Parquet exige um tipo só por coluna, então tudo vira texto (as
+    # células vazias continuam vazias).
+    df = df.copy()
+
+    for col in COLUNAS_TEXTO:
+        if col in df.columns:
+            serie = df[col]
+            df[col] = serie.astype(object).where(serie.isna(), serie.astype(str))
+
+    return df
+
+def salvar_dataset(df: pd.DataFrame, caminho_saida) -> None:
+    # O dataset da sessão fica em Parquet: os callbacks leem as colunas
+    # já tipadas, sem passar de novo pelo openpyxl. O .xlsx só é gerado
+    # na exportação.
+    df = padronizar_textos(df)
+
+    for col in COLUNAS_DATA_DERIVADAS:
+        df[col] = pd.to_datetime(df[col], errors="coerce")
+
+    df['Finalizado'] = df['Finalizado'].astype(bool)
+    df['Tempo_total_dias'] = df['Tempo_total_dias'].astype("float64")
+
+    df.to_parquet(caminho_saida, index=False, engine="pyarrow")
+    salvar_matriz_etapas(df, caminho_saida)
+
+def carregar_dataset(caminho: str) -> pd.DataFrame:
+    return pd.read_parquet(caminho, engine="pyarrow")
+
+# Arquivos gravados junto com o dataset, identificados pelo sufixo
+# acrescentado ao caminho do Parquet.
+SUFIXO_MATRIZ_ETAPAS = ".etapas.npy"
+SUFIXO_METRICAS = ".metricas.json"
+SUFIXOS_AUXILIARES = [SUFIXO_MATRIZ_ETAPAS, SUFIXO_METRICAS]
+
+POSICAO_ETAPA = {col: i for i, col in enumerate(COLUNAS_PROCESSO_INTERNO)}
+
+def calcular_matriz_etapas(df: pd.DataFrame) -> np.ndarray:
+    # Matriz (linhas x 26 etapas) em nanossegundos desde a época; NaT vira
+    # o menor int64, o mesmo valor que o numpy usa internamente.
+    matriz = np.empty((len(df), len(COLUNAS_PROCESSO_INTERNO)), dtype=np.int64)
+    for col, posicao in POSICAO_ETAPA.items():
+        matriz[:, posicao] = (
+            df[col].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        )
+    return matriz
+
+def salvar_matriz_etapas(df: pd.DataFrame, caminho_dataset) -> None:
+    np.save(f"{caminho_dataset}{SUFIXO_MATRIZ_ETAPAS}", calcular_matriz_etapas(df))
+
+def carregar_matriz_etapas(caminho_dataset: str):
+    caminho_matriz = f"{caminho_dataset}{SUFIXO_MATRIZ_ETAPAS}"
+    if not os.path.exists(caminho_matriz):
+        return None
+    return np.load(caminho_matriz)
+
+def mover_dataset(origem: str, destino: str) -> None:
+    for sufixo in SUFIXOS_AUXILIARES:
+        if os.path.exists(f"{origem}{sufixo}"):
+            os.replace(f"{origem}{sufixo}", f"{destino}{sufixo}")
+    os.replace(origem, destino)
+
+def remover_dataset(caminho: str) -> None:
+    for arquivo in [caminho] + [f"{caminho}{sufixo}" for sufixo in SUFIXOS_AUXILIARES]:
+        if os.path.exists(arquivo):
+            os.remove(arquivo)
+
+ETAPAS_PROCESSAMENTO = {
+    "leitura": "Lendo o arquivo",
+    "datas": "Convertendo as datas das etapas",
+    "derivadas": "Calculando tempos e situação das desocupações",
+    "gravacao": "Gravando os dados processados",
+    "metricas": "Calculando os indicadores das abas",
+}
+
+def ler_arquivo(caminho_arquivo: Path, informar_etapa) -> pd.DataFrame:
+    ext = caminho_arquivo.suffix.replace(".", "").lower()
+
+    informar_etapa("leitura")
+
+    if ext == "xlsx":
+        df = ler_xlsx_colunas(caminho_arquivo, COLUNAS_NECESSARIAS, COLUNAS_DATA)
+        print("Arquivo Excel processado com sucesso")
+
+    elif ext == "xls":
+        df = ler_html_colunas(caminho_arquivo, COLUNAS_NECESSARIAS, COLUNAS_DATA)
+        print("Arquivo Excel processado com sucesso(html em streaming)")
+
+    else:
+        raise ValueError("Formato de arquivo não suportado")
+
+    informar_etapa("datas")
+
+    for col in COLUNAS_DATA:
+        if col in df.columns:
+            df[col] = normalizar_datas(df[col])
+
+    return padronizar_textos(df)
+
+def linhas_iguais(a: pd.DataFrame, b: pd.DataFrame) -> np.ndarray:
+    iguais = np.ones(len(a), dtype=bool)
+    for col in a.columns:
+        if col not in b.columns:
+            iguais &= a[col].isna().to_numpy()
+            continue
+        x = a[col].to_numpy()
+        y = b[col].to_numpy()
+        iguais &= (x == y) | (pd.isna(x) & pd.isna(y))
+    return iguais
+
+def mesclar_incremental(df_novo: pd.DataFrame, df_base: pd.DataFrame) -> pd.DataFrame:
+    # Bases gravadas antes da padronização podem ter a chave numérica.
+    df_base = padronizar_textos(df_base)
+
+    colunas_chave = [
+        col for col in dict.fromkeys(COLUNAS_ID)
+        if col in df_novo.columns and col in df_base.columns
+    ]
+
+    # Sem uma chave única nos dois lados não há como casar as linhas com
+    # segurança; nesse caso o arquivo é processado por inteiro.
+    if (
+        not colunas_chave
+        or df_novo.duplicated(colunas_chave).any()
+        or df_base.duplicated(colunas_chave).any()
+    ):
+        print("Chave dos imóveis não é única, processando o arquivo inteiro")
+        return calcular_colunas_derivadas(df_novo)
+
+    chave_novo = pd.MultiIndex.from_frame(df_novo[colunas_chave])
+    chave_base = pd.MultiIndex.from_frame(df_base[colunas_chave])
+
+    posicao_na_base = chave_base.get_indexer(chave_novo)
+    existe_na_base = posicao_na_base >= 0
+
+    colunas_comparar = [col for col in COLUNAS_DATA if col in df_novo.columns]
+
+    base_alinhada = df_base.iloc[posicao_na_base[existe_na_base]]
+    iguais = np.zeros(len(df_novo), dtype=bool)
+    iguais[existe_na_base] = linhas_iguais(
+        df_novo.loc[existe_na_base, colunas_comparar],
+        base_alinhada
+    )
+
+    # Desocupações não finalizadas usam a data atual como fim, então
+    # sempre são recalculadas mesmo sem mudança nas etapas.
+    finalizado_base = np.zeros(len(df_novo), dtype=bool)
+    finalizado_base[existe_na_base] = base_alinhada['Finalizado'].to_numpy(dtype=bool)
+
+    reaproveitar = iguais & finalizado_base
+
+    somente_base = ~chave_base.isin(chave_novo)
+    base_restante = df_base[somente_base]
+
+    print(
+        f"Incremental: {int((~reaproveitar).sum())} linhas recalculadas, "
+        f"{int(reaproveitar.sum())} reaproveitadas, "
+        f"{int(somente_base.sum())} mantidas do histórico"
+    )
+
+    partes = [
+        calcular_colunas_derivadas(df_novo[~reaproveitar]).assign(_ordem=np.flatnonzero(~reaproveitar)),
+        df_base.iloc[posicao_na_base[reaproveitar]].assign(_ordem=np.flatnonzero(reaproveitar)),
+        pd.concat(
+            [
+                base_restante[base_restante['Finalizado'].astype(bool)],
+                calcular_colunas_derivadas(base_restante[~base_restante['Finalizado'].astype(bool)])
             ]
-        ],
-        axis=1
+        ).assign(_ordem=lambda d: len(df_novo) + np.arange(len(d))),
+    ]
+
+    df_final = (
+        pd.concat(partes, ignore_index=True)
+        .sort_values('_ordem', kind="stable")
+        .drop(columns='_ordem')
+        .reset_index(drop=True)
     )
+
+    return df_final.reindex(columns=colunas_dataset(df_novo))
+
+def processar_excel(caminho_arquivo: str, informar_etapa=None, caminho_base=None) -> str:
+    caminho_arquivo = Path(caminho_arquivo)
+
+    if informar_etapa is None:
+        informar_etapa = lambda etapa: None
+
+    df = ler_arquivo(caminho_arquivo, informar_etapa)
+
+    informar_etapa("derivadas")
+
+    if caminho_base:
+        df_final = mesclar_incremental(df, carregar_dataset(caminho_base))
+    else:
+        df_final = calcular_colunas_derivadas(df)
+
     caminho_saida = caminho_arquivo.with_name(
-        f"processado_{caminho_arquivo.name}"
+        f"processado_{caminho_arquivo.stem}.parquet"
     )
 
-    df_final.to_excel(caminho_saida, index=False, engine="openpyxl")
+    informar_etapa("gravacao")
+
+    salvar_dataset(df_final, caminho_saida)
 
     print("Arquivo processado criado em:", caminho_saida)
 
@@ -0,0 +1,11 @@
+// Abre o link curto devolvido pelos callbacks de download: o servidor envia
+// o arquivo como anexo, então a página do dashboard continua aberta.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    downloads: {
+        abrir_link: function (link) {
+            if (link && link.url) {
+                window.location.assign(link.url);
+            }
+        }
+    }
+});
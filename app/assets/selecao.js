@@ -0,0 +1,28 @@
+// Destaque das barras feito no navegador: o clique numa barra só alterna a
+// seleção e a opacidade; o servidor é chamado apenas para a tabela.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    selecao: {
+        alternar_grupo: function (clickData, selecionados, figura) {
+            if (!clickData || !figura) {
+                return [window.dash_clientside.no_update, window.dash_clientside.no_update];
+            }
+
+            // Cada barra é um trace com um único grupo no eixo x.
+            const grupos = figura.data.map(function (trace) { return trace.x[0]; });
+            const atuais = selecionados || grupos;
+            const clicado = clickData.points[0].x;
+
+            const novos = (atuais.length === 1 && atuais[0] === clicado) ? grupos : [clicado];
+            const todos = grupos.every(function (grupo) { return novos.includes(grupo); });
+
+            const novaFigura = Object.assign({}, figura, {
+                data: figura.data.map(function (trace, i) {
+                    const aceso = todos || novos.includes(grupos[i]);
+                    return Object.assign({}, trace, { opacity: aceso ? 1.0 : 0.4 });
+                })
+            });
+
+            return [novos, novaFigura];
+        }
+    }
+});
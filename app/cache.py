@@ -0,0 +1,132 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from arq import carregar_dataset, carregar_matriz_etapas
+
+
+class CacheLRU:
+    def __init__(self, limite_bytes, medir_tamanho):
+        self.limite_bytes = limite_bytes
+        self.medir_tamanho = medir_tamanho
+        self.itens = OrderedDict()
+        self.bytes_usados = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.lock = threading.Lock()
+
+    def obter(self, chave):
+        with self.lock:
+            if chave not in self.itens:
+                self.falhas += 1
+                return None
+
+            self.itens.move_to_end(chave)
+            self.acertos += 1
+            return self.itens[chave][0]
+
+    def guardar(self, chave, valor):
+        tamanho = self.medir_tamanho(valor)
+
+        with self.lock:
+            if chave in self.itens:
+                self.bytes_usados -= self.itens.pop(chave)[1]
+
+            # Um item maior que o limite inteiro não é guardado, senão
+            # esvaziaria o cache para nada.
+            if tamanho > self.limite_bytes:
+                return
+
+            self.itens[chave] = (valor, tamanho)
+            self.bytes_usados += tamanho
+
+            while self.bytes_usados > self.limite_bytes:
+                _, (_, tamanho_removido) = self.itens.popitem(last=False)
+                self.bytes_usados -= tamanho_removido
+
+    def remover_onde(self, condicao):
+        with self.lock:
+            for chave in [c for c in self.itens if condicao(c)]:
+                self.bytes_usados -= self.itens.pop(chave)[1]
+
+    def estatisticas(self):
+        with self.lock:
+            return {
+                "itens": len(self.itens),
+                "bytes_usados": self.bytes_usados,
+                "limite_bytes": self.limite_bytes,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+            }
+
+
+def tamanho_objeto(valor) -> int:
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(index=True, deep=True))
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    if isinstance(valor, (tuple, list)):
+        return sum(tamanho_objeto(item) for item in valor)
+    return 0
+
+
+cache_datasets = CacheLRU(
+    limite_bytes=int(os.getenv("DATASET_CACHE_MB", "512")) * 1024 * 1024,
+    medir_tamanho=tamanho_objeto
+)
+
+
+def obter_em_cache(caminho: str, tipo: str, carregar):
+    chave = (os.path.abspath(caminho), os.path.getmtime(caminho), tipo)
+
+    valor = cache_datasets.obter(chave)
+    if valor is None:
+        valor = carregar(caminho)
+
+        # Versões antigas do mesmo arquivo não voltam a ser pedidas.
+        cache_datasets.remover_onde(
+            lambda c: c[0] == chave[0] and c[2] == tipo and c[1] != chave[1]
+        )
+        if valor is not None:
+            cache_datasets.guardar(chave, valor)
+
+    return valor
+
+
+# Cópias do dataset inteiro entregues por carregar_dataset_em_cache, por
+# id. Os attrs passam para recortes (df[mascara] mantém caminho_dataset),
+# então só o próprio objeto prova que as linhas são as do arquivo.
+datasets_completos = weakref.WeakValueDictionary()
+
+
+def carregar_dataset_em_cache(caminho: str) -> pd.DataFrame:
+    df = obter_em_cache(caminho, "dataset", carregar_dataset)
+
+    # Cópia rasa: os callbacks podem criar colunas sem alterar o cache.
+    df = df.copy(deep=False)
+    df.attrs["caminho_dataset"] = caminho
+    df.attrs["mtime_dataset"] = os.path.getmtime(caminho)
+
+    datasets_completos[id(df)] = df
+    return df
+
+
+def eh_dataset_completo(df: pd.DataFrame) -> bool:
+    caminho = df.attrs.get("caminho_dataset")
+    if not caminho or not os.path.exists(caminho):
+        return False
+
+    return (
+        datasets_completos.get(id(df)) is df
+        and df.attrs.get("mtime_dataset") == os.path.getmtime(caminho)
+    )
+
+
+def carregar_matriz_em_cache(caminho: str):
+    return obter_em_cache(caminho, "matriz_etapas", carregar_matriz_etapas)
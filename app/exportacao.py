@@ -0,0 +1,246 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+from cache import carregar_dataset_em_cache
+from metricas import modulos_das_visoes
+from tarefas import executar_em_processo
+
+PASTA_EXPORTACOES = os.path.join("uploads", "exportacoes")
+TEMPO_LINK = int(os.getenv("EXPORTACAO_LINK_MINUTOS", "10")) * 60
+TEMPO_CACHE = int(os.getenv("EXPORTACAO_CACHE_MINUTOS", "60")) * 60
+LIMITE_CACHE_BYTES = int(os.getenv("EXPORTACAO_CACHE_MB", "256")) * 1024 * 1024
+LINHAS_POR_BLOCO = 5000
+
+# token -> arquivo gerado; o link vale por alguns minutos e só para quem
+# pediu a exportação.
+links = {}
+lock_links = threading.Lock()
+
+def valor_celula(valor):
+    if valor is None or valor is pd.NaT:
+        return None
+    if isinstance(valor, float) and valor != valor:
+        return None
+    if isinstance(valor, pd.Timestamp):
+        return valor.to_pydatetime()
+    return valor
+
+def escrever_planilha(workbook, df: pd.DataFrame, titulo=None) -> None:
+    planilha = workbook.create_sheet(titulo)
+    planilha.append([str(coluna) for coluna in df.columns])
+
+    for inicio in range(0, len(df), LINHAS_POR_BLOCO):
+        bloco = df.iloc[inicio:inicio + LINHAS_POR_BLOCO].astype(object)
+        for linha in bloco.itertuples(index=False, name=None):
+            planilha.append([valor_celula(valor) for valor in linha])
+
+def escrever_xlsx(df: pd.DataFrame, caminho: str) -> None:
+    # Modo write_only do openpyxl: as linhas vão direto para o arquivo, sem
+    # montar a planilha inteira em memória.
+    workbook = Workbook(write_only=True)
+    escrever_planilha(workbook, df)
+    workbook.save(caminho)
+
+def escrever_csv_gz(df: pd.DataFrame, caminho: str) -> None:
+    with gzip.open(caminho, "wt", encoding="utf-8", newline="") as arquivo:
+        for inicio in range(0, max(len(df), 1), LINHAS_POR_BLOCO):
+            bloco = df.iloc[inicio:inicio + LINHAS_POR_BLOCO]
+            bloco.to_csv(arquivo, index=False, header=inicio == 0)
+
+def escrever_parquet(df: pd.DataFrame, caminho: str) -> None:
+    # O parquet não aceita colunas repetidas; as listas de colunas das
+    # tabelas repetem algumas etapas, sempre com o mesmo conteúdo.
+    df = df.loc[:, ~df.columns.duplicated()]
+    df.columns = [str(coluna) for coluna in df.columns]
+
+    # Esquema do recorte inteiro, para que um bloco só de vazios não mude
+    # o tipo da coluna no meio do arquivo.
+    esquema = pa.Schema.from_pandas(df, preserve_index=False)
+
+    with pq.ParquetWriter(caminho, esquema) as escritor:
+        for inicio in range(0, max(len(df), 1), LINHAS_POR_BLOCO):
+            bloco = df.iloc[inicio:inicio + LINHAS_POR_BLOCO]
+            escritor.write_table(pa.Table.from_pandas(bloco, schema=esquema, preserve_index=False))
+
+# formato -> (extensão do arquivo, função que grava)
+FORMATOS = {
+    "xlsx": (".xlsx", escrever_xlsx),
+    "csv": (".csv.gz", escrever_csv_gz),
+    "parquet": (".parquet", escrever_parquet),
+}
+
+def pasta_do_dataset(caminho_dataset: str) -> str:
+    # O nome do arquivo processado já leva o hash do upload, então os
+    # arquivos ficam compartilhados entre os usuários do mesmo dataset.
+    return os.path.join(PASTA_EXPORTACOES, os.path.basename(caminho_dataset))
+
+def caminho_em_cache(df: pd.DataFrame, tipo: str, filtro, extensao: str):
+    caminho_dataset = df.attrs.get("caminho_dataset")
+    if not caminho_dataset or not os.path.exists(caminho_dataset):
+        return None
+
+    chave = json.dumps(
+        [tipo, filtro, os.path.getmtime(caminho_dataset)],
+        sort_keys=True,
+        default=str
+    )
+    nome = hashlib.sha256(chave.encode()).hexdigest()
+
+    # Caminho absoluto: o send_file resolve caminhos relativos a partir da
+    # pasta do app Flask, não da pasta de trabalho.
+    return os.path.abspath(os.path.join(pasta_do_dataset(caminho_dataset), f"{tipo}_{nome}{extensao}"))
+
+def remover_exportacoes(caminho_dataset: str) -> None:
+    shutil.rmtree(pasta_do_dataset(caminho_dataset), ignore_errors=True)
+
+def remover_links_expirados() -> None:
+    agora = time.time()
+    with lock_links:
+        for token in [t for t, link in links.items() if link["expira_em"] < agora]:
+            del links[token]
+
+def limpar_cache_exportacoes() -> None:
+    agora = time.time()
+    with lock_links:
+        em_uso = {link["caminho"] for link in links.values() if link["expira_em"] >= agora}
+
+    arquivos = []
+    for pasta, _, nomes in os.walk(PASTA_EXPORTACOES):
+        for nome in nomes:
+            caminho = os.path.abspath(os.path.join(pasta, nome))
+            try:
+                info = os.stat(caminho)
+            except FileNotFoundError:
+                continue
+            arquivos.append((info.st_mtime, info.st_size, caminho))
+
+    # Do menos usado para o mais usado: sai o que passou do tempo de
+    # retenção e, depois, o que estourar o limite de disco.
+    arquivos.sort()
+    total = sum(tamanho for _, tamanho, _ in arquivos)
+
+    for modificado, tamanho, caminho in arquivos:
+        expirado = modificado < agora - TEMPO_CACHE
+        if not expirado and total <= LIMITE_CACHE_BYTES:
+            break
+
+        # Arquivos ainda em gravação ou com link válido ficam até expirar.
+        if not expirado and (caminho in em_uso or caminho.endswith(".tmp")):
+            continue
+
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+        total -= tamanho
+
+def registrar_link(caminho: str, nome_arquivo: str, dono: str) -> str:
+    remover_links_expirados()
+
+    token = uuid.uuid4().hex
+    with lock_links:
+        links[token] = {
+            "caminho": caminho,
+            "nome": nome_arquivo,
+            "dono": dono,
+            "expira_em": time.time() + TEMPO_LINK,
+        }
+
+    return f"/exportacoes/{token}"
+
+def obter_link(token: str, dono: str):
+    with lock_links:
+        link = links.get(token)
+
+    if link is None or link["dono"] != dono or link["expira_em"] < time.time():
+        return None
+    if not os.path.exists(link["caminho"]):
+        return None
+
+    return link
+
+def gerar_arquivo(df: pd.DataFrame, tipo: str, filtro, extensao: str, escrever) -> str:
+    caminho = caminho_em_cache(df, tipo, filtro, extensao)
+
+    if caminho is not None:
+        try:
+            # Mesmo dataset, mesma tabela e mesmo filtro: o arquivo já
+            # gerado é servido de novo, e a retenção conta a partir daqui.
+            os.utime(caminho)
+        except FileNotFoundError:
+            pass
+        else:
+            return caminho
+    else:
+        caminho = os.path.abspath(os.path.join(PASTA_EXPORTACOES, f"{uuid.uuid4().hex}{extensao}"))
+
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.{uuid.uuid4().hex}.tmp"
+
+    try:
+        escrever(temporario)
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+    return caminho
+
+def exportar_tabela(df: pd.DataFrame, tipo: str, filtro, formato: str, montar, nome_base: str, dono: str) -> str:
+    extensao, escrever = FORMATOS.get(formato, FORMATOS["xlsx"])
+
+    caminho = gerar_arquivo(df, tipo, filtro, extensao, lambda destino: escrever(montar(), destino))
+    link = registrar_link(caminho, f"{nome_base}{extensao}", dono)
+    limpar_cache_exportacoes()
+
+    return link
+
+def gerar_todas_abas(caminho_dataset: str, abas, informar_etapa=None) -> str:
+    # Roda num processo do pool de exportações. abas: lista de (título da
+    # planilha, função que recebe o dataset e devolve a tabela da aba), que
+    # precisam ser de módulo para chegar ao processo. Cada tabela é montada,
+    # gravada e descartada antes da próxima, então só uma fica em memória
+    # por vez.
+    df = carregar_dataset_em_cache(caminho_dataset)
+
+    def escrever(destino):
+        workbook = Workbook(write_only=True)
+
+        for indice, (titulo, montar) in enumerate(abas, start=1):
+            if informar_etapa is not None:
+                informar_etapa(f"{titulo} ({indice} de {len(abas)})")
+            escrever_planilha(workbook, montar(df), titulo)
+
+        if informar_etapa is not None:
+            informar_etapa("Finalizando o arquivo")
+        workbook.save(destino)
+
+    return gerar_arquivo(df, "todas_abas", [titulo for titulo, _ in abas], ".xlsx", escrever)
+
+def exportar_todas_abas(caminho_dataset: str, abas, nome_base: str, dono: str, informar_etapa=None) -> str:
+    # O openpyxl segura o GIL durante a montagem inteira: fora do processo
+    # do servidor, como a leitura dos uploads. O link fica registrado aqui,
+    # onde os downloads são servidos.
+    caminho = executar_em_processo(
+        gerar_todas_abas,
+        caminho_dataset,
+        abas,
+        informar_etapa=informar_etapa,
+        modulos=modulos_das_visoes(),
+        fila="exportacao"
+    )
+    link = registrar_link(caminho, f"{nome_base}.xlsx", dono)
+    limpar_cache_exportacoes()
+
+    return link
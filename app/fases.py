@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+
+from arq import COLUNAS_PROCESSO_INTERNO, POSICAO_ETAPA, calcular_matriz_etapas
+from cache import carregar_dataset_em_cache, carregar_matriz_em_cache, obter_em_cache
+
+# Valor que o numpy usa para NaT quando a data é vista como int64.
+NAT = np.iinfo(np.int64).min
+SEM_DATA = np.iinfo(np.int64).max
+
+def posicoes_no_dataset(df: pd.DataFrame, total: int):
+    # O dataset é gravado com índice 0..n-1, então o índice de um recorte
+    # do DataFrame aponta direto para as linhas do que foi calculado a
+    # partir do arquivo inteiro.
+    if not pd.api.types.is_integer_dtype(df.index):
+        return None
+
+    posicoes = df.index.to_numpy()
+    if len(posicoes) and (posicoes.min() < 0 or posicoes.max() >= total):
+        return None
+
+    return posicoes
+
+def confere_com_matriz(linhas: np.ndarray, df: pd.DataFrame, exigir_coluna: bool = False) -> bool:
+    # Conferência barata de que o DataFrame ainda corresponde ao arquivo.
+    coluna = COLUNAS_PROCESSO_INTERNO[0]
+    if coluna not in df.columns:
+        return not exigir_coluna
+
+    atual = df[coluna].to_numpy(dtype="datetime64[ns]").view(np.int64)
+    return np.array_equal(atual, linhas[:, POSICAO_ETAPA[coluna]])
+
+def linhas_da_matriz(matriz: np.ndarray, df: pd.DataFrame):
+    posicoes = posicoes_no_dataset(df, len(matriz))
+    if posicoes is None:
+        return None
+
+    linhas = matriz[posicoes]
+    if not confere_com_matriz(linhas, df):
+        return None
+
+    return linhas
+
+def matriz_etapas(df: pd.DataFrame):
+    caminho = df.attrs.get("caminho_dataset")
+
+    if caminho:
+        matriz = carregar_matriz_em_cache(caminho)
+        if matriz is not None:
+            linhas = linhas_da_matriz(matriz, df)
+            if linhas is not None:
+                return linhas, POSICAO_ETAPA
+
+    return calcular_matriz_etapas(df), POSICAO_ETAPA
+
+def tempos_ate_proxima_fase(df: pd.DataFrame, fases_inicio, todas_fases, ignorar=()):
+    # Para cada fase de início: menor data estritamente posterior entre as
+    # fases candidatas menos a data de início, calculado para todas as
+    # linhas de uma vez. Nomes que não são colunas de etapa são ignorados,
+    # como o row.get() da versão linha a linha fazia.
+    matriz, posicoes = matriz_etapas(df)
+
+    candidatas = [
+        posicoes[fase] for fase in todas_fases
+        if fase not in ignorar and fase in posicoes
+    ]
+    datas_candidatas = matriz[:, candidatas]
+
+    tempos = {}
+    for fase in fases_inicio:
+        inicio = matriz[:, posicoes[fase]]
+
+        # NaT é o menor int64, então nunca é "posterior" a uma data válida.
+        posteriores = datas_candidatas > inicio[:, None]
+        proxima = np.where(posteriores, datas_candidatas, SEM_DATA).min(
+            axis=1, initial=SEM_DATA
+        )
+
+        encontrada = (inicio != NAT) & (proxima != SEM_DATA)
+        diferenca = np.full(len(inicio), NAT, dtype=np.int64)
+        diferenca[encontrada] = proxima[encontrada] - inicio[encontrada]
+
+        tempos[fase] = pd.Series(
+            diferenca.view("timedelta64[ns]"),
+            index=df.index,
+            name=f"tempo_{fase}"
+        )
+
+    return tempos
+
+def calcular_fase_mais_avancada(df: pd.DataFrame, ordem_fases) -> pd.Series:
+    categorias = list(dict.fromkeys(ordem_fases))
+    presentes = [fase for fase in categorias if fase in df.columns]
+
+    # Primeira fase preenchida na ordem dada, para todas as linhas de uma vez.
+    preenchidas = np.zeros((len(df), len(presentes)), dtype=bool)
+    for i, fase in enumerate(presentes):
+        preenchidas[:, i] = df[fase].notna().to_numpy()
+
+    codigos = np.full(len(df), -1, dtype=np.int64)
+    if presentes:
+        primeira = preenchidas.argmax(axis=1)
+        alguma = preenchidas.any(axis=1)
+        codigo_presente = np.array([categorias.index(fase) for fase in presentes])
+        codigos[alguma] = codigo_presente[primeira[alguma]]
+
+    return pd.Series(
+        pd.Categorical.from_codes(codigos, categories=categorias),
+        index=df.index,
+        name="fase_encontrada"
+    )
+
+def fase_mais_avancada(df: pd.DataFrame, ordem_fases) -> pd.Series:
+    # Calculada uma vez por dataset e reaproveitada pelos callbacks do
+    # gráfico e do download, que pedem a mesma classificação.
+    caminho = df.attrs.get("caminho_dataset")
+
+    if caminho:
+        completa = obter_em_cache(
+            caminho,
+            ("fase_mais_avancada", tuple(ordem_fases)),
+            lambda c: calcular_fase_mais_avancada(carregar_dataset_em_cache(c), ordem_fases)
+        )
+        # O índice sozinho não garante que as linhas são as do arquivo (um
+        # reset_index, por exemplo): a mesma conferência da matriz de etapas
+        # é feita antes de reaproveitar o resultado.
+        matriz = carregar_matriz_em_cache(caminho)
+        posicoes = posicoes_no_dataset(df, len(completa))
+        if (
+            matriz is not None
+            and posicoes is not None
+            and len(matriz) == len(completa)
+            and confere_com_matriz(matriz[posicoes], df, exigir_coluna=True)
+        ):
+            return pd.Series(completa.array.take(posicoes), index=df.index, name=completa.name)
+
+    return calcular_fase_mais_avancada(df, ordem_fases)
+
+def agrupar_fases(fases: pd.Series, grupos: dict, grupo_padrao: str) -> pd.Series:
+    # grupos: rótulo -> lista de fases. Fases fora dos grupos, e linhas sem
+    # fase, ficam no grupo padrão.
+    rotulos = list(grupos) + [grupo_padrao]
+    grupo_da_fase = {fase: grupo for grupo, lista in grupos.items() for fase in lista}
+
+    # O último elemento atende o código -1 (sem fase).
+    tabela = np.array(
+        [rotulos.index(grupo_da_fase.get(fase, grupo_padrao)) for fase in fases.cat.categories]
+        + [len(rotulos) - 1]
+    )
+
+    return pd.Series(
+        pd.Categorical.from_codes(tabela[fases.cat.codes.to_numpy()], categories=rotulos),
+        index=fases.index
+    )
+
+def resumir_tempos_por_fase(tempos: dict, fases) -> pd.DataFrame:
+    # Soma e média dos tempos de cada fase em nanossegundos, o formato em
+    # que as métricas são gravadas junto com o dataset.
+    linhas = []
+    for fase in fases:
+        validos = tempos[fase].dropna()
+        total = validos.sum()
+        medio = validos.mean() if len(validos) > 0 else pd.Timedelta(0)
+        linhas.append((fase, total.value, medio.value))
+
+    return pd.DataFrame(linhas, columns=["fase", "tempo_total_ns", "tempo_medio_ns"])
+
+def tempos_do_resumo(resumo: pd.DataFrame):
+    totais = {fase: pd.Timedelta(int(ns)) for fase, ns in zip(resumo["fase"], resumo["tempo_total_ns"])}
+    medios = {fase: pd.Timedelta(int(ns)) for fase, ns in zip(resumo["fase"], resumo["tempo_medio_ns"])}
+    return totais, medios
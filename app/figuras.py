@@ -0,0 +1,64 @@
+import json
+import os
+
+import plotly.io as pio
+from dash import Patch
+
+from cache import CacheLRU
+
+# Figuras já serializadas, por dataset, aba, filtro e seleção: alternar
+# entre filtros que já foram vistos não monta o go.Figure de novo.
+cache_figuras = CacheLRU(
+    limite_bytes=int(os.getenv("FIGURA_CACHE_MB", "64")) * 1024 * 1024,
+    medir_tamanho=len
+)
+
+
+def chave_figura(df, aba: str, filtro, selecao):
+    caminho = df.attrs.get("caminho_dataset")
+    if not caminho or not os.path.exists(caminho):
+        return None
+
+    # O nome do arquivo processado já leva o hash do upload; o mtime cobre
+    # um dataset regravado no mesmo caminho.
+    return (
+        os.path.abspath(caminho),
+        os.path.getmtime(caminho),
+        aba,
+        json.dumps(filtro, sort_keys=True, default=str),
+        json.dumps(selecao, sort_keys=True, default=str),
+    )
+
+
+def figura_em_cache(df, aba: str, filtro, criar, selecao=None):
+    chave = chave_figura(df, aba, filtro, selecao)
+    if chave is None:
+        return criar()
+
+    texto = cache_figuras.obter(chave)
+    if texto is not None:
+        return json.loads(texto)
+
+    figura = criar()
+    cache_figuras.guardar(chave, pio.to_json(figura, validate=False))
+    return figura
+
+
+def opacidades_selecao(grupos, selecionados) -> list:
+    # Barras fora da seleção ficam apagadas; sem seleção, todas acesas.
+    # Mesma regra de assets/selecao.js, que trata os cliques no navegador.
+    grupos = list(grupos)
+    if selecionados is None or set(selecionados) == set(grupos):
+        selecionados = grupos
+
+    return [1.0 if grupo in selecionados else 0.4 for grupo in grupos]
+
+
+def patch_opacidades(opacidades, visivel=None):
+    # Atualização parcial: só a opacidade de cada trace vai para o navegador.
+    patch = Patch()
+    for indice, opacidade in enumerate(opacidades):
+        patch["data"][indice]["opacity"] = opacidade
+        if visivel is not None:
+            patch["data"][indice]["visible"] = visivel
+    return patch
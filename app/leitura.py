@@ -0,0 +1,192 @@
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from lxml import etree
+from openpyxl import load_workbook
+
+TAMANHO_INICIAL = 1024
+# Teto da pré-alocação: muitos exportadores gravam a dimensão da planilha
+# como A1:XX1048576, e 1M de posições por coluna custaria centenas de MB
+# antes de ler qualquer linha. Acima disso as colunas crescem dobrando.
+TAMANHO_INICIAL_MAXIMO = 131072
+
+# Mesma limpeza de espaços que o pd.read_html aplica ao texto das células.
+RE_ESPACOS = re.compile(r"[\r\n]+|\s{2,}")
+
+def resolver_colunas(cabecalho, colunas: list) -> dict:
+    posicoes = {}
+    for posicao, nome in enumerate(cabecalho):
+        if nome is None:
+            continue
+        nome = str(nome).strip()
+        if nome in colunas and nome not in posicoes:
+            posicoes[nome] = posicao
+    return posicoes
+
+class ColunaData:
+    # Datas vão direto para um array datetime64 pré-alocado; qualquer
+    # outro valor (texto, serial do Excel) fica guardado à parte e é
+    # devolvido numa coluna object para normalizar_datas tratar.
+    def __init__(self, tamanho):
+        self.valores = np.full(tamanho, np.datetime64("NaT"), dtype="datetime64[ns]")
+        self.pendentes = {}
+
+    def crescer(self, tamanho):
+        novo = np.full(tamanho, np.datetime64("NaT"), dtype="datetime64[ns]")
+        novo[:len(self.valores)] = self.valores
+        self.valores = novo
+
+    def definir(self, linha, valor):
+        if isinstance(valor, datetime):
+            self.valores[linha] = np.datetime64(valor, "ns")
+        else:
+            self.pendentes[linha] = valor
+
+    def serie(self, total):
+        valores = self.valores[:total]
+        if not self.pendentes:
+            return pd.Series(valores)
+
+        misturado = pd.Series(valores).astype(object)
+        misturado[pd.isna(misturado)] = None
+        for linha, valor in self.pendentes.items():
+            misturado.iat[linha] = valor
+        return misturado
+
+class ColunaTexto:
+    def __init__(self, tamanho):
+        self.valores = np.full(tamanho, None, dtype=object)
+
+    def crescer(self, tamanho):
+        novo = np.full(tamanho, None, dtype=object)
+        novo[:len(self.valores)] = self.valores
+        self.valores = novo
+
+    def definir(self, linha, valor):
+        self.valores[linha] = valor
+
+    def serie(self, total):
+        return pd.Series(self.valores[:total], dtype=object)
+
+def ler_xlsx_colunas(caminho_arquivo, colunas: list, colunas_data: list) -> pd.DataFrame:
+    colunas = list(dict.fromkeys(colunas))
+
+    wb = load_workbook(caminho_arquivo, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+
+        cabecalho = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        posicoes = resolver_colunas(cabecalho, colunas)
+        if not posicoes:
+            raise ValueError("Nenhuma das colunas esperadas foi encontrada no arquivo")
+
+        # Só o intervalo de colunas que contém as necessárias é lido.
+        primeira = min(posicoes.values())
+        ultima = max(posicoes.values())
+
+        tamanho = min(max((ws.max_row or 0) - 1, TAMANHO_INICIAL), TAMANHO_INICIAL_MAXIMO)
+        destinos = {
+            nome: ColunaData(tamanho) if nome in colunas_data else ColunaTexto(tamanho)
+            for nome in posicoes
+        }
+        indices = [(destinos[nome], posicao - primeira) for nome, posicao in posicoes.items()]
+
+        # Como o pd.read_excel, linhas vazias no meio da planilha continuam
+        # no DataFrame (contam nos totais); só as vazias do final são
+        # descartadas.
+        total = 0
+        preenchidas = 0
+        for linha in ws.iter_rows(
+            min_row=2,
+            min_col=primeira + 1,
+            max_col=ultima + 1,
+            values_only=True
+        ):
+            if total == tamanho:
+                tamanho *= 2
+                for destino in destinos.values():
+                    destino.crescer(tamanho)
+
+            for destino, posicao in indices:
+                valor = linha[posicao] if posicao < len(linha) else None
+                if valor is None or valor == "":
+                    continue
+                preenchidas = total + 1
+                destino.definir(total, valor)
+
+            total += 1
+    finally:
+        wb.close()
+
+    return pd.DataFrame(
+        {nome: destinos[nome].serie(preenchidas) for nome in colunas if nome in destinos}
+    )
+
+def texto_celula(celula) -> str:
+    return RE_ESPACOS.sub(" ", "".join(celula.itertext())).strip()
+
+def converter_numericas(serie: pd.Series) -> pd.Series:
+    # O pd.read_html converte colunas só com números; o leitor em streaming
+    # faz o mesmo para as colunas que não são de data.
+    convertida = pd.to_numeric(serie, errors="coerce")
+    if convertida.notna().sum() == serie.notna().sum():
+        return convertida
+    return serie
+
+def ler_html_colunas(caminho_arquivo, colunas: list, colunas_data: list) -> pd.DataFrame:
+    colunas = list(dict.fromkeys(colunas))
+    destinos = {nome: ColunaTexto(TAMANHO_INICIAL) for nome in colunas}
+    tamanho = TAMANHO_INICIAL
+    total = 0
+    encontradas = set()
+    indices = None
+
+    for _, elemento in etree.iterparse(
+        str(caminho_arquivo),
+        events=("end",),
+        tag=("tr", "table"),
+        html=True,
+        recover=True
+    ):
+        if elemento.tag == "table":
+            indices = None
+        else:
+            celulas = [texto_celula(c) for c in elemento if c.tag in ("td", "th")]
+
+            if indices is None:
+                # Primeira linha da tabela é o cabeçalho; tabelas sem
+                # nenhuma coluna esperada são ignoradas por inteiro.
+                posicoes = resolver_colunas(celulas, colunas)
+                indices = [(destinos[nome], posicao) for nome, posicao in posicoes.items()]
+                encontradas.update(posicoes)
+            elif indices:
+                if total == tamanho:
+                    tamanho *= 2
+                    for destino in destinos.values():
+                        destino.crescer(tamanho)
+
+                for destino, posicao in indices:
+                    valor = celulas[posicao] if posicao < len(celulas) else ""
+                    if valor != "":
+                        destino.definir(total, valor)
+                total += 1
+
+        # Libera o que já foi lido para a memória não crescer com o arquivo.
+        elemento.clear()
+        while elemento.getprevious() is not None:
+            del elemento.getparent()[0]
+
+    if not encontradas:
+        raise ValueError("Nenhuma das colunas esperadas foi encontrada no arquivo")
+
+    df = pd.DataFrame(
+        {nome: destinos[nome].serie(total) for nome in colunas if nome in encontradas}
+    )
+
+    for nome in df.columns:
+        if nome not in colunas_data:
+            df[nome] = converter_numericas(df[nome])
+
+    return df
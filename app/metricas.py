@@ -0,0 +1,77 @@
+import json
+import os
+
+import pandas as pd
+
+from arq import SUFIXO_METRICAS, carregar_dataset
+from cache import eh_dataset_completo, obter_em_cache
+
+# Tabelas agregadas de cada aba, registradas pelas próprias páginas:
+# nome -> função que recebe o dataset completo e devolve um DataFrame
+# pequeno (algumas centenas de linhas no máximo).
+VISOES = {}
+
+def registrar_visao(nome: str, calcular) -> None:
+    VISOES[nome] = calcular
+
+def modulos_das_visoes() -> list:
+    return sorted({calcular.__module__ for calcular in VISOES.values()})
+
+def tabela_para_json(tabela: pd.DataFrame) -> dict:
+    return tabela.to_dict(orient="split", index=False)
+
+def tabela_de_json(dados: dict) -> pd.DataFrame:
+    return pd.DataFrame(dados["data"], columns=dados["columns"])
+
+def materializar_metricas(caminho_dataset: str, informar_etapa=None) -> None:
+    if informar_etapa is not None:
+        informar_etapa("metricas")
+
+    df = carregar_dataset(caminho_dataset)
+    metricas = {"linhas": len(df), "visoes": {}}
+
+    for nome, calcular in VISOES.items():
+        try:
+            metricas["visoes"][nome] = tabela_para_json(calcular(df))
+        except Exception as e:
+            # A aba volta a calcular a partir das linhas quando abrir.
+            print(f"Não foi possível materializar a visão {nome}:", e)
+
+    with open(f"{caminho_dataset}{SUFIXO_METRICAS}", "w", encoding="utf-8") as arquivo:
+        json.dump(metricas, arquivo, ensure_ascii=False)
+
+def carregar_metricas(caminho_dataset: str):
+    caminho_metricas = f"{caminho_dataset}{SUFIXO_METRICAS}"
+    if not os.path.exists(caminho_metricas):
+        return None
+
+    with open(caminho_metricas, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+def obter_metricas(df: pd.DataFrame, nome: str) -> pd.DataFrame:
+    # Só vale para o dataset inteiro, não para recortes dele, mesmo que
+    # tenham o mesmo número de linhas.
+    if eh_dataset_completo(df):
+        metricas = obter_em_cache(df.attrs["caminho_dataset"], "metricas", carregar_metricas)
+
+        if metricas and nome in metricas["visoes"]:
+            return tabela_de_json(metricas["visoes"][nome])
+
+    return VISOES[nome](df)
+
+def dados_da_aba(df: pd.DataFrame, nome: str, calcular):
+    # O layout de uma aba e os callbacks que disparam logo depois chegam em
+    # requisições separadas; os dados intermediários da aba ficam no cache
+    # do dataset para serem calculados uma vez só.
+    # Recortes do dataset, mesmo do mesmo tamanho, calculam na hora.
+    if not eh_dataset_completo(df):
+        return calcular(df)
+
+    dados = obter_em_cache(df.attrs["caminho_dataset"], ("aba", nome), lambda c: calcular(df))
+
+    # Cópias rasas, como em carregar_dataset_em_cache: quem recebe pode
+    # criar colunas sem alterar o que está no cache.
+    return tuple(
+        item.copy(deep=False) if isinstance(item, pd.DataFrame) else item
+        for item in dados
+    )
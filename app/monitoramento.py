@@ -0,0 +1,162 @@
+import hmac
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request
+
+# Desligado por padrão: sem METRICAS_ATIVAS=1 nenhum hook é registrado e as
+# requisições seguem sem custo algum.
+METRICAS_ATIVAS = os.getenv("METRICAS_ATIVAS", "0") == "1"
+METRICAS_TOKEN = os.getenv("METRICAS_TOKEN")
+
+LIMITES_SEGUNDOS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+LIMITES_BYTES = [1024, 10 * 1024, 100 * 1024, 500 * 1024, 1024 * 1024, 5 * 1024 * 1024, 20 * 1024 * 1024]
+
+ROTA_CALLBACKS = "/dash/_dash-update-component"
+PREFIXOS_IGNORADOS = ("/dash", "/_dash", "/assets", "/static", "/metrics")
+
+callbacks_registrados = {}
+
+# (tipo, nome) -> {"duracao": [...], "bytes": [...], "soma_duracao", "soma_bytes", "erros"}
+series = {}
+lock_series = threading.Lock()
+
+
+def nova_serie() -> dict:
+    return {
+        "duracao": [0] * (len(LIMITES_SEGUNDOS) + 1),
+        "bytes": [0] * (len(LIMITES_BYTES) + 1),
+        "soma_duracao": 0.0,
+        "soma_bytes": 0,
+        "erros": 0,
+    }
+
+
+def registrar(tipo: str, nome: str, duracao: float, tamanho: int, erro: bool) -> None:
+    # Cada observação entra só no primeiro balde que a comporta; os valores
+    # acumulados do formato do Prometheus são somados na exportação.
+    balde_duracao = bisect_left(LIMITES_SEGUNDOS, duracao)
+    balde_bytes = bisect_left(LIMITES_BYTES, tamanho)
+
+    with lock_series:
+        serie = series.get((tipo, nome))
+        if serie is None:
+            serie = series[(tipo, nome)] = nova_serie()
+
+        serie["duracao"][balde_duracao] += 1
+        serie["bytes"][balde_bytes] += 1
+        serie["soma_duracao"] += duracao
+        serie["soma_bytes"] += tamanho
+        if erro:
+            serie["erros"] += 1
+
+
+def nome_da_requisicao():
+    if request.path == ROTA_CALLBACKS:
+        # O id do callback no Dash é o das saídas ("..a.b...c.d.." quando
+        # são várias), o mesmo de /dash/_dash-dependencies. Ids que não estão
+        # registrados viram um só rótulo, para o cliente não criar séries.
+        corpo = request.get_json(silent=True) or {}
+        saida = corpo.get("output")
+        return "callback", saida if saida in callbacks_registrados else "desconhecido"
+
+    if request.url_rule is None or request.path.startswith(PREFIXOS_IGNORADOS):
+        return None
+
+    return "rota", request.url_rule.rule
+
+
+def iniciar_medicao():
+    g.inicio_medicao = time.perf_counter()
+
+
+def finalizar_medicao(response):
+    inicio = g.pop("inicio_medicao", None)
+    if inicio is None:
+        return response
+
+    nome = nome_da_requisicao()
+    if nome is not None:
+        registrar(
+            nome[0],
+            nome[1],
+            time.perf_counter() - inicio,
+            response.content_length or 0,
+            response.status_code >= 500 or (nome[0] == "callback" and response.status_code >= 400)
+        )
+
+    return response
+
+
+def escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def linhas_histograma(metrica: str, rotulo: str, limites: list, contagens: list, soma) -> list:
+    linhas = []
+    acumulado = 0
+    for limite, contagem in zip(limites + ["+Inf"], contagens):
+        acumulado += contagem
+        linhas.append(f'{metrica}_bucket{{{rotulo},le="{limite}"}} {acumulado}')
+    linhas.append(f"{metrica}_sum{{{rotulo}}} {soma}")
+    linhas.append(f"{metrica}_count{{{rotulo}}} {acumulado}")
+    return linhas
+
+
+def exportar_prometheus() -> str:
+    with lock_series:
+        copia = {chave: dict(serie, duracao=list(serie["duracao"]), bytes=list(serie["bytes"])) for chave, serie in series.items()}
+
+    saida = []
+    for tipo, descricao, rotulo in (
+        ("callback", "dos callbacks do Dash", "callback"),
+        ("rota", "das rotas do Flask", "rota"),
+    ):
+        itens = sorted((nome, serie) for (t, nome), serie in copia.items() if t == tipo)
+        prefixo = f"dashboard_{tipo}"
+
+        saida.append(f"# HELP {prefixo}_duracao_segundos Latência {descricao}.")
+        saida.append(f"# TYPE {prefixo}_duracao_segundos histogram")
+        for nome, serie in itens:
+            saida.extend(linhas_histograma(
+                f"{prefixo}_duracao_segundos", f'{rotulo}="{escapar(nome)}"',
+                LIMITES_SEGUNDOS, serie["duracao"], serie["soma_duracao"]
+            ))
+
+        saida.append(f"# HELP {prefixo}_resposta_bytes Tamanho das respostas {descricao}.")
+        saida.append(f"# TYPE {prefixo}_resposta_bytes histogram")
+        for nome, serie in itens:
+            saida.extend(linhas_histograma(
+                f"{prefixo}_resposta_bytes", f'{rotulo}="{escapar(nome)}"',
+                LIMITES_BYTES, serie["bytes"], serie["soma_bytes"]
+            ))
+
+        saida.append(f"# HELP {prefixo}_erros_total Respostas com erro {descricao}.")
+        saida.append(f"# TYPE {prefixo}_erros_total counter")
+        for nome, serie in itens:
+            saida.append(f'{prefixo}_erros_total{{{rotulo}="{escapar(nome)}"}} {serie["erros"]}')
+
+    return "\n".join(saida) + "\n"
+
+
+def token_valido() -> bool:
+    if not METRICAS_TOKEN:
+        return False
+
+    cabecalho = request.headers.get("Authorization", "")
+    return hmac.compare_digest(cabecalho, f"Bearer {METRICAS_TOKEN}")
+
+
+def instrumentar(app) -> None:
+    if not METRICAS_ATIVAS:
+        return
+
+    # O mapa do Dash é preenchido a cada @app.callback, inclusive os
+    # declarados depois desta chamada.
+    global callbacks_registrados
+    callbacks_registrados = app.callback_map
+
+    app.server.before_request(iniciar_medicao)
+    app.server.after_request(finalizar_medicao)
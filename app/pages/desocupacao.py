@@ -3,6 +3,11 @@ import numpy as np
 from dash import dcc, html, dash_table
 import plotly.graph_objects as go
 
+from fases import tempos_ate_proxima_fase, resumir_tempos_por_fase, tempos_do_resumo
+from figuras import figura_em_cache
+from metricas import obter_metricas, registrar_visao
+from tabelas import PAGINACAO_SERVIDOR
+
 COLUNAS_FIXA_DESOCUPACAO = [
     '[Setor] Etapa - XX',
     '[Setor] Etapa - XX'
@@ -79,26 +84,6 @@ mapa_fases_curtas = {
     "Etapa M": "[Setor] Etapa - X16"
 }
 
-def calcular_tempo_na_fase(row, fase_inicio, fases_desoc, todas_fases):
-    if pd.isna(row[fase_inicio]):
-        return pd.NaT
-
-    data_inicio = row[fase_inicio]
-    datas_validas = []
-
-    for fase in todas_fases:
-        if fase in fases_desoc:
-            continue
-        data = row.get(fase)
-        if pd.notna(data) and data > data_inicio:
-            datas_validas.append(data)
-
-    if not datas_validas:
-        return pd.NaT
-
-    return min(datas_validas) - data_inicio
-
-
 def formatar_timedelta(td):
     total_segundos = int(td.total_seconds())
     dias = total_segundos // 86400
@@ -106,26 +91,23 @@ def formatar_timedelta(td):
     minutos = (total_segundos % 3600) // 60
     return f'{dias}d {horas}h {minutos}m'
 
-def criar_layout_desocupacao(df: pd.DataFrame):
-    df_copia = df.copy()
-    desocupacao = df_copia[df_copia['Finalizado'] == True].copy()
+def calcular_tempos_desocupacao(df: pd.DataFrame):
+    desocupacao = df[df['Finalizado'] == True]
 
-    for fase in fases_desoc:
-        desocupacao[f'tempo_{fase}'] = desocupacao.apply(
-            lambda row: calcular_tempo_na_fase(row, fase, fases_desoc, todas_fases),
-            axis=1
-        )
+    tempos = tempos_ate_proxima_fase(desocupacao, fases_desoc, todas_fases, ignorar=fases_desoc)
 
-    tempo_total_acumulado = pd.Timedelta(0)
-    tempos_por_fase_real = {}
-    tempos_medios_por_fase = {}
+    return resumir_tempos_por_fase(tempos, fases_desoc)
+
+registrar_visao('tempos_desocupacao', calcular_tempos_desocupacao)
 
+def criar_layout_desocupacao(df: pd.DataFrame):
+    tempos_por_fase_real, tempos_medios_por_fase = tempos_do_resumo(
+        obter_metricas(df, 'tempos_desocupacao')
+    )
+
+    tempo_total_acumulado = pd.Timedelta(0)
     for fase in fases_desoc:
-        tempos_validos = desocupacao[f'tempo_{fase}'].dropna()
-        tempo_fase = tempos_validos.sum()
-        tempos_por_fase_real[fase] = tempo_fase
-        tempo_total_acumulado += tempo_fase
-        tempos_medios_por_fase[fase] = tempos_validos.mean() if len(tempos_validos) > 0 else pd.Timedelta(0)
+        tempo_total_acumulado += tempos_por_fase_real[fase]
 
     valores_segundos_fase = pd.Series({k: v.total_seconds() / 86400 for k, v in tempos_por_fase_real.items()})
     valores_dias_tempo_medio = pd.Series({fase: tempos_medios_por_fase[fase].total_seconds() / 86400 for fase in fases_desoc})
@@ -235,8 +217,8 @@ def criar_layout_desocupacao(df: pd.DataFrame):
 
     layout = html.Div(
         children=[
-            dcc.Graph(id="grafico-desocupacao-pizza", figure=criar_graficos_tempo()),
-            dcc.Graph(id="grafico-desocupacao-barras", figure=criar_grafico_fases()),
+            dcc.Graph(id="grafico-desocupacao-pizza", figure=figura_em_cache(df, "desocupacao_pizza", None, criar_graficos_tempo)),
+            dcc.Graph(id="grafico-desocupacao-barras", figure=figura_em_cache(df, "desocupacao_barras", None, criar_grafico_fases)),
 
             html.Button(
                 "📥",
@@ -257,13 +239,13 @@ def criar_layout_desocupacao(df: pd.DataFrame):
                     "zIndex": "1000"
                 }
             ),
-            dcc.Download(id="download-desocupacao"),
 
             dash_table.DataTable(
                 id="tabela-desocupacao",
                 columns=[{'name': col, 'id': col} for col in COLUNAS_FIXA_DESOCUPACAO + COLUNAS_ETAPAS_DESOCUPACAO],
                 data = [],
                 page_size=15,
+                **PAGINACAO_SERVIDOR,
                 fixed_rows={"headers": True},
                 style_table={
                     'overflowX': 'auto',
@@ -3,6 +3,8 @@ import plotly.graph_objects as go
 from dash import html, dcc
 from dash.dash_table import DataTable
 
+from figuras import figura_em_cache
+
 COLUNAS_TABELA_SEM_PENDENCIAS = [
     '[Setor] Etapa - XX',
     '[Setor] Etapa - XX',
@@ -163,7 +165,6 @@ def criar_layout_imovel_sem_pendencias(df):
             }
         ),
 
-        dcc.Download(id="download-excel-sem-pendencia"),
         
         dcc.Dropdown(
             id="filtro-imovel-sem-pendencia",
@@ -179,15 +180,20 @@ def criar_layout_imovel_sem_pendencias(df):
         
         dcc.Graph(
             id="grafico-imovel-sem-pendencia", 
-            figure=criar_grafico_sem_pendencias(
-                VALORES_SP, 
-                LABELS_SP, 
-                CORES_SP, 
-                PULL_SP, 
-                total_sp,
-                qtd_com_data,
-                qtd_sem_data,
-                "todos"
+            figure=figura_em_cache(
+                df,
+                "sem_pendencias",
+                "todos",
+                lambda: criar_grafico_sem_pendencias(
+                    VALORES_SP,
+                    LABELS_SP,
+                    CORES_SP,
+                    PULL_SP,
+                    total_sp,
+                    qtd_com_data,
+                    qtd_sem_data,
+                    "todos"
+                )
             )
         ),
         html.Div(id="lista-imoveis-sem-pendencia", style={"marginTop": "30px"})
@@ -2,6 +2,10 @@ import pandas as pd
 import plotly.graph_objects as go
 from dash import html, dcc, dash_table
 
+from fases import fase_mais_avancada, agrupar_fases
+from figuras import figura_em_cache, opacidades_selecao
+from metricas import dados_da_aba
+
 COLUNAS_TABELA_LIBERACAO = [
     '[Setor] Etapa - XX'
     '[Setor] Etapa - XX'
@@ -12,7 +16,7 @@ COLUNAS_TABELA_LIBERACAO = [
     'Finalizado'
 ]
 
-def processar_dados_liberacao(df):
+def calcular_dados_liberacao(df):
 
     antes_vistoria = [
         '[Setor] Etapa - XX',
@@ -56,59 +60,36 @@ def processar_dados_liberacao(df):
         df['[Setor] Etapa - X10'].notna()
     ].copy()
 
-    def encontrar_fase_mais_avancada(linha):
-        for fase in ordem_fases:
-            if fase in linha and pd.notna(linha[fase]):
-                return fase
-        return None
-
-    def classificar_vistoria(fase):
-        if fase in antes_vistoria:
-            return 'Antes da Vistoria'
-        elif fase in depois_vistoria:
-            return 'Após Vistoria e Antes do Envio do Laudo'
-        else:
-            return 'Outras Fases'
-
-    df_filtrado['fase_encontrada'] = df_filtrado.apply(
-        encontrar_fase_mais_avancada,
-        axis=1
-    )
+    df_filtrado['fase_encontrada'] = fase_mais_avancada(df_filtrado, ordem_fases)
 
-    df_filtrado['grupo_vistoria'] = df_filtrado['fase_encontrada'].apply(classificar_vistoria)
+    df_filtrado['grupo_vistoria'] = agrupar_fases(
+        df_filtrado['fase_encontrada'],
+        {
+            'Antes da Vistoria': antes_vistoria,
+            'Após Vistoria e Antes do Envio do Laudo': depois_vistoria
+        },
+        'Outras Fases'
+    )
 
     contagem_grupo = df_filtrado['grupo_vistoria'].value_counts()
+    contagem_grupo = contagem_grupo[contagem_grupo > 0]
 
     return df_filtrado, contagem_grupo 
 
-def atualizar_grupos_selecionados(contagem_grupo, clickData, selected_groups):
-    todos_grupos = list(contagem_grupo.index)
-
-    if selected_groups is None:
-        selected_groups = todos_grupos
-
-    if clickData:
-        grupo_clicado = clickData["points"][0]["x"]
-
-        if selected_groups == [grupo_clicado]:
-            selected_groups = todos_grupos
-        else:
-            selected_groups = [grupo_clicado]
-
-    return selected_groups   
+def processar_dados_liberacao(df):
+    return dados_da_aba(df, "liberacao_vistoria", calcular_dados_liberacao)
 
 def criar_grafico_liberacao_vistoria(contagem_grupo, total, selected_groups=None):
     
     cores = ['#4169E1', '#2E8B57', '#FF8C00']
     cores = cores * (len(contagem_grupo) // len(cores) + 1)
 
-    if selected_groups is None or set(selected_groups) == set(contagem_grupo.index):
-        selected_groups = list(contagem_grupo.index)
+    opacidades = opacidades_selecao(contagem_grupo.index, selected_groups)
 
     fig = go.Figure()
 
     for i, grupo in enumerate(contagem_grupo.index):
-        opacidade = 1.0 if grupo in selected_groups else 0.4
+        opacidade = opacidades[i]
         fig.add_trace(go.Bar(
             x=[grupo],
             y=[contagem_grupo[grupo]],
@@ -189,14 +170,15 @@ def criar_layout_liberacao_vistoria(df):
             }
         ),
 
-        dcc.Download(id="download-excel-liberacao"),
         
         dcc.Graph(
             id="grafico-liberacao",
-            figure=criar_grafico_liberacao_vistoria(
-                contagem_grupo, 
-                total,
-                selected_groups
+            figure=figura_em_cache(
+                df,
+                "liberacao_vistoria",
+                None,
+                lambda: criar_grafico_liberacao_vistoria(contagem_grupo, total, selected_groups),
+                selecao=selected_groups
             )
         ),
                 
@@ -3,6 +3,10 @@ import numpy as np
 from dash import dcc, html, dash_table
 import plotly.graph_objects as go
 
+from fases import tempos_ate_proxima_fase
+from metricas import obter_metricas, registrar_visao
+from tabelas import PAGINACAO_SERVIDOR
+
 COLUNAS_TABELA_MEDIA_DESOCUPACAO = [
     '[Setor] Etapa - XX', 
     '[Setor] Etapa - XX',
@@ -12,7 +16,7 @@ COLUNAS_TABELA_MEDIA_DESOCUPACAO = [
     'Finalizado'
 ]
 
-def criar_layout_media_desocupacao(df: pd.DataFrame):
+def calcular_media_mensal_desocupacao(df: pd.DataFrame):
     df_copia = df.copy()
     desocupacao = df_copia[df_copia['Finalizado'] == True].copy()
     
@@ -55,33 +59,9 @@ def criar_layout_media_desocupacao(df: pd.DataFrame):
         "Etapa M": "[Setor] Etapa - X16"
     }
 
-    def calcular_tempo_na_fase(row, fase_inicio, fases_desocupacao, todas_fases):
-        if pd.isna(row.get(fase_inicio)):
-            return pd.NaT
-    
-        data_inicio = row[fase_inicio]
-        datas_validas = []
-    
-        for fase in todas_fases:
-            data = row.get(fase)
-            if pd.notna(data) and data > data_inicio:
-                datas_validas.append(data)
-    
-        if not datas_validas:
-            return pd.NaT
-    
-        return min(datas_validas) - data_inicio
-
+    tempos = tempos_ate_proxima_fase(desocupacao, fases_desocupacao, todas_fases)
     for fase in fases_desocupacao:
-        desocupacao[f'tempo_{fase}'] = desocupacao.apply(
-            lambda row: calcular_tempo_na_fase(
-                row,
-                fase,
-                fases_desocupacao,
-                todas_fases
-            ),
-            axis=1
-        )
+        desocupacao[f'tempo_{fase}'] = tempos[fase]
     
     desocupacao['Data_fim_desocupacao'] = pd.to_datetime(
         desocupacao['Data_fim_desocupacao']
@@ -91,10 +71,7 @@ def criar_layout_media_desocupacao(df: pd.DataFrame):
     
     df_tempo = desocupacao[colunas_tempo + ['Data_fim_desocupacao']].copy()
     
-    df_tempo['tempo_total_fases_desocupacao'] = df_tempo[colunas_tempo].apply(
-        lambda row: row.sum(min_count=1),
-        axis=1
-    )
+    df_tempo['tempo_total_fases_desocupacao'] = df_tempo[colunas_tempo].sum(axis=1, min_count=1)
     
     df_tempo['tempo_total_dias'] = (
         df_tempo['tempo_total_fases_desocupacao']
@@ -112,17 +89,24 @@ def criar_layout_media_desocupacao(df: pd.DataFrame):
     media_mensal_fases_desocupacao['Mês/Ano_str'] = (
         media_mensal_fases_desocupacao['mes'].astype(str)
     )
-    
-    X = np.arange(len(media_mensal_fases_desocupacao))
-    y = media_mensal_fases_desocupacao['tempo_medio_dias'].values
-    z = np.polyfit(X, y, 1)
-    tendencia = np.poly1d(z)
-    
-    media_mensal_fases_desocupacao['Tendência'] = tendencia(X)
-    max_idx = media_mensal_fases_desocupacao['tempo_medio_dias'].idxmax()
-    min_idx = media_mensal_fases_desocupacao['tempo_medio_dias'].idxmin()
 
+    return media_mensal_fases_desocupacao[['Mês/Ano_str', 'tempo_medio_dias']]
+
+registrar_visao('media_desocupacao', calcular_media_mensal_desocupacao)
+
+def criar_layout_media_desocupacao(df: pd.DataFrame):
     def criar_grafico_media_desocupacao():
+        media_mensal_fases_desocupacao = obter_metricas(df, 'media_desocupacao')
+
+        X = np.arange(len(media_mensal_fases_desocupacao))
+        y = media_mensal_fases_desocupacao['tempo_medio_dias'].values
+        z = np.polyfit(X, y, 1)
+        tendencia = np.poly1d(z)
+    
+        media_mensal_fases_desocupacao['Tendência'] = tendencia(X)
+        max_idx = media_mensal_fases_desocupacao['tempo_medio_dias'].idxmax()
+        min_idx = media_mensal_fases_desocupacao['tempo_medio_dias'].idxmin()
+
         fig = go.Figure()
     
         fig.add_trace(go.Scatter(
@@ -241,7 +225,6 @@ def criar_layout_media_desocupacao(df: pd.DataFrame):
             }
         ),
         
-        dcc.Download(id="download-media-desocupacao"),
                 
         dcc.Graph(
             id='grafico-media-desocupacao'
@@ -252,6 +235,7 @@ def criar_layout_media_desocupacao(df: pd.DataFrame):
             columns=[{'name': col, 'id': col} for col in COLUNAS_TABELA_MEDIA_DESOCUPACAO],
             data=[],
             page_size=15,
+            **PAGINACAO_SERVIDOR,
             fixed_rows={"headers": True},
             style_table={
                 'overflowX': 'auto',
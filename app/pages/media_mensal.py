@@ -3,6 +3,9 @@ import numpy as np
 from dash import dcc, html, dash_table
 import plotly.graph_objects as go
 
+from metricas import obter_metricas, registrar_visao
+from tabelas import PAGINACAO_SERVIDOR
+
 COLUNAS_TABELA_MEDIA_MENSAL =[
     '[Setor] Etapa - XX',
     '[Setor] Etapa - XX',
@@ -11,7 +14,7 @@ COLUNAS_TABELA_MEDIA_MENSAL =[
     'Finalizado'
 ]
 
-def criar_layout_media_mensal(df: pd.DataFrame):
+def calcular_media_mensal(df: pd.DataFrame):
     df_f = df[df['Finalizado'] == True].copy()
     df_f['Data_fim_desocupacao'] = pd.to_datetime(df_f['Data_fim_desocupacao'])
     df_f['duracao_dias'] = df_f['Tempo_total_dias']
@@ -21,17 +24,22 @@ def criar_layout_media_mensal(df: pd.DataFrame):
     media_mensal = df_f.groupby('mes_ano')['duracao_dias'].mean().reset_index()
     media_mensal.columns = ['Mês/Ano', 'Média de Dias']
     media_mensal['Mês/Ano_str'] = media_mensal['Mês/Ano'].astype(str)
-    
-    z = np.polyfit(range(len(media_mensal)), media_mensal['Média de Dias'], 1)
-    p = np.poly1d(z)
-    media_mensal['Tendência'] = p(range(len(media_mensal)))
-    
-    max_idx = media_mensal['Média de Dias'].idxmax()
-    min_idx = media_mensal['Média de Dias'].idxmin()
 
+    return media_mensal[['Mês/Ano_str', 'Média de Dias']]
+
+registrar_visao('media_mensal', calcular_media_mensal)
 
+def criar_layout_media_mensal(df: pd.DataFrame):
     def criar_grafico_media():
-       
+        media_mensal = obter_metricas(df, 'media_mensal')
+    
+        z = np.polyfit(range(len(media_mensal)), media_mensal['Média de Dias'], 1)
+        p = np.poly1d(z)
+        media_mensal['Tendência'] = p(range(len(media_mensal)))
+    
+        max_idx = media_mensal['Média de Dias'].idxmax()
+        min_idx = media_mensal['Média de Dias'].idxmin()
+
         fig = go.Figure()
         fig.add_trace(go.Scatter(
             x=media_mensal['Mês/Ano_str'],
@@ -149,10 +157,9 @@ def criar_layout_media_mensal(df: pd.DataFrame):
                 "zIndex": "1000"
             }
         ),
-        dcc.Download(id="download-media-mensal"),
 
         dcc.Graph(
-            id='grafico-media-mensal', figure=criar_grafico_media()
+            id='grafico-media-mensal'
         ),
 
         dash_table.DataTable(
@@ -160,6 +167,7 @@ def criar_layout_media_mensal(df: pd.DataFrame):
             columns=[{'name': col, 'id':col} for col in COLUNAS_TABELA_MEDIA_MENSAL],
             data=[],
             page_size=15,
+            **PAGINACAO_SERVIDOR,
             fixed_rows={"headers": True},
             style_table={
                 'overflowX': 'auto',
@@ -3,6 +3,10 @@ import numpy as np
 from dash import dcc, html, dash_table
 import plotly.graph_objects as go
 
+from fases import tempos_ate_proxima_fase
+from metricas import obter_metricas, registrar_visao
+from tabelas import PAGINACAO_SERVIDOR
+
 COLUNAS_TABELA_MEDIA_ORCAMENTO = [
     '[Setor] Etapa - XX',
     '[Setor] Etapa - XX',
@@ -11,7 +15,7 @@ COLUNAS_TABELA_MEDIA_ORCAMENTO = [
     'Finalizado'  
 ]
 
-def criar_layout_media_orcamento(df: pd.DataFrame):
+def calcular_media_mensal_orcamento(df: pd.DataFrame):
     df_copia = df.copy()
     orcamento = df_copia[df_copia['Finalizado'] == True].copy()
     
@@ -52,44 +56,16 @@ def criar_layout_media_orcamento(df: pd.DataFrame):
         '[Setor] Etapa - X11': 'Etapa - X11'
     }
 
-    def calcular_tempo_na_fase(row, fase_inicio, fases_orcamento, todas_fases):
-        if pd.isna(row.get(fase_inicio)):
-            return pd.NaT
-    
-        data_inicio = row[fase_inicio]
-        datas_validas = []
-    
-        for fase in todas_fases:
-            data = row.get(fase)
-            if pd.notna(data) and data > data_inicio:
-                datas_validas.append(data)
-    
-        if not datas_validas:
-            return pd.NaT
-    
-        return min(datas_validas) - data_inicio
-
-    
+    tempos = tempos_ate_proxima_fase(orcamento, fases_orcamento, todas_fases)
     for fase in fases_orcamento:
-        orcamento[f'tempo_{fase}'] = orcamento.apply(
-            lambda row: calcular_tempo_na_fase(
-                row,
-                fase,
-                fases_orcamento,
-                todas_fases
-            ),
-            axis=1
-        )
+        orcamento[f'tempo_{fase}'] = tempos[fase]
 
     orcamento['Data_fim_desocupacao'] = pd.to_datetime(orcamento['Data_fim_desocupacao'])
     
     colunas_tempo = [f'tempo_{fase}' for fase in fases_orcamento]
     df_tempo = orcamento[colunas_tempo + ['Data_fim_desocupacao']].copy()
     
-    df_tempo['tempo_total_fases_orcamento'] = df_tempo[colunas_tempo].apply(
-        lambda row: row.sum(min_count=1),
-        axis=1
-    )
+    df_tempo['tempo_total_fases_orcamento'] = df_tempo[colunas_tempo].sum(axis=1, min_count=1)
     
     df_tempo['tempo_total_dias'] = df_tempo['tempo_total_fases_orcamento'].dt.total_seconds() / 86400
     
@@ -102,17 +78,24 @@ def criar_layout_media_orcamento(df: pd.DataFrame):
     )
     
     media_mensal_fases_orcamento['Mês/Ano_str'] = media_mensal_fases_orcamento['mes'].astype(str)
-    
-    X = np.arange(len(media_mensal_fases_orcamento))
-    y = media_mensal_fases_orcamento['tempo_medio_dias'].values
-    z = np.polyfit(X, y, 1)
-    tendencia = np.poly1d(z)
-    media_mensal_fases_orcamento['Tendência'] = tendencia(X)
-    
-    max_idx = media_mensal_fases_orcamento['tempo_medio_dias'].idxmax()
-    min_idx = media_mensal_fases_orcamento['tempo_medio_dias'].idxmin()
 
+    return media_mensal_fases_orcamento[['Mês/Ano_str', 'tempo_medio_dias']]
+
+registrar_visao('media_orcamento', calcular_media_mensal_orcamento)
+
+def criar_layout_media_orcamento(df: pd.DataFrame):
     def criar_grafico_media_orcamento():
+        media_mensal_fases_orcamento = obter_metricas(df, 'media_orcamento')
+
+        X = np.arange(len(media_mensal_fases_orcamento))
+        y = media_mensal_fases_orcamento['tempo_medio_dias'].values
+        z = np.polyfit(X, y, 1)
+        tendencia = np.poly1d(z)
+        media_mensal_fases_orcamento['Tendência'] = tendencia(X)
+    
+        max_idx = media_mensal_fases_orcamento['tempo_medio_dias'].idxmax()
+        min_idx = media_mensal_fases_orcamento['tempo_medio_dias'].idxmin()
+
         fig = go.Figure()
         
         fig.add_trace(go.Scatter(
@@ -231,11 +214,9 @@ def criar_layout_media_orcamento(df: pd.DataFrame):
             }
         ),
         
-        dcc.Download(id="download-media-orcamento"),
         
         dcc.Graph(
-            id='grafico-media-orcamento',
-            figure=criar_grafico_media_orcamento()
+            id='grafico-media-orcamento'
         ),
 
         dash_table.DataTable(
@@ -243,6 +224,7 @@ def criar_layout_media_orcamento(df: pd.DataFrame):
             columns=[{'name': col, 'id': col} for col in COLUNAS_TABELA_MEDIA_ORCAMENTO],
             data=[],
             page_size=15,
+            **PAGINACAO_SERVIDOR,
             fixed_rows={"headers": True},
             style_table={
                 'overflowX': 'auto',
@@ -3,6 +3,10 @@ import numpy as np
 from dash import dcc, html, dash_table
 import plotly.graph_objects as go
 
+from fases import tempos_ate_proxima_fase
+from metricas import obter_metricas, registrar_visao
+from tabelas import PAGINACAO_SERVIDOR
+
 COLUNAS_TABELA_MEDIA_VISTORIA = [
     '[Setor] Etapa - XX',
     '[Setor] Etapa - XX',
@@ -13,7 +17,7 @@ COLUNAS_TABELA_MEDIA_VISTORIA = [
     'Finalizado'
 ]
 
-def criar_layout_media_vistoria(df: pd.DataFrame):
+def calcular_media_mensal_vistoria(df: pd.DataFrame):
     df_copia = df.copy()
     vistoria = df_copia[df_copia['Finalizado'] == True].copy()
 
@@ -56,34 +60,9 @@ def criar_layout_media_vistoria(df: pd.DataFrame):
         '[Setor] Etapa - X9': 'Etapa - X9'
     }
 
-    def calcular_tempo_na_fase(row, fase_inicio, fases_vistoria, todas_fases):
-        if pd.isna(row.get(fase_inicio)):
-            return pd.NaT
-    
-        data_inicio = row[fase_inicio]
-        datas_validas = []
-    
-        for fase in todas_fases:
-            data = row.get(fase)
-            if pd.notna(data) and data > data_inicio:
-                datas_validas.append(data)
-    
-        if not datas_validas:
-            return pd.NaT
-    
-        return min(datas_validas) - data_inicio
-
-    
+    tempos = tempos_ate_proxima_fase(vistoria, fases_vistoria, todas_fases)
     for fase in fases_vistoria:
-        vistoria[f'tempo_{fase}'] = vistoria.apply(
-            lambda row: calcular_tempo_na_fase(
-                row,
-                fase,
-                fases_vistoria,
-                todas_fases
-            ),
-            axis=1
-        )
+        vistoria[f'tempo_{fase}'] = tempos[fase]
 
     vistoria['Data_fim_desocupacao'] = pd.to_datetime(vistoria['Data_fim_desocupacao'])
     
@@ -91,10 +70,7 @@ def criar_layout_media_vistoria(df: pd.DataFrame):
     
     df_tempo = vistoria[colunas_tempo + ['Data_fim_desocupacao']].copy()
     
-    df_tempo['tempo_total_fases_vistoria'] = df_tempo[colunas_tempo].apply(
-        lambda row: row.sum(min_count=1),
-        axis=1
-    )
+    df_tempo['tempo_total_fases_vistoria'] = df_tempo[colunas_tempo].sum(axis=1, min_count=1)
     
     df_tempo['tempo_total_dias'] = df_tempo['tempo_total_fases_vistoria'].dt.total_seconds() / 86400
     
@@ -107,17 +83,24 @@ def criar_layout_media_vistoria(df: pd.DataFrame):
     )
     
     media_mensal_fases_vistoria['Mês/Ano_str'] = media_mensal_fases_vistoria['mes'].astype(str)
-    
-    X = np.arange(len(media_mensal_fases_vistoria))
-    y = media_mensal_fases_vistoria['tempo_medio_dias'].values
-    z = np.polyfit(X, y, 1)
-    tendencia = np.poly1d(z)
-    media_mensal_fases_vistoria['Tendência'] = tendencia(X)
-    
-    max_idx = media_mensal_fases_vistoria['tempo_medio_dias'].idxmax()
-    min_idx = media_mensal_fases_vistoria['tempo_medio_dias'].idxmin()
 
+    return media_mensal_fases_vistoria[['Mês/Ano_str', 'tempo_medio_dias']]
+
+registrar_visao('media_vistoria', calcular_media_mensal_vistoria)
+
+def criar_layout_media_vistoria(df: pd.DataFrame):
     def criar_grafico_media_vistoria():
+        media_mensal_fases_vistoria = obter_metricas(df, 'media_vistoria')
+
+        X = np.arange(len(media_mensal_fases_vistoria))
+        y = media_mensal_fases_vistoria['tempo_medio_dias'].values
+        z = np.polyfit(X, y, 1)
+        tendencia = np.poly1d(z)
+        media_mensal_fases_vistoria['Tendência'] = tendencia(X)
+    
+        max_idx = media_mensal_fases_vistoria['tempo_medio_dias'].idxmax()
+        min_idx = media_mensal_fases_vistoria['tempo_medio_dias'].idxmin()
+
         fig = go.Figure()
         
         fig.add_trace(go.Scatter(
@@ -236,7 +219,6 @@ def criar_layout_media_vistoria(df: pd.DataFrame):
             }
         ),
         
-        dcc.Download(id="download-media-vistoria"),
         
         dcc.Graph(
             id='grafico-media-vistoria'
@@ -247,6 +229,7 @@ def criar_layout_media_vistoria(df: pd.DataFrame):
             columns=[{'name': col, 'id':col} for col in COLUNAS_TABELA_MEDIA_VISTORIA],
             data=[],
             page_size=15,
+            **PAGINACAO_SERVIDOR,
             fixed_rows={"headers": True},
             style_table={
                 'overflowX': 'auto',
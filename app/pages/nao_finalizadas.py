@@ -3,6 +3,10 @@ import plotly.graph_objects as go
 from dash import html, dcc
 from dash.dash_table import DataTable
 
+from fases import fase_mais_avancada
+from figuras import figura_em_cache
+from metricas import dados_da_aba
+
 COLUNAS_TABELA_NAO_FINALIZADAS = [
     '[Setor] Etapa - XX',
     '[Setor] Etapa - XX',
@@ -103,7 +107,7 @@ def criar_grafico_nao_finalizadas(VALORES_NF, LABELS_NF, CORES_NF, PULL_NF, tota
     return fig
 
 
-def layout_nao_finalizadas(df):
+def calcular_dados_nao_finalizadas(df):
     nao_finalizados = df[df['Finalizado'] == False].copy()
 
     cols_paramentro = [
@@ -135,19 +139,23 @@ def layout_nao_finalizadas(df):
         "[Setor] Etapa - X26"
     ]
 
-    def verificar_etapa(row):
-        for col in cols_paramentro:
-            if pd.notna(row[col]) and row[col] != "":
-                return True
-        return False
-
-    nao_finalizados['Desocupacoes_em_andamento'] = nao_finalizados.apply(verificar_etapa, axis=1)
+    # As colunas de etapa são datas, então preenchida equivale a não nula.
+    nao_finalizados['Desocupacoes_em_andamento'] = fase_mais_avancada(
+        nao_finalizados, cols_paramentro
+    ).notna()
     nao_finalizados['Desocupacao_nao_finalizada'] = ~nao_finalizados['Desocupacoes_em_andamento']
 
     em_andamento = int(nao_finalizados['Desocupacoes_em_andamento'].sum())
     sem_automacao = int(nao_finalizados['Desocupacao_nao_finalizada'].sum())
     total = len(nao_finalizados)
 
+    return nao_finalizados, em_andamento, sem_automacao, total
+
+def layout_nao_finalizadas(df):
+    nao_finalizados, em_andamento, sem_automacao, total = dados_da_aba(
+        df, "nao_finalizadas", calcular_dados_nao_finalizadas
+    )
+
     VALORES_NF = {
         "todos": [em_andamento, sem_automacao],
         "andamento": [em_andamento],
@@ -198,7 +206,6 @@ def layout_nao_finalizadas(df):
             }
         ),
 
-        dcc.Download(id="download-nao-finalizado"),
 
         dcc.Dropdown(
             id="filtro-desocupacao-nao-finalizadas",
@@ -214,13 +221,18 @@ def layout_nao_finalizadas(df):
 
         dcc.Graph(
             id="grafico-desocupacao-nao-finalizadas",
-            figure=criar_grafico_nao_finalizadas(
-                VALORES_NF,
-                LABELS_NF,
-                CORES_NF,
-                PULL_NF,
-                total,
-                "todos"
+            figure=figura_em_cache(
+                df,
+                "nao_finalizadas",
+                "todos",
+                lambda: criar_grafico_nao_finalizadas(
+                    VALORES_NF,
+                    LABELS_NF,
+                    CORES_NF,
+                    PULL_NF,
+                    total,
+                    "todos"
+                )
             )
         ),
 
@@ -3,6 +3,11 @@ import numpy as np
 from dash import html, dcc, html, dash_table
 import plotly.graph_objects as go
 
+from fases import tempos_ate_proxima_fase, resumir_tempos_por_fase, tempos_do_resumo
+from figuras import figura_em_cache
+from metricas import obter_metricas, registrar_visao
+from tabelas import PAGINACAO_SERVIDOR
+
 COLUNAS_FIXA_ORCAMENTO = [
     '[Setor] Etapa - XX',
     '[Setor] Etapa - XX'
@@ -55,25 +60,6 @@ mapa_fases_curtas = {
     '[Setor] Etapa - X11'
 }
 
-def calcular_tempo_na_fase(row, fase_inicio, fases_orcamento, todas_fases):
-    if pd.isna(row[fase_inicio]):
-        return pd.NaT
-
-    data_inicio = row[fase_inicio]
-    datas_validas = []
-
-    for fase in todas_fases:
-        if fase in fases_orcamento:
-            continue
-        data = row.get(fase)
-        if pd.notna(data) and data > data_inicio:
-            datas_validas.append(data)
-
-    if not datas_validas:
-        return pd.NaT
-
-    return min(datas_validas) - data_inicio
-
 def formatar_timedelta(td):
     total_segundos = int(td.total_seconds())
     dias = total_segundos // 86400
@@ -81,25 +67,23 @@ def formatar_timedelta(td):
     minutos = (total_segundos % 3600) // 60
     return f'{dias}d {horas}h {minutos}m'
 
-def criar_layout_orcamento(df: pd.DataFrame):
-    df_orcamento = df[df['Finalizado'] == True].copy()
+def calcular_tempos_orcamento(df: pd.DataFrame):
+    df_orcamento = df[df['Finalizado'] == True]
 
-    for fase in fases_orcamento:
-        df_orcamento[f'tempo_{fase}'] = df_orcamento.apply(
-            lambda row: calcular_tempo_na_fase(row, fase, fases_orcamento, todas_fases),
-            axis=1
-        )
+    tempos = tempos_ate_proxima_fase(df_orcamento, fases_orcamento, todas_fases, ignorar=fases_orcamento)
 
-    tempo_total_acumulado = pd.Timedelta(0)
-    tempos_por_fase_real = {}
-    tempos_medios_por_fase = {}
+    return resumir_tempos_por_fase(tempos, fases_orcamento)
 
+registrar_visao('tempos_orcamento', calcular_tempos_orcamento)
+
+def criar_layout_orcamento(df: pd.DataFrame):
+    tempos_por_fase_real, tempos_medios_por_fase = tempos_do_resumo(
+        obter_metricas(df, 'tempos_orcamento')
+    )
+
+    tempo_total_acumulado = pd.Timedelta(0)
     for fase in fases_orcamento:
-        tempos_validos = df_orcamento[f'tempo_{fase}'].dropna()
-        tempo_fase = tempos_validos.sum()
-        tempos_por_fase_real[fase] = tempo_fase
-        tempo_total_acumulado += tempo_fase
-        tempos_medios_por_fase[fase] = tempos_validos.mean() if len(tempos_validos) > 0 else pd.Timedelta(0)
+        tempo_total_acumulado += tempos_por_fase_real[fase]
 
     valores_segundos_fase = pd.Series({k: v.total_seconds() / 86400 for k, v in tempos_por_fase_real.items()})
     valores_dias_tempo_medio = pd.Series({fase: tempos_medios_por_fase[fase].total_seconds() / 86400 for fase in fases_orcamento})
@@ -201,8 +185,8 @@ def criar_layout_orcamento(df: pd.DataFrame):
         
     layout = html.Div(
         children=[
-            dcc.Graph(id='grafico-orcamento-pizza', figure=criar_grafico_pizza()),
-            dcc.Graph(id='grafico-orcamento-barras', figure=criar_grafico_barras()),
+            dcc.Graph(id='grafico-orcamento-pizza', figure=figura_em_cache(df, 'orcamento_pizza', None, criar_grafico_pizza)),
+            dcc.Graph(id='grafico-orcamento-barras', figure=figura_em_cache(df, 'orcamento_barras', None, criar_grafico_barras)),
 
             html.Button(
                 "📥",
@@ -223,13 +207,13 @@ def criar_layout_orcamento(df: pd.DataFrame):
                     "zIndex": "1000"
                 }
             ),
-            dcc.Download(id="download-orcamento"),
 
             dash_table.DataTable(
                 id="tabela-orcamento",
                 columns=[{'name': col, 'id': col} for col in COLUNAS_FIXA_ORCAMENTO + COLUNAS_ETAPAS_ORCAMENTO],
                 data = [],
                 page_size=15,
+                **PAGINACAO_SERVIDOR,
                 fixed_rows={"headers": True},
                 style_table={
                     'overflowX': 'auto',
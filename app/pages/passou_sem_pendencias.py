@@ -2,6 +2,10 @@ import pandas as pd
 from dash import html, dcc, dash_table
 import plotly.graph_objects as go
 
+from fases import fase_mais_avancada
+from figuras import figura_em_cache, opacidades_selecao
+from metricas import dados_da_aba
+
 COLUNAS_TABELA_PASSOU_SP = [
     '[Setor] Etapa - XX',
     '[Setor] Etapa - XX',
@@ -26,7 +30,7 @@ COLUNAS_TABELA_PASSOU_SP = [
     'Finalizado'
 ]
 
-def processar_dados_passou_sp(df):
+def calcular_dados_passou_sp(df):
     imoveis_com_data = df[df['[Desocupação] Etapa - Imóvel Sem Pendências'].notna()].copy()
 
     ordem_fases = [
@@ -51,49 +55,25 @@ def processar_dados_passou_sp(df):
         '[Setor] Etapa - XX'
     ]
 
-    def validar_fase_na_ordem(linha, ordem_fases):
-        for fase in ordem_fases:
-            if fase in linha.index and pd.notna(linha[fase]):
-                return fase
-        return None
-
-    imoveis_com_data['fase_encontrada'] = imoveis_com_data.apply(
-        validar_fase_na_ordem,
-        axis=1,
-        ordem_fases=ordem_fases
-    )
+    imoveis_com_data['fase_encontrada'] = fase_mais_avancada(imoveis_com_data, ordem_fases)
 
     contagem_fases = imoveis_com_data['fase_encontrada'].value_counts().reindex(ordem_fases, fill_value=0)
 
     return imoveis_com_data, contagem_fases
 
-def atualizar_grafico_passou_sp(contagem_grupo, clickData, selected_groups):
-    todos_grupos = list(contagem_grupo.index)
-
-    if selected_groups is None:
-        selected_groups = todos_grupos
-
-    if clickData:
-        grupo_clicado = clickData["points"][0]["x"]
-        
-        if selected_groups == [grupo_clicado]:
-            selected_groups = todos_grupos
-        else:
-            selected_groups = [grupo_clicado]
-
-    return selected_groups
+def processar_dados_passou_sp(df):
+    return dados_da_aba(df, "passou_sp", calcular_dados_passou_sp)
 
 def criar_grafico_passou_sem_pendencias(contagem_grupo, total, selected_groups=None):
         cores = ['#228B22', '#DC143C', '#FFD700', '#4169E1', '#FF69B4', '#8B4513', '#00CED1', '#FF4500']
         cores = cores * (len(contagem_grupo) // len(cores) + 1)
 
-        if selected_groups is None or set(selected_groups) == set(contagem_grupo.index):
-            selected_groups = list(contagem_grupo.index)
+        opacidades = opacidades_selecao(contagem_grupo.index, selected_groups)
 
         fig = go.Figure()
 
         for i, grupo in enumerate(contagem_grupo.index):
-            opacidade = 1.0 if grupo in selected_groups else 0.4
+            opacidade = opacidades[i]
             fig.add_trace(go.Bar(
                 x=[grupo],
                 y=[contagem_grupo[grupo]],
@@ -172,14 +152,15 @@ def criar_layout_passou_sp(df):
             }
         ),
 
-        dcc.Download(id="download-excel-passou-sp"),
 
         dcc.Graph(
             id='grafico-passou-sem-pendencias',
-            figure=criar_grafico_passou_sem_pendencias(
-                contagem_grupo, 
-                total, 
-                selected_groups
+            figure=figura_em_cache(
+                df,
+                "passou_sp",
+                None,
+                lambda: criar_grafico_passou_sem_pendencias(contagem_grupo, total, selected_groups),
+                selecao=selected_groups
             )
         ),
 
@@ -2,6 +2,9 @@ import pandas as pd
 from dash import dcc, html, dash_table
 import plotly.graph_objects as go
 
+from metricas import dados_da_aba
+from tabelas import PAGINACAO_SERVIDOR
+
 COLUNAS_TABELA_REPAROS_IMOB = [
     '[Setor] Etapa - XX',
     '[Setor] Etapa - XX',
@@ -12,7 +15,7 @@ COLUNAS_TABELA_REPAROS_IMOB = [
     'Finalizado'
 ]
 
-def criar_layout_reparos_imobiliaria(df: pd.DataFrame):
+def preparar_dados_reparos_imobiliaria(df: pd.DataFrame):
 
     df_f = df[df['Finalizado'] == True].copy()
 
@@ -37,6 +40,11 @@ def criar_layout_reparos_imobiliaria(df: pd.DataFrame):
 
     meses_disponiveis = sorted(df_f['mes_ano'].astype(str).unique())
 
+    return df_f, meses_disponiveis
+
+def criar_layout_reparos_imobiliaria(df: pd.DataFrame):
+    df_f, meses_disponiveis = dados_da_aba(df, "reparos_imobiliaria", preparar_dados_reparos_imobiliaria)
+
     def criar_grafico(df_base: pd.DataFrame, opacidade_total=0.85, opacidade_imobiliaria=0.85):
         reparos_mensal = (
             df_base
@@ -189,7 +197,6 @@ def criar_layout_reparos_imobiliaria(df: pd.DataFrame):
                 }
             ),
 
-            dcc.Download(id="download-reparos-imobiliaria"),
     
             dcc.Graph(
                 id='grafico-reparos-imobiliaria',
@@ -201,6 +208,7 @@ def criar_layout_reparos_imobiliaria(df: pd.DataFrame):
                 columns=[{'name': col, 'id': col} for col in COLUNAS_TABELA_REPAROS_IMOB],
                 data=[],
                 page_size=15,
+                **PAGINACAO_SERVIDOR,
                 fixed_rows={"headers": True},
                 style_table={
                     'overflowX': 'auto', 
@@ -2,6 +2,9 @@ import pandas as pd
 from dash import dcc, html, dash_table
 import plotly.graph_objects as go
 
+from metricas import dados_da_aba
+from tabelas import PAGINACAO_SERVIDOR
+
 COLUNAS_TABELA_REPAROS_INQ = [
     '[Setor] Etapa - XX',
     '[Setor] Etapa - XX',
@@ -11,7 +14,7 @@ COLUNAS_TABELA_REPAROS_INQ = [
     'Finalizado'
 ]
 
-def criar_layout_reparos_inquilino(df: pd.DataFrame):
+def preparar_dados_reparos_inquilino(df: pd.DataFrame):
 
     df_f = df[df['Finalizado'] == True].copy()
 
@@ -32,6 +35,11 @@ def criar_layout_reparos_inquilino(df: pd.DataFrame):
 
     meses_disponiveis = sorted(df_f['mes_ano'].astype(str).unique())
 
+    return df_f, meses_disponiveis
+
+def criar_layout_reparos_inquilino(df: pd.DataFrame):
+    df_f, meses_disponiveis = dados_da_aba(df, "reparos_inquilino", preparar_dados_reparos_inquilino)
+
     def criar_grafico(df_base: pd.DataFrame, opacidade_total=0.85, opacidade_inquilino=0.85):
         reparos_mensal = (
             df_base
@@ -185,7 +193,6 @@ def criar_layout_reparos_inquilino(df: pd.DataFrame):
                 }
             ),
 
-            dcc.Download(id="download-reparos-inquilino"),
 
             dcc.Graph(
                 id='grafico-reparos-inquilino',
@@ -197,6 +204,7 @@ def criar_layout_reparos_inquilino(df: pd.DataFrame):
                 columns=[{'name': col, 'id': col} for col in COLUNAS_TABELA_REPAROS_INQ],
                 data=[],
                 page_size=15,
+                **PAGINACAO_SERVIDOR,
                 fixed_rows={"headers": True},
                 style_table={
                     'overflowX': 'auto',
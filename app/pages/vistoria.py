@@ -3,6 +3,11 @@ import numpy as np
 from dash import dcc, html, dash_table
 import plotly.graph_objects as go
 
+from fases import tempos_ate_proxima_fase, resumir_tempos_por_fase, tempos_do_resumo
+from figuras import figura_em_cache
+from metricas import obter_metricas, registrar_visao
+from tabelas import PAGINACAO_SERVIDOR
+
 COLUNAS_FIXA_VISTORIA = [
     '[Setor] Etapa - XX',
     '[Setor] Etapa - XX'
@@ -61,27 +66,6 @@ MAPA_FASES_CURTAS = {
     "[Setor] Etapa - X9": "Etapa - X9"
 }
 
-def calcular_tempo_na_fase(row, fase_inicio):
-    if pd.isna(row[fase_inicio]):
-        return pd.NaT
-
-    data_inicio = row[fase_inicio]
-    datas_validas = []
-
-    for fase in TODAS_FASES:
-        if fase in FASES_VISTORIA:
-            continue
-
-        data = row.get(fase)
-        if pd.notna(data) and data > data_inicio:
-            datas_validas.append(data)
-
-    if not datas_validas:
-        return pd.NaT
-
-    return min(datas_validas) - data_inicio
-
-
 def formatar_timedelta(td):
     total_segundos = int(td.total_seconds())
     dias = total_segundos // 86400
@@ -217,44 +201,48 @@ def criar_grafico_fases(tempos_medios_por_fase):
 
     return fig
 
-def criar_layout_vistoria(df):
-    vistoria = df[df["Finalizado"] == 1].copy()
+def calcular_tempos_vistoria(df):
+    vistoria = df[df["Finalizado"] == 1]
 
-    for fase in FASES_VISTORIA:
-        vistoria[f"tempo_{fase}"] = vistoria.apply(
-            lambda row: calcular_tempo_na_fase(row, fase),
-            axis=1
-        )
+    tempos = tempos_ate_proxima_fase(
+        vistoria, FASES_VISTORIA, TODAS_FASES, ignorar=FASES_VISTORIA
+    )
 
-    tempos_por_fase_real = {}
-    tempos_medios_por_fase = {}
-    tempo_total_acumulado = pd.Timedelta(0)
+    return resumir_tempos_por_fase(tempos, FASES_VISTORIA)
 
-    for fase in FASES_VISTORIA:
-        tempos_validos = vistoria[f"tempo_{fase}"].dropna()
+registrar_visao("tempos_vistoria", calcular_tempos_vistoria)
 
-        tempo_total = tempos_validos.sum()
-        tempos_por_fase_real[fase] = tempo_total
-        tempo_total_acumulado += tempo_total
+def criar_layout_vistoria(df):
+    tempos_por_fase_real, tempos_medios_por_fase = tempos_do_resumo(
+        obter_metricas(df, "tempos_vistoria")
+    )
 
-        tempos_medios_por_fase[fase] = (
-            tempos_validos.mean()
-            if len(tempos_validos) > 0
-            else pd.Timedelta(0)
-        )
+    tempo_total_acumulado = pd.Timedelta(0)
+    for fase in FASES_VISTORIA:
+        tempo_total_acumulado += tempos_por_fase_real[fase]
 
     layout = html.Div(
         children=[
             dcc.Graph(
                 id="grafico-rosca-vistoria",
-                figure=criar_graficos_tempo(
-                    tempos_por_fase_real,
-                    tempo_total_acumulado
+                figure=figura_em_cache(
+                    df,
+                    "vistoria_pizza",
+                    None,
+                    lambda: criar_graficos_tempo(
+                        tempos_por_fase_real,
+                        tempo_total_acumulado
+                    )
                 )
             ),
             dcc.Graph(
                 id="grafico-barras-vistoria",
-                figure=criar_grafico_fases(tempos_medios_por_fase)
+                figure=figura_em_cache(
+                    df,
+                    "vistoria_barras",
+                    None,
+                    lambda: criar_grafico_fases(tempos_medios_por_fase)
+                )
             ),
 
             html.Button(
@@ -276,13 +264,13 @@ def criar_layout_vistoria(df):
                     "zIndex": "1000"
                 }
             ),
-            dcc.Download(id="download-vistoria"),
 
             dash_table.DataTable(
                 id="tabela-vistoria",
                 columns=[{'name': col, 'id': col} for col in COLUNAS_FIXA_VISTORIA + COLUNAS_ETAPAS_VISTORIA],
                 data=[],
                 page_size=15,
+                **PAGINACAO_SERVIDOR,
                 fixed_rows={"headers": True},
                 style_table={
                     'overflowX': 'auto',
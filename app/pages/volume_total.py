@@ -1,6 +1,10 @@
+import pandas as pd
 from dash import html, dcc, dash_table
 import plotly.graph_objects as go
 
+from figuras import figura_em_cache
+from metricas import obter_metricas, registrar_visao
+
 COLUNAS_TABELA = [
     '[Setor] Etapa - XX',
     '[Setor] Etapa - XX',
@@ -97,15 +101,26 @@ def criar_grafico(VALORES, LABELS, CORES, PULL, total_analisadas, filtro):
 
     return fig
 
+def calcular_volume_total(df):
+    df_porcetagem = df['Finalizado'].value_counts()
+
+    return pd.DataFrame({
+        'finalizadas': [int(df_porcetagem.get(True, 0))],
+        'nao_finalizadas': [int(df_porcetagem.get(False, 0))],
+        'total_analisadas': [len(df)]
+    })
+
+registrar_visao('volume_total', calcular_volume_total)
+
 def layout_volume_total(df):
 
-    df_porcetagem = df['Finalizado'].value_counts()
-    total_analisadas = len(df)
+    volume = obter_metricas(df, 'volume_total').iloc[0]
+    total_analisadas = int(volume['total_analisadas'])
 
     VALORES = {
-        "todos": [df_porcetagem.get(True, 0), df_porcetagem.get(False, 0)],
-        "finalizadas": [df_porcetagem.get(True, 0)],
-        "nao_finalizadas": [df_porcetagem.get(False, 0)]
+        "todos": [int(volume['finalizadas']), int(volume['nao_finalizadas'])],
+        "finalizadas": [int(volume['finalizadas'])],
+        "nao_finalizadas": [int(volume['nao_finalizadas'])]
     }
 
     LABELS = {
@@ -149,7 +164,6 @@ def layout_volume_total(df):
                             "zIndex": "1000"
                         }
                     ),
-                    dcc.Download(id="download-excel"),
 
                     dcc.Dropdown(
                         id="filtro-desocupacao",
@@ -168,13 +182,18 @@ def layout_volume_total(df):
 
                     dcc.Graph(
                         id="grafico-totaldesocupacao",
-                        figure=criar_grafico(
-                            VALORES,
-                            LABELS,
-                            CORES,
-                            PULL,
-                            total_analisadas,
-                            "todos"
+                        figure=figura_em_cache(
+                            df,
+                            "total",
+                            "todos",
+                            lambda: criar_grafico(
+                                VALORES,
+                                LABELS,
+                                CORES,
+                                PULL,
+                                total_analisadas,
+                                "todos"
+                            )
                         )
                     ),
 
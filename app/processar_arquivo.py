@@ -1,4 +1,143 @@
-from arq import processar_excel
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
 
-def processar_excel_upload(caminho_arquivo):
-    return processar_excel(caminho_arquivo)
+from arq import processar_excel, mover_dataset, remover_dataset
+from exportacao import remover_exportacoes
+from metricas import materializar_metricas, modulos_das_visoes
+from tarefas import executar_em_processo
+
+TAMANHO_BLOCO = 1024 * 1024
+
+lock_referencias = threading.Lock()
+
+# caminho processado -> Event do upload que está gerando esse arquivo; o
+# mesmo arquivo enviado de novo no meio do processamento espera por ele.
+em_andamento = {}
+
+def salvar_com_hash(arquivo, caminho: str) -> str:
+    # Calcula o hash enquanto grava o upload em disco, sem ler o arquivo
+    # duas vezes.
+    hash_arquivo = hashlib.sha256()
+
+    with open(caminho, "wb") as destino:
+        while True:
+            bloco = arquivo.stream.read(TAMANHO_BLOCO)
+            if not bloco:
+                break
+            hash_arquivo.update(bloco)
+            destino.write(bloco)
+
+    return hash_arquivo.hexdigest()
+
+def caminho_processado_por_hash(caminho_arquivo: str, hash_arquivo: str) -> str:
+    caminho_arquivo = Path(caminho_arquivo)
+    ext = caminho_arquivo.suffix.replace(".", "").lower()
+    return str(caminho_arquivo.with_name(f"processado_{hash_arquivo}_{ext}.parquet"))
+
+def pasta_referencias(caminho_processado: str) -> str:
+    return f"{caminho_processado}.refs"
+
+def criar_marcador(caminho_processado: str) -> str:
+    # Chamado já com lock_referencias.
+    token = uuid.uuid4().hex
+
+    pasta = pasta_referencias(caminho_processado)
+    os.makedirs(pasta, exist_ok=True)
+    Path(pasta, token).touch()
+
+    return token
+
+def registrar_referencia(caminho_processado: str) -> str:
+    with lock_referencias:
+        return criar_marcador(caminho_processado)
+
+def liberar_referencia(caminho_processado: str, token: str) -> None:
+    with lock_referencias:
+        pasta = pasta_referencias(caminho_processado)
+
+        marcador = os.path.join(pasta, token)
+        if os.path.exists(marcador):
+            os.remove(marcador)
+
+        if os.path.isdir(pasta) and os.listdir(pasta):
+            return
+
+        # Nenhuma sessão usa mais o dataset: remove o arquivo processado
+        # e as exportações geradas a partir dele.
+        shutil.rmtree(pasta, ignore_errors=True)
+        remover_dataset(caminho_processado)
+        remover_exportacoes(caminho_processado)
+
+def processar_com_metricas(caminho_arquivo, informar_etapa=None, caminho_base=None) -> str:
+    caminho_gerado = processar_excel(caminho_arquivo, informar_etapa, caminho_base)
+
+    # Agregados de cada aba calculados uma vez, junto com o dataset.
+    materializar_metricas(caminho_gerado, informar_etapa)
+
+    return caminho_gerado
+
+def processar_em_processo(caminho_arquivo, informar_etapa=None, caminho_base=None) -> str:
+    # Leitura, datas e métricas fora do processo do servidor web.
+    return executar_em_processo(
+        processar_com_metricas,
+        caminho_arquivo,
+        caminho_base=caminho_base,
+        informar_etapa=informar_etapa,
+        modulos=modulos_das_visoes()
+    )
+
+def liberar_resultado_upload(resultado: dict) -> None:
+    liberar_referencia(resultado["caminho"], resultado["referencia"])
+
+def processar_excel_upload(caminho_arquivo, hash_arquivo=None, caminho_base=None, informar_etapa=None):
+    # O resultado já sai com uma referência registrada, que fica com a tarefa
+    # até a sessão adotá-la na consulta de status (ou ser liberada quando a
+    # tarefa expira): entre o fim do processamento e a consulta, outra sessão
+    # não pode apagar o dataset.
+    if hash_arquivo is None:
+        caminho_gerado = processar_em_processo(caminho_arquivo, informar_etapa, caminho_base)
+        return {"caminho": caminho_gerado, "referencia": registrar_referencia(caminho_gerado)}
+
+    if caminho_base:
+        # No modo incremental o resultado depende também do dataset base,
+        # que já carrega o próprio hash no nome.
+        hash_arquivo = hashlib.sha256(
+            f"{hash_arquivo}:{Path(caminho_base).name}".encode()
+        ).hexdigest()
+
+    caminho_destino = caminho_processado_por_hash(caminho_arquivo, hash_arquivo)
+
+    try:
+        while True:
+            with lock_referencias:
+                if os.path.exists(caminho_destino):
+                    print("Arquivo já processado, reaproveitando:", caminho_destino)
+                    return {"caminho": caminho_destino, "referencia": criar_marcador(caminho_destino)}
+
+                evento = em_andamento.get(caminho_destino)
+                if evento is None:
+                    evento = em_andamento[caminho_destino] = threading.Event()
+                    break
+
+            # Outro upload do mesmo arquivo está processando: o resultado
+            # dele é reaproveitado. Se ele falhar, este tenta de novo.
+            evento.wait()
+
+        try:
+            caminho_gerado = processar_em_processo(caminho_arquivo, informar_etapa, caminho_base)
+
+            with lock_referencias:
+                mover_dataset(caminho_gerado, caminho_destino)
+                return {"caminho": caminho_destino, "referencia": criar_marcador(caminho_destino)}
+        finally:
+            with lock_referencias:
+                del em_andamento[caminho_destino]
+            evento.set()
+    finally:
+        # O upload original não é mais necessário depois do processamento.
+        if os.path.exists(caminho_arquivo):
+            os.remove(caminho_arquivo)
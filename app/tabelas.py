@@ -0,0 +1,140 @@
+import math
+import re
+
+import pandas as pd
+
+TAMANHO_PAGINA = 15
+
+# Paginação, ordenação e filtro feitos no servidor: o navegador recebe só
+# as linhas da página visível.
+PAGINACAO_SERVIDOR = {
+    "page_action": "custom",
+    "sort_action": "custom",
+    "sort_mode": "multi",
+    "filter_action": "custom",
+    "page_current": 0,
+    "sort_by": [],
+    "filter_query": "",
+}
+
+# Propriedades da tabela que disparam apenas a troca de página.
+PROPRIEDADES_PAGINACAO = ("page_current", "sort_by", "filter_query")
+
+RE_FILTRO = re.compile(
+    r"^\{(?P<coluna>[^}]+)\}\s+"
+    r"(?P<modo>[si])?(?P<operador>>=|<=|!=|=|<|>|ge|le|lt|gt|ne|eq|contains|datestartswith)\s+"
+    r"(?P<valor>.+)$"
+)
+
+OPERADORES = {
+    "ge": ">=",
+    "le": "<=",
+    "lt": "<",
+    "gt": ">",
+    "ne": "!=",
+    "eq": "=",
+}
+
+def interpretar_filtro(parte: str):
+    encontrado = RE_FILTRO.match(parte.strip())
+    if not encontrado:
+        return None
+
+    valor = encontrado["valor"].strip()
+    if len(valor) > 1 and valor[0] == valor[-1] and valor[0] in ("'", '"', "`"):
+        valor = valor[1:-1].replace("\\" + valor[0], valor[0])
+
+    operador = OPERADORES.get(encontrado["operador"], encontrado["operador"])
+    return encontrado["coluna"], operador, valor, encontrado["modo"] == "i"
+
+def texto_da_coluna(serie: pd.Series) -> pd.Series:
+    # Mesmo formato que as datas têm na tabela depois de serializadas.
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.dt.strftime("%Y-%m-%dT%H:%M:%S").fillna("")
+    return serie.astype(str).where(serie.notna(), "")
+
+def converter_valor(serie: pd.Series, valor: str):
+    if pd.api.types.is_bool_dtype(serie):
+        return valor.lower() in ("true", "1", "sim")
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return pd.to_datetime(valor, errors="coerce")
+    if pd.api.types.is_numeric_dtype(serie):
+        return pd.to_numeric(valor, errors="coerce")
+    return valor
+
+def mascara_filtro(serie: pd.Series, operador: str, valor: str, ignorar_caixa: bool) -> pd.Series:
+    if operador in ("contains", "datestartswith"):
+        texto = texto_da_coluna(serie)
+        if operador == "datestartswith":
+            return texto.str.startswith(valor)
+        return texto.str.contains(valor, case=not ignorar_caixa, regex=False)
+
+    valor_convertido = converter_valor(serie, valor)
+    if valor_convertido is None or (not isinstance(valor_convertido, bool) and pd.isna(valor_convertido)):
+        # Valor que não cabe no tipo da coluna: compara como texto.
+        serie = texto_da_coluna(serie)
+        valor_convertido = valor
+
+    if operador == "=":
+        return serie == valor_convertido
+    if operador == "!=":
+        return serie != valor_convertido
+    if operador == "<":
+        return serie < valor_convertido
+    if operador == "<=":
+        return serie <= valor_convertido
+    if operador == ">":
+        return serie > valor_convertido
+    return serie >= valor_convertido
+
+def aplicar_filtro(df: pd.DataFrame, filter_query: str) -> pd.DataFrame:
+    if not filter_query:
+        return df
+
+    mascara = pd.Series(True, index=df.index)
+    for parte in filter_query.split(" && "):
+        filtro = interpretar_filtro(parte)
+        if filtro is None:
+            continue
+
+        coluna, operador, valor, ignorar_caixa = filtro
+        if coluna not in df.columns:
+            continue
+
+        mascara &= mascara_filtro(df[coluna], operador, valor, ignorar_caixa).fillna(False).astype(bool)
+
+    return df[mascara]
+
+def aplicar_ordenacao(df: pd.DataFrame, sort_by) -> pd.DataFrame:
+    ordem = [s for s in (sort_by or []) if s["column_id"] in df.columns]
+    if not ordem:
+        return df
+
+    return df.sort_values(
+        [s["column_id"] for s in ordem],
+        ascending=[s["direction"] == "asc" for s in ordem],
+        na_position="last",
+        kind="stable"
+    )
+
+def pagina_da_tabela(df: pd.DataFrame, colunas, page_current, page_size, sort_by, filter_query):
+    tamanho = page_size or TAMANHO_PAGINA
+
+    # Algumas listas de colunas repetem nomes; a tabela mostra cada um uma vez.
+    colunas = list(dict.fromkeys(colunas))
+    df = aplicar_ordenacao(aplicar_filtro(df[colunas], filter_query), sort_by)
+
+    total_paginas = max(1, math.ceil(len(df) / tamanho))
+    pagina = min(page_current or 0, total_paginas - 1)
+
+    inicio = pagina * tamanho
+    return df.iloc[inicio:inicio + tamanho].to_dict("records"), total_paginas, pagina
+
+def mudou_apenas_pagina(id_tabela: str, triggered_prop_ids) -> bool:
+    # Verdadeiro quando o callback foi disparado só pela paginação,
+    # ordenação ou filtro da própria tabela.
+    gatilhos = list(triggered_prop_ids or [])
+    return bool(gatilhos) and all(
+        gatilho in [f"{id_tabela}.{prop}" for prop in PROPRIEDADES_PAGINACAO]
+        for gatilho in gatilhos
+    )
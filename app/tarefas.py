@@ -0,0 +1,206 @@
+import importlib
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+MAX_WORKERS = int(os.getenv("UPLOAD_WORKERS", "2"))
+MAX_FILA = int(os.getenv("UPLOAD_FILA_MAX", "8"))
+MAX_WORKERS_EXPORTACAO = int(os.getenv("EXPORTACAO_WORKERS", "1"))
+MAX_FILA_EXPORTACAO = int(os.getenv("EXPORTACAO_FILA_MAX", "4"))
+TEMPO_RETENCAO = 60 * 60
+
+# Uploads e exportações em filas separadas, cada uma com as suas threads,
+# processos e limite: exportações grandes não seguram os uploads.
+FILAS = {
+    "upload": {
+        "workers": MAX_WORKERS,
+        "limite": MAX_FILA,
+        "mensagem": "Muitos arquivos em processamento. Tente novamente em instantes.",
+    },
+    "exportacao": {
+        "workers": MAX_WORKERS_EXPORTACAO,
+        "limite": MAX_FILA_EXPORTACAO,
+        "mensagem": "Muitas exportações em andamento. Tente novamente em instantes.",
+    },
+}
+
+# As threads só acompanham as tarefas (estado, etapas, referências); o
+# trabalho pesado de cada uma pode ir para executar_em_processo.
+executores = {
+    nome: ThreadPoolExecutor(max_workers=fila["workers"], thread_name_prefix=nome)
+    for nome, fila in FILAS.items()
+}
+
+# O parse do openpyxl e do lxml segura o GIL: numa thread do mesmo processo
+# ele disputa a CPU com as requisições do dashboard. Em processos próprios,
+# não. "spawn" para não herdar, no fork, locks presos por outras threads.
+contexto_processos = multiprocessing.get_context("spawn")
+processos = {}
+gerenciador = None
+lock_processos = threading.Lock()
+
+tarefas = {}
+lock_tarefas = threading.Lock()
+
+class FilaCheiaError(Exception):
+    pass
+
+def tarefas_pendentes(fila: str) -> int:
+    return sum(
+        1 for tarefa in tarefas.values()
+        if tarefa["fila"] == fila and tarefa["status"] in ("fila", "processando")
+    )
+
+def remover_tarefas_antigas() -> list:
+    # Chamado já com lock_tarefas; devolve as tarefas removidas para que os
+    # resultados sejam liberados fora do lock.
+    limite = time.time() - TEMPO_RETENCAO
+    return [
+        tarefas.pop(id_tarefa)
+        for id_tarefa in [i for i, t in tarefas.items() if t["atualizado_em"] < limite]
+    ]
+
+def liberar_resultados(removidas: list) -> None:
+    # Resultados que nenhuma sessão adotou (tarefa expirada ou descartada)
+    # são devolvidos a quem os criou, para não ficarem em disco para sempre.
+    for tarefa in removidas:
+        if tarefa["liberar"] is not None and tarefa["status"] == "concluido":
+            tarefa["liberar"](tarefa["resultado"])
+
+def atualizar_tarefa(id_tarefa: str, **campos) -> None:
+    with lock_tarefas:
+        tarefa = tarefas.get(id_tarefa)
+        if tarefa is not None:
+            tarefa.update(campos, atualizado_em=time.time())
+
+def obter_tarefa(id_tarefa: str):
+    with lock_tarefas:
+        removidas = remover_tarefas_antigas()
+        tarefa = tarefas.get(id_tarefa)
+        tarefa = dict(tarefa) if tarefa is not None else None
+
+    liberar_resultados(removidas)
+    return tarefa
+
+def descartar_tarefa(id_tarefa: str, adotar_resultado: bool = False):
+    # Com adotar_resultado o chamador fica com o resultado (e com o que
+    # precisa ser liberado nele); sem, o resultado é liberado aqui. Só quem
+    # de fato removeu a tarefa recebe ela de volta.
+    with lock_tarefas:
+        tarefa = tarefas.pop(id_tarefa, None)
+
+    if tarefa is not None and not adotar_resultado:
+        liberar_resultados([tarefa])
+
+    return tarefa
+
+def executar_tarefa(id_tarefa: str, funcao, args, liberar) -> None:
+    atualizar_tarefa(id_tarefa, status="processando")
+
+    def informar_etapa(etapa):
+        atualizar_tarefa(id_tarefa, etapa=etapa)
+
+    try:
+        resultado = funcao(*args, informar_etapa=informar_etapa)
+    except Exception as e:
+        atualizar_tarefa(id_tarefa, status="erro", erro=str(e))
+    else:
+        with lock_tarefas:
+            tarefa = tarefas.get(id_tarefa)
+            if tarefa is not None:
+                tarefa.update(status="concluido", etapa="concluido", resultado=resultado, atualizado_em=time.time())
+
+        # A tarefa expirou enquanto processava: ninguém vai buscar o resultado.
+        if tarefa is None and liberar is not None:
+            liberar(resultado)
+
+def enviar_tarefa(dono: str, funcao, *args, liberar=None, fila="upload") -> str:
+    # liberar(resultado) é chamado se o resultado nunca for adotado por
+    # descartar_tarefa(..., adotar_resultado=True).
+    id_tarefa = uuid.uuid4().hex
+
+    with lock_tarefas:
+        removidas = remover_tarefas_antigas()
+
+        if tarefas_pendentes(fila) >= FILAS[fila]["limite"]:
+            liberar_resultados(removidas)
+            raise FilaCheiaError(FILAS[fila]["mensagem"])
+
+        tarefas[id_tarefa] = {
+            "dono": dono,
+            "fila": fila,
+            "status": "fila",
+            "etapa": "fila",
+            "resultado": None,
+            "erro": None,
+            "liberar": liberar,
+            "atualizado_em": time.time(),
+        }
+
+    liberar_resultados(removidas)
+
+    executores[fila].submit(executar_tarefa, id_tarefa, funcao, args, liberar)
+
+    return id_tarefa
+
+def importar_modulos(modulos) -> None:
+    # Os processos começam vazios: módulos que registram algo ao serem
+    # importados (as visões das páginas) precisam ser importados de novo.
+    for modulo in modulos:
+        importlib.import_module(modulo)
+
+def obter_processos(modulos, fila):
+    global gerenciador
+
+    with lock_processos:
+        if gerenciador is None:
+            gerenciador = contexto_processos.Manager()
+        if fila not in processos:
+            processos[fila] = ProcessPoolExecutor(
+                max_workers=FILAS[fila]["workers"],
+                mp_context=contexto_processos,
+                initializer=importar_modulos,
+                initargs=(list(modulos),)
+            )
+        return processos[fila], gerenciador
+
+def descartar_processos(fila, quebrado) -> None:
+    with lock_processos:
+        if processos.get(fila) is quebrado:
+            del processos[fila]
+    quebrado.shutdown(wait=False)
+
+def executar_com_fila(etapas, funcao, args, kwargs):
+    return funcao(*args, informar_etapa=etapas.put, **kwargs)
+
+def executar_em_processo(funcao, *args, informar_etapa=None, modulos=(), fila="upload", **kwargs):
+    # Roda funcao(*args, informar_etapa=..., **kwargs) num processo do pool
+    # da fila; as etapas voltam por uma Queue do gerenciador e são
+    # repassadas a informar_etapa aqui, na thread da tarefa.
+    pool, gerenciador_etapas = obter_processos(modulos, fila)
+    etapas = gerenciador_etapas.Queue()
+    futuro = pool.submit(executar_com_fila, etapas, funcao, args, kwargs)
+
+    while True:
+        try:
+            etapa = etapas.get(timeout=0.2)
+        except queue.Empty:
+            if futuro.done():
+                break
+            continue
+
+        if informar_etapa is not None:
+            informar_etapa(etapa)
+
+    try:
+        return futuro.result()
+    except BrokenProcessPool:
+        # Um processo morreu (falta de memória, por exemplo): a próxima
+        # tarefa da fila cria um pool novo.
+        descartar_processos(fila, pool)
+        raise RuntimeError("O processamento foi interrompido. Tente novamente.")
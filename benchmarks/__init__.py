@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Os módulos do dashboard são importados pelo nome (from arq import ...),
+# como quando o app roda de dentro da pasta app/.
+PASTA_APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+
+if PASTA_APP not in sys.path:
+    sys.path.insert(0, PASTA_APP)
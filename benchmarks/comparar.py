@@ -0,0 +1,182 @@
+import argparse
+import fnmatch
+import importlib.metadata
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime
+
+PASTA_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+CAMINHO_BASELINE = os.path.join(PASTA_BENCHMARKS, "baseline.json")
+CAMINHO_LIMITES = os.path.join(PASTA_BENCHMARKS, "limites.json")
+
+PACOTES = ["pandas", "numpy", "pyarrow", "openpyxl", "dash", "plotly", "Flask"]
+
+def versao_pacote(nome: str):
+    try:
+        return importlib.metadata.version(nome)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+def commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PASTA_BENCHMARKS,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def ambiente() -> dict:
+    return {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit_atual(),
+        "python": platform.python_version(),
+        "sistema": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "pacotes": {nome: versao_pacote(nome) for nome in PACOTES},
+    }
+
+def salvar_resultados(caminho: str, resultados: list, parametros: dict) -> None:
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(
+            {"ambiente": ambiente(), "parametros": parametros, "resultados": resultados},
+            arquivo,
+            ensure_ascii=False,
+            indent=2
+        )
+
+def carregar_json(caminho: str) -> dict:
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+def carregar_limites(caminho: str = CAMINHO_LIMITES) -> dict:
+    # {"padrao": 0.25, "tolerancia_ms": 10, "casos": {"ingestao/processar_excel": 0.15},
+    #  "excluidos": [{"caso": "callback/*", "linhas_minimas": 10000, "motivo": "..."}],
+    #  "somente_relatorio": ["referencia/*"]}
+    if not os.path.exists(caminho):
+        return {"padrao": 0.25, "tolerancia_ms": 10, "casos": {}, "excluidos": [], "somente_relatorio": []}
+    return carregar_json(caminho)
+
+def motivo_exclusao(caso: str, linhas: int, excluidos: list):
+    # Casos que não rodam nesta árvore ficam fora da medição e da
+    # comparação, com o motivo registrado, em vez de entrarem como erro.
+    for exclusao in excluidos:
+        if fnmatch.fnmatchcase(caso, exclusao["caso"]) and linhas >= exclusao.get("linhas_minimas", 0):
+            return exclusao["motivo"]
+    return None
+
+def somente_relatorio(caso: str, padroes: list) -> bool:
+    # Casos que não medem código do dashboard (a versão de referência e a
+    # conferência entre as duas): o tempo aparece no relatório, mas não é
+    # comparado com o limite. Um erro neles continua derrubando a verificação.
+    return any(fnmatch.fnmatchcase(caso, padrao) for padrao in padroes)
+
+def comparar(atual: dict, baseline: dict, limites: dict) -> list:
+    referencia = {(r["caso"], r["linhas"]): r for r in baseline["resultados"]}
+
+    comparacoes = []
+    for resultado in atual["resultados"]:
+        base = referencia.get((resultado["caso"], resultado["linhas"]))
+        limite = limites["casos"].get(resultado["caso"], limites["padrao"])
+        comparacao = dict(resultado, limite=limite, base_ms=None, variacao=None)
+
+        if "excluido" in resultado:
+            comparacao["situacao"] = "excluido"
+        elif "erro" in resultado:
+            # Fora da lista de excluídos, todo erro derruba a verificação.
+            comparacao["situacao"] = "erro"
+        elif base is None or "tempo_ms" not in base:
+            comparacao["situacao"] = "novo"
+        else:
+            comparacao["base_ms"] = base["tempo_ms"]
+            comparacao["variacao"] = resultado["tempo_ms"] / base["tempo_ms"] - 1 if base["tempo_ms"] else 0.0
+
+            # Casos de poucos milissegundos variam mais que o limite só com
+            # ruído; a diferença absoluta também precisa passar da tolerância.
+            piorou = (
+                comparacao["variacao"] > limite
+                and resultado["tempo_ms"] - base["tempo_ms"] > limites.get("tolerancia_ms", 0)
+            )
+            if somente_relatorio(resultado["caso"], limites.get("somente_relatorio", [])):
+                comparacao["situacao"] = "informativo"
+            else:
+                comparacao["situacao"] = "regressao" if piorou else "ok"
+
+        comparacoes.append(comparacao)
+
+    return comparacoes
+
+def diferencas_de_ambiente(atual: dict, baseline: dict) -> list:
+    campos = ["python", "sistema", "processador", "cpus", "pacotes"]
+    return [
+        campo for campo in campos
+        if atual["ambiente"].get(campo) != baseline["ambiente"].get(campo)
+    ]
+
+def imprimir_relatorio(comparacoes: list) -> None:
+    # Do mais lento para o mais rápido: o topo da lista é onde uma
+    # otimização rende mais.
+    ordenadas = sorted(
+        comparacoes,
+        key=lambda c: c.get("tempo_ms", -1),
+        reverse=True
+    )
+
+    print(f"\n{'#':>3}  {'caso':<60} {'linhas':>9} {'tempo':>12} {'baseline':>12} {'variação':>9}  situação")
+    for posicao, comparacao in enumerate(ordenadas, start=1):
+        tempo = f"{comparacao['tempo_ms']:.1f} ms" if "tempo_ms" in comparacao else "-"
+        base = f"{comparacao['base_ms']:.1f} ms" if comparacao["base_ms"] is not None else "-"
+        variacao = f"{comparacao['variacao']:+.0%}" if comparacao["variacao"] is not None else "-"
+        print(
+            f"{posicao:>3}  {comparacao['caso']:<60} {comparacao['linhas']:>9} "
+            f"{tempo:>12} {base:>12} {variacao:>9}  {comparacao['situacao']}"
+        )
+
+def verificar(atual: dict, caminho_baseline: str, limites: dict) -> int:
+    baseline = carregar_json(caminho_baseline)
+
+    diferencas = diferencas_de_ambiente(atual, baseline)
+    if diferencas:
+        print(
+            "Aviso: ambiente diferente da baseline em "
+            f"{', '.join(diferencas)}; os tempos podem não ser comparáveis."
+        )
+
+    comparacoes = comparar(atual, baseline, limites)
+    imprimir_relatorio(comparacoes)
+
+    falhas = [c for c in comparacoes if c["situacao"] in ("regressao", "erro")]
+    for falha in falhas:
+        if falha["situacao"] == "erro":
+            print(f"ERRO: {falha['caso']} ({falha['linhas']} linhas): {falha['erro']}")
+        else:
+            print(
+                f"REGRESSÃO: {falha['caso']} ({falha['linhas']} linhas) "
+                f"{falha['base_ms']:.1f} ms -> {falha['tempo_ms']:.1f} ms "
+                f"({falha['variacao']:+.0%}, limite {falha['limite']:.0%})"
+            )
+
+    return 1 if falhas else 0
+
+def main(argumentos=None) -> int:
+    parser = argparse.ArgumentParser(description="Compara resultados de benchmark com a baseline")
+    parser.add_argument("resultados", help="JSON gravado por benchmarks.executar --saida")
+    parser.add_argument("--baseline", default=CAMINHO_BASELINE)
+    parser.add_argument("--limites", default=CAMINHO_LIMITES)
+    parser.add_argument("--limite", type=float, help="limite padrão de piora (0.25 = 25%%)")
+    args = parser.parse_args(argumentos)
+
+    limites = carregar_limites(args.limites)
+    if args.limite is not None:
+        limites["padrao"] = args.limite
+
+    return verificar(carregar_json(args.resultados), args.baseline, limites)
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,413 @@
+import argparse
+import gc
+import importlib
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.comparar import CAMINHO_BASELINE, ambiente, carregar_limites, motivo_exclusao, salvar_resultados, verificar
+from benchmarks.gerador import arquivo_de_exportacao
+
+PASTA_DADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados")
+
+TAMANHOS = [1000, 10000, 100000, 1000000]
+SUITES = ["ingestao", "funcoes", "layouts", "callbacks"]
+LINHAS_MAX_REFERENCIA = 100000
+
+# (módulo, função que monta o layout da aba a partir do dataset)
+LAYOUTS = [
+    ("pages.volume_total", "layout_volume_total"),
+    ("pages.nao_finalizadas", "layout_nao_finalizadas"),
+    ("pages.media_mensal", "criar_layout_media_mensal"),
+    ("pages.reparos_imobiliaria", "criar_layout_reparos_imobiliaria"),
+    ("pages.reparos_inquilino", "criar_layout_reparos_inquilino"),
+    ("pages.vistoria", "criar_layout_vistoria"),
+    ("pages.media_vistoria", "criar_layout_media_vistoria"),
+    ("pages.orcamento", "criar_layout_orcamento"),
+    ("pages.media_orcamento", "criar_layout_media_orcamento"),
+    ("pages.desocupacao", "criar_layout_desocupacao"),
+    ("pages.media_desocupacao", "criar_layout_media_desocupacao"),
+    ("pages.imovel_sem_pendencias", "criar_layout_imovel_sem_pendencias"),
+    ("pages.passou_sem_pendencias", "criar_layout_passou_sp"),
+    ("pages.liberacao_vistoria", "criar_layout_liberacao_vistoria"),
+]
+
+def limpar_caches() -> None:
+    # Cada execução parte do dataset já carregado, como logo depois do
+    # upload, mas sem figuras, dados de aba ou exportações de uma execução
+    # anterior.
+    from cache import cache_datasets
+    from exportacao import PASTA_EXPORTACOES
+    from figuras import cache_figuras
+
+    cache_figuras.remover_onde(lambda chave: True)
+    cache_datasets.remover_onde(
+        lambda chave: chave[2] not in ("dataset", "matriz_etapas", "metricas")
+    )
+    shutil.rmtree(PASTA_EXPORTACOES, ignore_errors=True)
+
+def medir(funcao, repeticoes: int) -> dict:
+    tempos = []
+    for _ in range(repeticoes):
+        limpar_caches()
+        # Como no timeit: sem coletas do gc no meio da medição, o tempo não
+        # depende do lixo deixado pelos casos que rodaram antes.
+        gc.collect()
+        gc.disable()
+        try:
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        finally:
+            gc.enable()
+
+    # O pico de memória vem de uma execução à parte: o tracemalloc deixa
+    # o código mais lento e distorceria o tempo.
+    limpar_caches()
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "tempo_ms": statistics.median(tempos),
+        "tempo_min_ms": min(tempos),
+        "pico_mb": pico / (1024 * 1024),
+    }
+
+# Preenchida por executar() a partir de limites.json.
+casos_excluidos = []
+
+def registrar_exclusao(resultados: list, nome: str, linhas: int) -> bool:
+    motivo = motivo_exclusao(nome, linhas, casos_excluidos)
+    if motivo is None:
+        return False
+
+    resultado = {"caso": nome, "linhas": linhas, "excluido": motivo}
+    resultados.append(resultado)
+    imprimir_resultado(resultado)
+    return True
+
+def executar_caso(resultados: list, nome: str, linhas: int, funcao, repeticoes: int) -> None:
+    if registrar_exclusao(resultados, nome, linhas):
+        return
+
+    resultado = {"caso": nome, "linhas": linhas}
+    try:
+        resultado.update(medir(funcao, repeticoes))
+    except Exception as e:
+        resultado["erro"] = f"{type(e).__name__}: {e}"
+
+    resultados.append(resultado)
+    imprimir_resultado(resultado)
+
+def importar_layouts() -> dict:
+    # Uma página com erro só invalida o próprio caso. Importar as páginas
+    # também registra as visões usadas por materializar_metricas.
+    funcoes = {}
+    for modulo, funcao in LAYOUTS:
+        try:
+            funcoes[funcao] = getattr(importlib.import_module(modulo), funcao)
+        except Exception as e:
+            funcoes[funcao] = e
+    return funcoes
+
+def casos_ingestao(resultados, linhas, caminho_arquivo, caminho_dataset, repeticoes):
+    from arq import processar_excel, remover_dataset
+    from metricas import materializar_metricas
+
+    # Cópia com outro nome: o processado sai ao lado do arquivo e não pode
+    # sobrescrever o dataset usado pelas outras suítes.
+    pasta, nome = os.path.split(caminho_arquivo)
+    copia = shutil.copy(caminho_arquivo, os.path.join(pasta, f"ingestao_{nome}"))
+
+    def processar():
+        remover_dataset(processar_excel(copia))
+
+    try:
+        executar_caso(resultados, "ingestao/processar_excel", linhas, processar, repeticoes)
+    finally:
+        os.remove(copia)
+
+    executar_caso(
+        resultados,
+        "ingestao/materializar_metricas",
+        linhas,
+        lambda: materializar_metricas(caminho_dataset),
+        repeticoes
+    )
+
+def casos_funcoes(resultados, linhas, caminho_dataset, repeticoes):
+    # Trechos chamados por várias abas a cada troca de aba ou filtro.
+    from arq import COLUNAS_PROCESSO_INTERNO, calcular_colunas_derivadas
+    from cache import carregar_dataset_em_cache
+    from fases import calcular_fase_mais_avancada, tempos_ate_proxima_fase
+
+    from benchmarks.referencia import calcular_colunas_derivadas_linha_a_linha, conferir_colunas_derivadas
+
+    def dataset():
+        return carregar_dataset_em_cache(caminho_dataset)
+
+    executar_caso(
+        resultados,
+        "funcao/tempos_ate_proxima_fase",
+        linhas,
+        lambda: tempos_ate_proxima_fase(dataset(), COLUNAS_PROCESSO_INTERNO, COLUNAS_PROCESSO_INTERNO),
+        repeticoes
+    )
+    executar_caso(
+        resultados,
+        "funcao/calcular_fase_mais_avancada",
+        linhas,
+        lambda: calcular_fase_mais_avancada(dataset(), COLUNAS_PROCESSO_INTERNO[::-1]),
+        repeticoes
+    )
+    executar_caso(
+        resultados,
+        "funcao/calcular_colunas_derivadas",
+        linhas,
+        lambda: calcular_colunas_derivadas(dataset()),
+        repeticoes
+    )
+
+    # Antes e depois da vetorização, com a conferência de que as duas dão o
+    # mesmo resultado (um erro aqui derruba o --comparar). A versão linha a
+    # linha passa de um minuto a partir de 1 milhão de linhas.
+    if linhas > LINHAS_MAX_REFERENCIA:
+        return
+
+    executar_caso(
+        resultados,
+        "referencia/calcular_colunas_derivadas_linha_a_linha",
+        linhas,
+        lambda: calcular_colunas_derivadas_linha_a_linha(dataset()),
+        repeticoes
+    )
+    executar_caso(
+        resultados,
+        "conferencia/calcular_colunas_derivadas",
+        linhas,
+        lambda: conferir_colunas_derivadas(
+            calcular_colunas_derivadas(dataset()),
+            calcular_colunas_derivadas_linha_a_linha(dataset())
+        ),
+        1
+    )
+
+def casos_layouts(resultados, linhas, caminho_dataset, layouts, repeticoes):
+    from cache import carregar_dataset_em_cache
+
+    for nome, funcao in layouts.items():
+        def montar(funcao=funcao):
+            if isinstance(funcao, Exception):
+                raise funcao
+            funcao(carregar_dataset_em_cache(caminho_dataset))
+
+        executar_caso(resultados, f"layout/{nome}", linhas, montar, repeticoes)
+
+def coletar_props(no, valores: dict) -> None:
+    if isinstance(no, list):
+        for item in no:
+            coletar_props(item, valores)
+        return
+
+    if not isinstance(no, dict):
+        return
+
+    props = no.get("props")
+    if isinstance(props, dict):
+        if isinstance(props.get("id"), str):
+            valores[props["id"]] = props
+        for valor in props.values():
+            coletar_props(valor, valores)
+
+def saidas_do_callback(output: str):
+    multiplas = output.startswith("..")
+    itens = output[2:-2].split("...") if multiplas else [output]
+
+    saidas = []
+    for item in itens:
+        id_componente, propriedade = item.split("@")[0].rsplit(".", 1)
+        saidas.append({"id": id_componente, "property": propriedade})
+
+    return saidas if multiplas else saidas[0]
+
+def corpo_do_callback(dependencia: dict, valores: dict) -> dict:
+    def com_valor(item):
+        props = valores.get(item["id"], {})
+        return {"id": item["id"], "property": item["property"], "value": props.get(item["property"])}
+
+    return {
+        "output": dependencia["output"],
+        "outputs": saidas_do_callback(dependencia["output"]),
+        "inputs": [com_valor(item) for item in dependencia["inputs"]],
+        "state": [com_valor(item) for item in dependencia["state"]],
+        # Sem propriedades alteradas, como no disparo inicial (ctx.triggered_id
+        # fica None).
+        "changedPropIds": [],
+    }
+
+def cliente_do_dashboard(caminho_dataset: str):
+    # Credenciais só desta execução, quando o ambiente não define outras.
+    os.environ.setdefault("USER_ADMIN", "benchmark")
+    os.environ.setdefault("PASS_ADMIN", os.urandom(8).hex())
+    os.environ.setdefault("FLASK_SECRET_KEY", os.urandom(16).hex())
+
+    import app as dashboard
+
+    cliente = dashboard.server.test_client()
+    cliente.post(
+        "/login",
+        data={"username": os.environ["USER_ADMIN"], "password": os.environ["PASS_ADMIN"]}
+    )
+    with cliente.session_transaction() as sessao:
+        sessao["arquivo_dados"] = caminho_dataset
+
+    return dashboard, cliente
+
+def casos_callbacks(resultados, linhas, caminho_dataset, repeticoes):
+    import plotly
+
+    dashboard, cliente = cliente_do_dashboard(caminho_dataset)
+
+    # Os valores de entrada são os do layout inicial de cada aba, como no
+    # primeiro disparo dos callbacks no navegador.
+    valores = {}
+    coletar_props(json.loads(json.dumps(dashboard.app.layout, cls=plotly.utils.PlotlyJSONEncoder)), valores)
+
+    dependencias = cliente.get("/dash/_dash-dependencies").get_json()
+    renderizar = next(d for d in dependencias if d["output"] == "tabs-content.children")
+
+    for aba in dashboard.paginas:
+        corpo = corpo_do_callback(renderizar, {"tabs-menu": {"value": aba}})
+        resposta = cliente.post("/dash/_dash-update-component", json=corpo)
+        if resposta.status_code == 200:
+            coletar_props(resposta.get_json()["response"]["tabs-content"]["children"], valores)
+
+    vistos = set()
+    for dependencia in dependencias:
+        if dependencia.get("clientside_function"):
+            continue
+
+        corpo = corpo_do_callback(dependencia, valores)
+        nome = dashboard.app.callback_map[dependencia["output"]]["callback"].__name__
+
+        # Duas abas usam o mesmo nome de função; a primeira saída separa
+        # os casos na comparação com a baseline.
+        if nome in vistos:
+            saidas = corpo["outputs"] if isinstance(corpo["outputs"], list) else [corpo["outputs"]]
+            nome = f"{nome}[{saidas[0]['id']}]"
+        vistos.add(nome)
+
+        def despachar(corpo=corpo):
+            resposta = cliente.post("/dash/_dash-update-component", json=corpo)
+            # 204: o callback decidiu não atualizar (PreventUpdate).
+            if resposta.status_code not in (200, 204):
+                raise RuntimeError(f"HTTP {resposta.status_code}")
+
+        executar_caso(resultados, f"callback/{nome}", linhas, despachar, repeticoes)
+
+def imprimir_resultado(resultado: dict) -> None:
+    if "erro" in resultado:
+        print(f"{resultado['caso']:<60} {resultado['linhas']:>9}  erro: {resultado['erro']}")
+        return
+    if "excluido" in resultado:
+        print(f"{resultado['caso']:<60} {resultado['linhas']:>9}  excluído: {resultado['excluido']}")
+        return
+
+    print(
+        f"{resultado['caso']:<60} {resultado['linhas']:>9} "
+        f"{resultado['tempo_ms']:>11.1f} ms {resultado['pico_mb']:>9.1f} MB"
+    )
+
+def executar(tamanhos, suites, repeticoes: int, formato: str, pasta_dados: str, excluidos=()) -> list:
+    casos_excluidos[:] = excluidos
+    resultados = []
+    pasta_original = os.getcwd()
+    pasta_trabalho = tempfile.mkdtemp(prefix="benchmark_")
+
+    # O app grava uploads/, exportações e sessões relativos à pasta atual.
+    os.chdir(pasta_trabalho)
+    try:
+        os.makedirs("uploads", exist_ok=True)
+        layouts = importar_layouts()
+
+        from processar_arquivo import processar_com_metricas
+        from arq import remover_dataset
+
+        for linhas in tamanhos:
+            print(f"\n== {linhas} linhas ==")
+            gerado = arquivo_de_exportacao(pasta_dados, linhas, formato)
+            caminho_arquivo = shutil.copy(gerado, os.path.join(pasta_trabalho, "uploads"))
+            caminho_dataset = processar_com_metricas(caminho_arquivo)
+
+            if "ingestao" in suites:
+                casos_ingestao(resultados, linhas, caminho_arquivo, caminho_dataset, repeticoes)
+            if "funcoes" in suites:
+                casos_funcoes(resultados, linhas, caminho_dataset, repeticoes)
+            if "layouts" in suites:
+                casos_layouts(resultados, linhas, caminho_dataset, layouts, repeticoes)
+            # Sem o app.py importável, nenhum callback é listado: a
+            # exclusão vale para a suíte inteira.
+            if "callbacks" in suites and not registrar_exclusao(resultados, "callback/*", linhas):
+                try:
+                    casos_callbacks(resultados, linhas, caminho_dataset, repeticoes)
+                except Exception as e:
+                    resultado = {"caso": "callback/*", "linhas": linhas, "erro": f"{type(e).__name__}: {e}"}
+                    resultados.append(resultado)
+                    imprimir_resultado(resultado)
+
+            remover_dataset(caminho_dataset)
+            os.remove(caminho_arquivo)
+    finally:
+        os.chdir(pasta_original)
+        shutil.rmtree(pasta_trabalho, ignore_errors=True)
+
+    return resultados
+
+def main(argumentos=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks do dashboard com dados sintéticos")
+    parser.add_argument("--linhas", type=int, nargs="+", default=TAMANHOS[:2],
+                        help=f"tamanhos do dataset gerado (ex.: {' '.join(map(str, TAMANHOS))})")
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=SUITES)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--formato", choices=["xlsx", "xls"], default="xlsx")
+    parser.add_argument("--pasta-dados", default=PASTA_DADOS)
+    parser.add_argument("--saida", help="grava os resultados em JSON, com os dados do ambiente")
+    parser.add_argument("--comparar", nargs="?", const=CAMINHO_BASELINE,
+                        help="compara com a baseline e sai com código 1 se algum caso piorar")
+    parser.add_argument("--limite", type=float, help="limite padrão de piora (0.25 = 25%%)")
+    args = parser.parse_args(argumentos)
+
+    limites = carregar_limites()
+    if args.limite is not None:
+        limites["padrao"] = args.limite
+
+    resultados = executar(
+        args.linhas, args.suites, args.repeticoes, args.formato, args.pasta_dados,
+        limites.get("excluidos", [])
+    )
+
+    parametros = {
+        "linhas": args.linhas,
+        "suites": args.suites,
+        "repeticoes": args.repeticoes,
+        "formato": args.formato,
+    }
+    if args.saida:
+        salvar_resultados(args.saida, resultados, parametros)
+
+    if args.comparar:
+        atual = {"ambiente": ambiente(), "parametros": parametros, "resultados": resultados}
+        return verificar(atual, args.comparar, limites)
+
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
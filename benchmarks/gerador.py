@@ -0,0 +1,133 @@
+import html
+import os
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from arq import COLUNA_SEM_PENDENCIAS, COLUNAS_FIM, COLUNAS_ID, COLUNAS_INICIO, COLUNAS_PROCESSO_INTERNO
+
+LINHAS_POR_BLOCO = 5000
+
+# Muda o nome dos arquivos gerados quando o conteúdo muda, para não
+# reaproveitar os de uma versão anterior guardados na pasta.
+VERSAO_GERADOR = 2
+
+# Proporções aproximadas das exportações reais do sistema XX.
+PROPORCAO_NAO_FINALIZADAS = 0.25
+PROPORCAO_ETAPA_PULADA = 0.2
+PROPORCAO_SEM_PENDENCIAS = 0.6
+PROPORCAO_CODIGO_NUMERICO = 0.1
+ETAPA_SEM_PENDENCIAS = COLUNAS_PROCESSO_INTERNO.index("[Setor] Etapa - X12")
+
+def gerar_exportacao(linhas: int, semente: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(semente)
+    etapas = len(COLUNAS_PROCESSO_INTERNO)
+
+    # Início espalhado pelos dois anos anteriores; cada etapa dura de
+    # algumas horas a algumas semanas, então as datas de uma linha são
+    # sempre crescentes.
+    fim_inicios = pd.Timestamp.now().floor("D") - pd.Timedelta(days=180)
+    inicio = (
+        fim_inicios.value
+        - rng.integers(0, 2 * 365 * 86400, linhas, dtype=np.int64) * 10**9
+    )
+    duracoes = rng.gamma(1.2, 2.5, (linhas, etapas)) * 86400 * 10**9
+    datas = inicio[:, None] + np.cumsum(duracoes, axis=1).astype(np.int64)
+
+    preenchidas = rng.random((linhas, etapas)) >= PROPORCAO_ETAPA_PULADA
+
+    # Pelo menos uma das etapas de início, como no processo real.
+    inicios = [COLUNAS_PROCESSO_INTERNO.index(col) for col in COLUNAS_INICIO]
+    sem_inicio = ~preenchidas[:, inicios].any(axis=1)
+    preenchidas[sem_inicio, inicios[0]] = True
+
+    # Finalizadas terminam em uma única etapa de fim; as não finalizadas
+    # param numa etapa qualquer antes delas.
+    fins = [COLUNAS_PROCESSO_INTERNO.index(col) for col in COLUNAS_FIM]
+    preenchidas[:, fins] = False
+    nao_finalizadas = rng.random(linhas) < PROPORCAO_NAO_FINALIZADAS
+    finalizadas = np.flatnonzero(~nao_finalizadas)
+    preenchidas[finalizadas, rng.choice(fins, len(finalizadas))] = True
+
+    parada = rng.integers(1, min(fins), linhas)
+    posicoes = np.arange(etapas)
+    preenchidas &= ~(nao_finalizadas[:, None] & (posicoes[None, :] > parada[:, None]))
+
+    # Parte dos imóveis tem código só com números, que a planilha grava
+    # como número na mesma coluna dos códigos em texto.
+    codigo_numerico = rng.random(linhas) < PROPORCAO_CODIGO_NUMERICO
+    dados = {
+        COLUNAS_ID[0]: pd.Series(
+            [i if numerico else f"IMV{i:07d}" for i, numerico in enumerate(codigo_numerico)],
+            dtype=object
+        )
+    }
+    for posicao, coluna in enumerate(COLUNAS_PROCESSO_INTERNO):
+        valores = datas[:, posicao].astype("datetime64[ns]")
+        valores[~preenchidas[:, posicao]] = np.datetime64("NaT")
+        dados[coluna] = pd.Series(valores).dt.floor("s")
+
+    # Imóvel Sem Pendências entre a X12 e a etapa seguinte, para parte dos
+    # imóveis que chegaram até ela.
+    com_sem_pendencias = (
+        preenchidas[:, ETAPA_SEM_PENDENCIAS]
+        & (rng.random(linhas) < PROPORCAO_SEM_PENDENCIAS)
+    )
+    sem_pendencias = (
+        datas[:, ETAPA_SEM_PENDENCIAS]
+        + (duracoes[:, ETAPA_SEM_PENDENCIAS + 1] * rng.random(linhas)).astype(np.int64)
+    ).astype("datetime64[ns]")
+    sem_pendencias[~com_sem_pendencias] = np.datetime64("NaT")
+    dados[COLUNA_SEM_PENDENCIAS] = pd.Series(sem_pendencias).dt.floor("s")
+
+    return pd.DataFrame(dados)
+
+def salvar_xlsx(df: pd.DataFrame, caminho: str) -> None:
+    workbook = Workbook(write_only=True)
+    planilha = workbook.create_sheet()
+    planilha.append(list(df.columns))
+
+    for inicio in range(0, len(df), LINHAS_POR_BLOCO):
+        bloco = df.iloc[inicio:inicio + LINHAS_POR_BLOCO].astype(object)
+        bloco = bloco.where(bloco.notna(), None)
+        for linha in bloco.itertuples(index=False, name=None):
+            planilha.append([
+                valor.to_pydatetime() if isinstance(valor, pd.Timestamp) else valor
+                for valor in linha
+            ])
+
+    workbook.save(caminho)
+
+def salvar_xls(df: pd.DataFrame, caminho: str) -> None:
+    # O .xls do sistema é uma tabela HTML com as datas em texto.
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        arquivo.write("<html><body><table>\n<tr>")
+        arquivo.write("".join(f"<th>{html.escape(col)}</th>" for col in df.columns))
+        arquivo.write("</tr>\n")
+
+        for inicio in range(0, len(df), LINHAS_POR_BLOCO):
+            bloco = df.iloc[inicio:inicio + LINHAS_POR_BLOCO].copy()
+            for coluna in bloco.columns[1:]:
+                bloco[coluna] = bloco[coluna].dt.strftime("%d/%m/%Y %H:%M:%S").fillna("")
+            for linha in bloco.itertuples(index=False, name=None):
+                arquivo.write("<tr>")
+                arquivo.write("".join(f"<td>{html.escape(str(valor))}</td>" for valor in linha))
+                arquivo.write("</tr>\n")
+
+        arquivo.write("</table></body></html>\n")
+
+SALVAR = {"xlsx": salvar_xlsx, "xls": salvar_xls}
+
+def arquivo_de_exportacao(pasta: str, linhas: int, formato: str = "xlsx", semente: int = 0) -> str:
+    # Gerar 1M de linhas leva minutos; o arquivo fica na pasta para as
+    # próximas execuções.
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f"exportacao_{linhas}_{semente}_v{VERSAO_GERADOR}.{formato}")
+
+    if not os.path.exists(caminho):
+        temporario = f"{caminho}.tmp"
+        SALVAR[formato](gerar_exportacao(linhas, semente), temporario)
+        os.replace(temporario, caminho)
+
+    return caminho
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from arq import COLUNAS_FIM, COLUNAS_INICIO
+
+# Versão linha a linha das colunas derivadas, como era antes de
+# arq.calcular_colunas_derivadas: serve de referência de tempo e de
+# resultado para a versão vetorizada.
+
+def timedelta_para_dias(td):
+    if pd.isna(td):
+        return np.nan
+    return td.total_seconds() / 86400
+
+def dias_decimais_para_texto(valor):
+    if pd.isna(valor):
+        return ""
+
+    dias = int(valor)
+    resto = valor - dias
+
+    horas_total = resto * 24
+    horas = int(horas_total)
+
+    minutos_total = (horas_total - horas) * 60
+    minutos = int(round(minutos_total))
+
+    if minutos == 60:
+        minutos = 0
+        horas += 1
+
+    if horas == 24:
+        horas = 0
+        dias += 1
+
+    return f"{dias:02d} dias {horas:02d} horas e {minutos:02d} minutos"
+
+def etapa_final_utilizada(row):
+    for col in COLUNAS_FIM:
+        if pd.notna(row[col]):
+            return col
+    return ""
+
+def calcular_colunas_derivadas_linha_a_linha(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+
+    df['Data_inicio_desocupacao'] = df[COLUNAS_INICIO].bfill(axis=1).iloc[:, 0]
+    df['Data_fim_real'] = df[COLUNAS_FIM].bfill(axis=1).iloc[:, 0]
+
+    df['Finalizado'] = (
+        df['Data_inicio_desocupacao'].notna() &
+        df['Data_fim_real'].notna()
+    )
+
+    df['Data_fim_desocupacao'] = df['Data_fim_real'].fillna(pd.Timestamp.now())
+
+    delta = df['Data_fim_desocupacao'] - df['Data_inicio_desocupacao']
+    delta = delta.where(delta >= pd.Timedelta(0))
+
+    df['Tempo_total_dias'] = delta.apply(timedelta_para_dias)
+    df['Tempo_total_desocupacao'] = df['Tempo_total_dias'].apply(dias_decimais_para_texto)
+    df['Etapa_final_utilizada'] = df.apply(etapa_final_utilizada, axis=1)
+
+    return df
+
+def conferir_colunas_derivadas(vetorizado: pd.DataFrame, referencia: pd.DataFrame) -> None:
+    # As linhas não finalizadas terminam em "agora", que muda entre as duas
+    # chamadas: nelas só o número de dias é comparado, com folga de um minuto.
+    # Os valores são comparados sem o dtype (object na versão vetorizada,
+    # str no apply do pandas 3).
+    finalizado = referencia["Finalizado"].to_numpy(dtype=bool)
+    todas = np.ones(len(referencia), dtype=bool)
+
+    for coluna, linhas in [
+        ("Finalizado", todas),
+        ("Etapa_final_utilizada", todas),
+        ("Data_inicio_desocupacao", todas),
+        ("Data_fim_desocupacao", finalizado),
+        ("Tempo_total_desocupacao", finalizado),
+    ]:
+        atual = vetorizado[coluna].to_numpy(dtype=object)[linhas]
+        esperado = referencia[coluna].to_numpy(dtype=object)[linhas]
+        if not pd.Series(atual).equals(pd.Series(esperado)):
+            raise AssertionError(f"{coluna} difere da versão linha a linha")
+
+    atual = vetorizado["Tempo_total_dias"].to_numpy(dtype="float64")
+    esperado = referencia["Tempo_total_dias"].to_numpy(dtype="float64")
+    if not np.array_equal(atual[finalizado], esperado[finalizado], equal_nan=True):
+        raise AssertionError("Tempo_total_dias difere da versão linha a linha")
+    if not np.allclose(atual, esperado, atol=1 / (24 * 60), rtol=0, equal_nan=True):
+        raise AssertionError("Tempo_total_dias difere da versão linha a linha")